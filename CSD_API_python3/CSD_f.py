@@ -16,19 +16,31 @@ import glob
 import os
 
 
+_entryreader = None
+_entryreader_pid = None
+
+
 def get_entryreader():
     """
     Get entry reader and updates.
 
+    The reader is opened once per process and reused by later calls.
+    A reader opened before a fork (e.g. in cage_daemon.py) is not
+    reused by the child, as its sqlite connections must not be shared
+    between processes.
+
     Example from
     https://downloads.ccdc.cam.ac.uk/documentation/API/modules/io_api.html#module-ccdc.io
     - .sqlite is known file format, .inf is not.
 
     """
-    directory = ccdc.io.csd_directory()
-    csd_and_updates = glob.glob(os.path.join(directory, '*.sqlite'))
-    csd_and_updates_reader = ccdc.io.EntryReader(csd_and_updates)
-    return csd_and_updates_reader
+    global _entryreader, _entryreader_pid
+    if _entryreader is None or _entryreader_pid != os.getpid():
+        directory = ccdc.io.csd_directory()
+        csd_and_updates = glob.glob(os.path.join(directory, '*.sqlite'))
+        _entryreader = ccdc.io.EntryReader(csd_and_updates)
+        _entryreader_pid = os.getpid()
+    return _entryreader
 
 
 def rewrite_pdb(pdb, cell):
@@ -43,3 +55,132 @@ def rewrite_pdb(pdb, cell):
     # wrap atoms
     s.wrap()
     s.write(pdb)
+
+
+def get_quality_metadata(entry):
+    """
+    Get quality metadata of an entry for REFCODE family selection.
+
+    Returns:
+        (str) - line of REFCODE,r_factor,has_disorder,has_3d_structure
+
+    """
+    disorder = 'y' if entry.has_disorder else 'n'
+    has_3d = 'y' if entry.has_3d_structure else 'n'
+    return f'{entry.identifier},{entry.r_factor},{disorder},{has_3d}\n'
+
+
+def get_asymmetric_unit(crystal):
+    """
+    Get the asymmetric unit and space group operators of a crystal.
+
+    Atoms without coordinates are dropped.
+
+    Returns:
+        (dict) - cell parameters, space group symbol, symmetry
+            operators and element and fractional coordinates of
+            asymmetric unit atoms
+
+    """
+    atoms = [
+        i for i in crystal.asymmetric_unit_molecule.atoms
+        if i.fractional_coordinates is not None
+    ]
+    return {
+        'cell': [
+            crystal.cell_lengths.a, crystal.cell_lengths.b,
+            crystal.cell_lengths.c, crystal.cell_angles.alpha,
+            crystal.cell_angles.beta, crystal.cell_angles.gamma
+        ],
+        'spacegroup': crystal.spacegroup_symbol,
+        'operators': list(crystal.symmetry_operators),
+        'elements': [i.atomic_symbol for i in atoms],
+        'labels': [i.label for i in atoms],
+        'fractional_coordinates': [
+            [
+                i.fractional_coordinates.x,
+                i.fractional_coordinates.y,
+                i.fractional_coordinates.z
+            ]
+            for i in atoms
+        ]
+    }
+
+
+def write_bond_table(packed, file):
+    """
+    Write the bonds of a packed crystal as a side-car CSV of atom
+    indices (in the order of the written PDB) and CSD bond types.
+
+    """
+    with open(file, 'w') as f:
+        f.write('atom1,atom2,bond_type\n')
+        for bond in packed.bonds:
+            a, b = bond.atoms
+            f.write(f'{a.index},{b.index},{bond.bond_type}\n')
+
+
+def get_crystal(entry_reader, RC):
+    """
+    Get the crystal of a REFCODE, following the coordinates cross
+    references of entries without 3D structure (as in
+    REFCODEs_to_PDBs.py).
+
+    Returns:
+        (ccdc.crystal.Crystal) - crystal, None if no 3D structure
+
+    """
+    entry = entry_reader.entry(RC)
+    if entry.has_3d_structure:
+        return entry.crystal
+    for CR in entry.cross_references:
+        if CR.type != 'Coordinates ref':
+            continue
+        for ID in CR.identifiers:
+            try:
+                new_entry = entry_reader.entry(ID)
+            except RuntimeError:
+                # this entry ID is not in the CSD
+                continue
+            if new_entry.has_3d_structure:
+                return new_entry.crystal
+    return None
+
+
+def get_packed_arrays(crystal):
+    """
+    Get the packed unit cell of a crystal as plain arrays (the content
+    of the PDB and bond table written by REFCODEs_to_PDBs.py).
+
+    Atoms without coordinates are dropped.
+
+    Returns:
+        (dict) - cell parameters, elements, cartesian coordinates and
+            bonds (pairs of atom indices)
+
+    """
+    packed = crystal.packing()
+    index = {}
+    elements = []
+    coordinates = []
+    for atom in packed.atoms:
+        if atom.coordinates is None:
+            continue
+        index[atom.index] = len(elements)
+        elements.append(atom.atomic_symbol)
+        coordinates.append(list(atom.coordinates))
+    bonds = []
+    for bond in packed.bonds:
+        a, b = bond.atoms
+        if a.index in index and b.index in index:
+            bonds.append((index[a.index], index[b.index]))
+    return {
+        'cell': [
+            crystal.cell_lengths.a, crystal.cell_lengths.b,
+            crystal.cell_lengths.c, crystal.cell_angles.alpha,
+            crystal.cell_angles.beta, crystal.cell_angles.gamma
+        ],
+        'elements': elements,
+        'coordinates': coordinates,
+        'bonds': bonds
+    }
@@ -0,0 +1,63 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# Distributed under the terms of the MIT License.
+
+"""
+Script to export the asymmetric unit and space group operators of a
+list of REFCODEs (RC_asu.json), for analysis of symmetry-unique
+molecules only (analyse_asymmetric_unit.py).
+
+Author: Andrew Tarzia
+
+Date Created: 19 Oct 2026
+
+"""
+
+import json
+import sys
+
+
+def main():
+    if (not len(sys.argv) == 3):
+        print("""
+    Usage: REFCODEs_to_ASU.py REFCODE_file missing_struct
+        REFCODE_file (str) -
+            file with list of REFCODEs
+        missing_struct (str) -
+            file with list of REFCODEs with missing structs
+        """)
+        sys.exit()
+    else:
+        RCODE_file = sys.argv[1]
+        missing_struct = sys.argv[2]
+
+    import CSD_f
+    # read in CSD and updates
+    entry_reader = CSD_f.get_entryreader()
+
+    REFCODEs = []
+    for line in open(RCODE_file, 'r'):
+        REFCODEs.append(line.rstrip())
+
+    RC_nostruct = []
+    for i, RC in enumerate(sorted(REFCODEs)):
+        print('doing: '+str(RC))
+        # use coordinates of cross reference if available
+        crystal = CSD_f.get_crystal(entry_reader, RC)
+        if crystal is None:
+            RC_nostruct.append(RC)
+            continue
+        with open(RC+'_asu.json', 'w') as f:
+            json.dump(CSD_f.get_asymmetric_unit(crystal), f)
+    print('-------------------------------------------------')
+    print(
+        f'structures missing: {len(RC_nostruct)} of '
+        f'{len(REFCODEs)}'
+    )
+    with open(missing_struct, 'w') as f:
+        for RC in RC_nostruct:
+            f.write(RC+'\n')
+
+
+if __name__ == "__main__":
+    main()
@@ -11,9 +11,7 @@ Author: Andrew Tarzia
 Date Created: 12 May 2019
 
 """
-import ccdc.io
 import sys
-import CSD_f
 
 
 def main():
@@ -33,6 +31,8 @@ def main():
         missing_struct = sys.argv[2]
         cross_references = sys.argv[3]
 
+    import ccdc.io
+    import CSD_f
     # read in CSD and updates
     entry_reader = CSD_f.get_entryreader()
 
@@ -5,16 +5,16 @@
 """
 Script to convert list of REFCODEs into PDBs.
  No symm and constraints are applied.
+ The CSD bond table of each packed cell is written to
+ RC_extracted_bonds.csv for modularization without bond perception
+ (periodic_molecules.py).
 
 Author: Andrew Tarzia
 
 Date Created: 24 May 2019
 
 """
-import ccdc.io
-from ase.io import read
 import sys
-import CSD_f
 
 
 def main():
@@ -35,6 +35,8 @@ def main():
         missing_struct = sys.argv[2]
         cross_references = sys.argv[3]
 
+    import ccdc.io
+    import CSD_f
     # read in CSD and updates
     entry_reader = CSD_f.get_entryreader()
 
@@ -89,6 +91,7 @@ def main():
                 crystal.cell_angles.beta, crystal.cell_angles.gamma
             ]
             CSD_f.rewrite_pdb(pdb=RC+'_extracted.pdb', cell=CELL)
+            CSD_f.write_bond_table(packed, RC+'_extracted_bonds.csv')
     print('-------------------------------------------------')
     print(
         f'structures missing: {len(RC_nostruct)} of '
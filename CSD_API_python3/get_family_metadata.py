@@ -0,0 +1,51 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# Distributed under the terms of the MIT License.
+
+"""
+Script to collect the quality metadata of a list of REFCODEs, used to
+select REFCODE family representatives (refcode_families.py).
+
+Author: Andrew Tarzia
+
+Date Created: 19 Oct 2026
+
+"""
+
+import sys
+
+
+def main():
+    if (not len(sys.argv) == 3):
+        print("""
+    Usage: get_family_metadata.py REFCODE_file metadata_file
+        REFCODE_file (str) -
+            file with list of REFCODEs
+        metadata_file (str) -
+            file to write REFCODE,r_factor,has_disorder,
+            has_3d_structure to
+        """)
+        sys.exit()
+    else:
+        RCODE_file = sys.argv[1]
+        metadata_file = sys.argv[2]
+
+    import CSD_f
+    # read in CSD and updates
+    entry_reader = CSD_f.get_entryreader()
+
+    REFCODEs = []
+    for line in open(RCODE_file, 'r'):
+        if line.rstrip() not in REFCODEs:
+            REFCODEs.append(line.rstrip())
+
+    with open(metadata_file, 'w') as f:
+        f.write('REFCODE,r_factor,has_disorder,has_3d_structure\n')
+        for RC in sorted(REFCODEs):
+            entry = entry_reader.entry(RC)
+            f.write(CSD_f.get_quality_metadata(entry))
+    print(f'metadata written for {len(REFCODEs)} REFCODEs')
+
+
+if __name__ == "__main__":
+    main()
@@ -10,9 +10,7 @@ Author: Andrew Tarzia
 Date Created: 1 Mar 2019
 
 """
-import ccdc.search
 import sys
-import CSD_f
 
 
 def write_entry(file, author, number, DOI, CSD, solvent, disorder):
@@ -48,6 +46,8 @@ def main():
                 metal: sets is_organometallic is True
                 anything else: passes this test
         output_prefix (str) - prefix of .txt and .gcd file to output
+            (quality metadata for refcode_families.py is written to
+            output_prefix_quality.csv)
         """)
         sys.exit()
     else:
@@ -55,8 +55,11 @@ def main():
         cage_type = sys.argv[2]
         output_prefix = sys.argv[3]
 
+    import ccdc.search
+    import CSD_f
     out_txt = output_prefix+'.txt'
     out_gcd = output_prefix+'.gcd'
+    out_quality = output_prefix+'_quality.csv'
 
     # files = []
     authors = []
@@ -71,6 +74,9 @@ def main():
     with open(out_gcd, 'w') as f:
         f.write('')
 
+    with open(out_quality, 'w') as f:
+        f.write('REFCODE,r_factor,has_disorder,has_3d_structure\n')
+
     count = 0
     count_no = 0
     idents = []
@@ -133,6 +139,8 @@ def main():
                     disorder
                 )
                 write_REFCODES(out_gcd, hit.identifier)
+                with open(out_quality, 'a') as f:
+                    f.write(CSD_f.get_quality_metadata(hit.entry))
                 count += 1
 
     print(str(count)+' cifs found from '+str(count_no)+' authors')
@@ -14,11 +14,10 @@ Date Created: 24 May 2019
 
 import glob
 import sys
-import CSD_f
 
 
 def main():
-    if (not len(sys.argv) == 2):
+    if (not len(sys.argv) == 2 or sys.argv[1] in ['-h', '--help']):
         print("""
     Usage: get_solvent_info.py file_suffix
         file_suffix (str) -
@@ -29,6 +28,7 @@ def main():
     else:
         file_suffix = sys.argv[1]
 
+    import CSD_f
     # read in CSD and updates
     entry_reader = CSD_f.get_entryreader()
 
@@ -0,0 +1,253 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# Distributed under the terms of the MIT License.
+
+"""
+Script to analyse the symmetry-unique molecules of structures exported
+as an asymmetric unit with space group operators (RC_asu.json from
+CSD_API_python3/REFCODEs_to_ASU.py).
+
+Only molecules containing asymmetric unit atoms are built (by periodic
+graph traversal) and only one of each set of symmetry-equivalent
+molecules is analysed with pyWindow. The cage and window COMs of all
+symmetry copies in the unit cell are generated with the operators and
+written as {RC}_symm_{n}.json (same format as atools.analyze_rebuilt)
+with the unit cell in {RC}_symm.pdb (cage COMs as He, window COMs as
+Ne), for use in pore_topologies.
+
+Author: Andrew Tarzia
+
+Date Created: 19 Oct 2026
+
+"""
+
+import sys
+import json
+import logging
+import os
+import numpy as np
+
+from periodic_molecules import (
+    cellpar_to_lattice, expand_asymmetric_unit, parse_symmetry_operator,
+    perceive_periodic_bonds, discrete_molecules, molecule_coordinates
+)
+
+
+def unique_molecules(elements, frac, lattice, orbit, operator, identity):
+    """
+    Build one molecule of each set of symmetry-equivalent molecules.
+
+    Molecules are seeded from the asymmetric unit atoms only, and two
+    molecules are equivalent if they are made of copies of the same
+    asymmetric unit atoms.
+
+    Returns:
+        molecules (list) - (atom indices, cartesian coordinates)
+
+    """
+    bonds, images = perceive_periodic_bonds(elements, frac, lattice)
+    seeds = np.where(operator == identity)[0]
+    molecules = []
+    seen = set()
+    for indices, offsets, polymeric in discrete_molecules(
+        len(elements), bonds, images, seeds=seeds
+    ):
+        key = frozenset(orbit[indices].tolist())
+        if key in seen:
+            continue
+        seen.add(key)
+        if polymeric:
+            logging.warning(f'skipping polymeric molecule of {len(indices)}')
+            continue
+        coords = molecule_coordinates(frac, lattice, indices, offsets)
+        molecules.append((indices, coords))
+    return molecules
+
+
+def symmetry_copies(com, window_coms, lattice, operators, tol=1E-3):
+    """
+    Apply symmetry operators to the COM and window COMs of a molecule.
+
+    Copies that coincide (molecules on special positions) are removed.
+
+    Returns:
+        copies (list) - (operator, COM (3, ), window COMs (n, 3)) in
+            cartesian coordinates, with COM in the unit cell
+
+    """
+    inverse = np.linalg.inv(lattice)
+    com_frac = com @ inverse
+    window_frac = window_coms @ inverse
+    copies = []
+    seen = set()
+    for op in operators:
+        R, t = parse_symmetry_operator(op)
+        new_com = R @ com_frac + t
+        shift = np.floor(new_com)
+        new_com -= shift
+        key = tuple(
+            np.round(new_com / tol).astype(int) % int(round(1 / tol))
+        )
+        if key in seen:
+            continue
+        seen.add(key)
+        new_windows = window_frac @ R.T + t - shift
+        copies.append((op, new_com @ lattice, new_windows @ lattice))
+    return copies
+
+
+def write_cell_pdb(file, cellpar, copies):
+    """
+    Write unit cell with cage (He) and window (Ne) COMs as atoms.
+
+    """
+    lines = [
+        'CRYST1{:9.3f}{:9.3f}{:9.3f}{:7.2f}{:7.2f}{:7.2f} P 1\n'.format(
+            *cellpar
+        )
+    ]
+    atoms = []
+    for com, window_coms in copies:
+        atoms.append(('He', com))
+        atoms.extend(('Ne', i) for i in window_coms)
+    for i, (element, pos) in enumerate(atoms):
+        lines.append(
+            'HETATM{:5d} {:<4s} COM     1    {:8.3f}{:8.3f}{:8.3f}'
+            '  1.00  0.00          {:>2s}\n'.format(
+                (i + 1) % 100000, element, *pos, element
+            )
+        )
+    lines.append('END\n')
+    with open(file, 'w') as f:
+        f.writelines(lines)
+
+
+def analyse_structure(asu_file, atom_limit):
+    """
+    Analyse the symmetry-unique molecules of one structure.
+
+    Returns:
+        results (list) - (molecule, pore_diam_opt, no_windows,
+            no_copies) of each analysed molecule
+
+    """
+    import pywindow as pw
+    prefix = asu_file.replace('_asu.json', '')
+    with open(asu_file, 'r') as f:
+        data = json.load(f)
+    lattice = cellpar_to_lattice(data['cell'])
+    elements, frac, orbit, operator = expand_asymmetric_unit(
+        data['elements'],
+        np.array(data['fractional_coordinates']),
+        data['operators']
+    )
+    ops = [parse_symmetry_operator(i) for i in data['operators']]
+    identity = [
+        i for i, (R, t) in enumerate(ops)
+        if np.allclose(R, np.identity(3)) and np.allclose(t, 0)
+    ][0]
+    molecules = unique_molecules(
+        elements, frac, lattice, orbit, operator, identity
+    )
+    logging.info(
+        f'> {prefix}: {len(data["elements"])} asymmetric unit atoms, '
+        f'{len(elements)} unit cell atoms, '
+        f'{len(molecules)} unique molecules'
+    )
+
+    results = []
+    cell_copies = []
+    count = 0
+    for molec, (indices, coords) in enumerate(molecules):
+        if len(indices) < atom_limit:
+            continue
+        mol = pw.MolecularSystem.load_system(
+            {
+                'elements': np.array([elements[i] for i in indices]),
+                'coordinates': coords
+            },
+            system_id=f'{prefix}_{molec}'
+        ).system_to_molecule()
+        try:
+            analysis = mol.full_analysis()
+        except ValueError:
+            logging.warning(f'{prefix}_{molec} failed pywindow full_analysis.')
+            continue
+        window_coms = analysis['windows']['centre_of_mass']
+        window_coms = (
+            np.array(window_coms).reshape(-1, 3)
+            if window_coms is not None else np.empty((0, 3))
+        )
+        copies = symmetry_copies(
+            np.array(analysis['centre_of_mass']), window_coms, lattice,
+            data['operators']
+        )
+        for op, com, new_windows in copies:
+            output = dict(analysis)
+            output['centre_of_mass'] = com
+            output['windows'] = dict(analysis['windows'])
+            if len(window_coms) > 0:
+                output['windows']['centre_of_mass'] = new_windows
+            output['symmetry'] = {'molecule': molec, 'operator': op}
+            with open(f'{prefix}_symm_{count}.json', 'w') as f:
+                json.dump(output, f, default=lambda i: i.tolist())
+            cell_copies.append((com, new_windows))
+            count += 1
+        diameters = analysis['windows']['diameters']
+        results.append((
+            molec,
+            analysis['pore_diameter_opt']['diameter'],
+            len(diameters) if diameters is not None else 0,
+            len(copies)
+        ))
+    write_cell_pdb(prefix + '_symm.pdb', data['cell'], cell_copies)
+    return results
+
+
+def main():
+    if (not len(sys.argv) in [3, 4]):
+        print("""
+    Usage: analyse_asymmetric_unit.py DB_file output_file [atom_limit]
+        DB_file (str) - file with initial list of REFCODEs
+        output_file (str) - file to output results of analysis to
+        atom_limit (int) - minimum number of atoms in analysed
+            molecules (default: 20)
+        """)
+        sys.exit()
+    else:
+        DB_file = sys.argv[1]
+        output_file = sys.argv[2]
+        atom_limit = int(sys.argv[3]) if len(sys.argv) == 4 else 20
+
+    refcodes = sorted([i.rstrip() for i in open(DB_file, 'r').readlines()])
+    logging.info(f'> started with: {len(refcodes)} structures.')
+    done_RCs = []
+    if os.path.isfile(output_file):
+        with open(output_file, 'r') as f:
+            f.readline()
+            done_RCs = list(set(i.split(',')[0] for i in f))
+        logging.info(f'> {len(done_RCs)} structures already done.')
+    else:
+        with open(output_file, 'w') as f:
+            f.write('REFCODE,molecule,pore_diam_opt,no_windows,no_copies\n')
+
+    for RC in refcodes:
+        if RC in done_RCs:
+            continue
+        asu_file = RC + '_asu.json'
+        if not os.path.isfile(asu_file):
+            logging.warning(f'{asu_file} not present!')
+            continue
+        results = analyse_structure(asu_file, atom_limit)
+        if len(results) == 0:
+            # structures without analysed molecules get an empty row,
+            # so that they are marked done
+            results = [('', '', 0, 0)]
+        with open(output_file, 'a') as f:
+            for molec, pdo, nwind, ncopies in results:
+                f.write(f'{RC},{molec},{pdo},{nwind},{ncopies}\n')
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='')
+    main()
@@ -0,0 +1,102 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# Distributed under the terms of the MIT License.
+
+"""
+Functions that are useful for the pyWindow analysis scripts.
+
+Author: Andrew Tarzia
+
+Date Created: 19 Oct 2026
+"""
+
+import logging
+
+
+def warn_engine(engine):
+    """
+    Warn that the graph window engine is experimental.
+
+    Its window counts and diameters have not been benchmarked against
+    pyWindow (benchmark_windows.py) on a reference set.
+
+    """
+    if engine == 'graph':
+        logging.warning(
+            '> the graph window engine (window_engine.py) is experimental, '
+            'check its agreement with pyWindow with benchmark_windows.py '
+            'before using its window counts'
+        )
+
+
+def run_pywindow(mol, name, engine='pywindow'):
+    """
+    Run pyWindow full_analysis on a molecule.
+
+    With engine='graph', only the optimised pore diameter is computed
+    with pyWindow and windows are found from the molecular graph and
+    convex hull (window_engine.py).
+
+    Returns:
+        result (dict) - pore_diam_opt and no_windows, both None if
+            pyWindow failed
+
+    """
+    if engine == 'graph':
+        from window_engine import find_windows
+        try:
+            pdo = mol.calculate_pore_diameter_opt()
+        except ValueError:
+            logging.warning(f'{name} failed pywindow pore_diameter_opt.')
+            return {'pore_diam_opt': None, 'no_windows': None}
+        diameters, _ = find_windows(mol.elements, mol.coordinates)
+        return {'pore_diam_opt': pdo, 'no_windows': len(diameters)}
+    try:
+        analysis = mol.full_analysis()
+    except ValueError:
+        logging.warning(f'{name} failed pywindow full_analysis.')
+        return {'pore_diam_opt': None, 'no_windows': None}
+    pdo = analysis['pore_diameter_opt']['diameter']
+    if analysis['windows']['diameters'] is not None:
+        nwind = len(analysis['windows']['diameters'])
+    else:
+        nwind = 0
+    return {'pore_diam_opt': pdo, 'no_windows': nwind}
+
+
+def analyse_molecule(mol, name, cache=None, engine='pywindow'):
+    """
+    Get pore diameter and number of windows of a molecule.
+
+    If an AnalysisCache (graph_hash.py) is given, a stored result of
+    the same molecular graph with a similar conformation is reused.
+
+    Keyword Arguments:
+        mol (pywindow.Molecule) - molecule to analyse
+        name (str) - name of molecule for logging and cache
+        cache (graph_hash.AnalysisCache) - cache of results
+        engine (str) - window detection engine, pywindow or graph
+
+    Returns:
+        result (dict) - pore_diam_opt and no_windows or None if
+            pyWindow failed
+        reused (bool) - True if result came from the cache
+
+    """
+    key = None
+    if cache is not None:
+        key, result = cache.lookup(
+            mol.elements, mol.coordinates,
+            variant=None if engine == 'pywindow' else engine
+        )
+        if result is not None:
+            if result['pore_diam_opt'] is None:
+                return None, True
+            return result, True
+    result = run_pywindow(mol, name, engine=engine)
+    if cache is not None:
+        cache.add(key, result, source=name)
+    if result['pore_diam_opt'] is None:
+        return None, False
+    return result, False
+
@@ -0,0 +1,123 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# Distributed under the terms of the MIT License.
+
+"""
+Script to benchmark the graph-based window engine (window_engine.py)
+against pyWindow windows on a reference set of molecule PDBs (e.g. the
+RC_MP_n.pdb files of classify_structures.py).
+
+Windows are matched by their centres (Hungarian assignment, within
+match_distance), and the agreement of window counts and diameters and
+the run times of both engines are reported.
+
+Author: Andrew Tarzia
+
+Date Created: 19 Oct 2026
+
+"""
+
+import sys
+import time
+import logging
+import numpy as np
+from scipy.optimize import linear_sum_assignment
+
+from window_engine import find_windows
+
+
+def pywindow_windows(mol):
+    """
+    Return diameters and centres of pyWindow windows of a molecule.
+
+    """
+    diameters = mol.calculate_windows()
+    if diameters is None:
+        return np.empty(0), np.empty((0, 3))
+    centres = mol.properties['windows']['centre_of_mass']
+    return np.asarray(diameters), np.asarray(centres).reshape(-1, 3)
+
+
+def match_windows(centres_a, centres_b, match_distance):
+    """
+    Match windows of two engines by their centres.
+
+    Returns:
+        (list) - (index a, index b) of matched windows
+
+    """
+    if len(centres_a) == 0 or len(centres_b) == 0:
+        return []
+    distances = np.linalg.norm(
+        centres_a[:, None, :] - centres_b[None, :, :], axis=2
+    )
+    rows, cols = linear_sum_assignment(distances)
+    return [
+        (i, j) for i, j in zip(rows, cols)
+        if distances[i, j] <= match_distance
+    ]
+
+
+def main():
+    if (not len(sys.argv) in [3, 4]):
+        print("""
+    Usage: benchmark_windows.py file_list output_file [match_distance]
+        file_list (str) - file with list of molecule PDBs
+        output_file (str) - CSV to write results of each molecule to
+        match_distance (float) - max distance between centres of
+            matched windows (default: 2.0 Angstrom)
+        """)
+        sys.exit()
+    else:
+        file_list = sys.argv[1]
+        output_file = sys.argv[2]
+        match_distance = float(sys.argv[3]) if len(sys.argv) == 4 else 2.0
+
+    import pywindow as pw
+    files = [i.rstrip() for i in open(file_list, 'r').readlines()]
+    rows = []
+    for file in files:
+        mol = pw.MolecularSystem.load_file(file).system_to_molecule()
+        start = time.time()
+        pw_diam, pw_centres = pywindow_windows(mol)
+        t_pw = time.time() - start
+        start = time.time()
+        g_diam, g_centres = find_windows(mol.elements, mol.coordinates)
+        t_graph = time.time() - start
+        matches = match_windows(pw_centres, g_centres, match_distance)
+        if len(matches) > 0:
+            diff = np.mean([abs(pw_diam[i] - g_diam[j]) for i, j in matches])
+        else:
+            diff = np.nan
+        rows.append((
+            file, len(pw_diam), len(g_diam), len(matches), diff, t_pw, t_graph
+        ))
+        logging.info(
+            f'> {file}: pywindow {len(pw_diam)}, graph {len(g_diam)}, '
+            f'matched {len(matches)}, speedup {t_pw / max(t_graph, 1E-6):.1f}'
+        )
+
+    with open(output_file, 'w') as f:
+        f.write(
+            'file,n_pywindow,n_graph,n_matched,mean_abs_diam_diff,'
+            't_pywindow,t_graph\n'
+        )
+        for row in rows:
+            f.write(','.join(str(i) for i in row) + '\n')
+
+    if len(rows) == 0:
+        return
+    same_count = sum(1 for i in rows if i[1] == i[2])
+    diffs = np.array([i[4] for i in rows], dtype=float)
+    logging.info(
+        f'> same window count: {same_count} of {len(rows)}\n'
+        f'> mean abs diameter difference of matched windows: '
+        f'{np.nanmean(diffs) if np.any(np.isfinite(diffs)) else np.nan:.3f}\n'
+        f'> total time pywindow: {sum(i[5] for i in rows):.1f} s, '
+        f'graph: {sum(i[6] for i in rows):.1f} s'
+    )
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='')
+    main()
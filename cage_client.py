@@ -0,0 +1,132 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# Distributed under the terms of the MIT License.
+
+"""
+Thin client of cage_daemon.py: runs a script of this repository with
+its arguments in the warm daemon and returns its output and exit code,
+e.g. in a shell loop:
+
+    for i in *_extracted.pdb; do
+        python cage_client.py remove_solvent.py $i NONE
+    done
+
+If no daemon is listening, the script is run directly with the same
+interpreter.
+
+Author: Andrew Tarzia
+
+Date Created: 19 Oct 2026
+
+"""
+
+import os
+import sys
+import json
+import socket
+import logging
+import argparse
+import subprocess
+
+from cage_daemon import default_socket, EXIT_MARK
+
+
+def send_request(socket_file, request):
+    """
+    Connect to the daemon and send a request.
+
+    Returns:
+        (socket.socket) - connection, None if no daemon is listening
+
+    """
+    conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        conn.connect(socket_file)
+    except (ConnectionRefusedError, FileNotFoundError):
+        conn.close()
+        return None
+    conn.sendall(json.dumps(request).encode() + b'\n')
+    return conn
+
+
+def run_script(script, args, socket_file):
+    """
+    Run script with args in the daemon, writing its output to stdout.
+
+    Returns:
+        (int) - exit code of the script
+
+    """
+    script = os.path.abspath(script)
+    conn = send_request(socket_file, {
+        'command': 'run', 'script': script, 'args': args,
+        'cwd': os.getcwd()
+    })
+    if conn is None:
+        logging.warning(f'> no daemon on {socket_file}, running directly')
+        return subprocess.run([sys.executable, script] + args).returncode
+    out = sys.stdout.buffer
+    # hold back enough output to find the exit mark at the end
+    keep = len(EXIT_MARK) + 8
+    tail = b''
+    with conn:
+        while True:
+            chunk = conn.recv(65536)
+            if not chunk:
+                break
+            tail += chunk
+            if len(tail) > keep:
+                out.write(tail[:-keep])
+                out.flush()
+                tail = tail[-keep:]
+    end = tail.rfind(EXIT_MARK)
+    if end < 0:
+        out.write(tail)
+        out.flush()
+        logging.warning('> job ended without exit code')
+        return 1
+    out.write(tail[:end])
+    out.flush()
+    return int(tail[end + len(EXIT_MARK):].strip())
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Run a script in the warm cage_daemon.py.'
+    )
+    parser.add_argument(
+        '--socket', default=default_socket(),
+        help='Unix socket of the daemon'
+    )
+    parser.add_argument(
+        '--stop', action='store_true', help='stop the daemon'
+    )
+    parser.add_argument(
+        '--ping', action='store_true',
+        help=(
+            'print pids of the daemon and of the worker that answers, '
+            'and number of jobs of the worker'
+        )
+    )
+    parser.add_argument('script', nargs='?', help='script to run')
+    parser.add_argument(
+        'args', nargs=argparse.REMAINDER, help='arguments of script'
+    )
+    args = parser.parse_args()
+
+    if args.stop or args.ping:
+        command = 'stop' if args.stop else 'ping'
+        conn = send_request(args.socket, {'command': command})
+        if conn is None:
+            sys.exit(f'no daemon on {args.socket}')
+        with conn:
+            print(conn.makefile('r').read().rstrip())
+        sys.exit()
+    if args.script is None:
+        parser.error('script is required')
+    sys.exit(run_script(args.script, args.args, args.socket))
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='')
+    main()
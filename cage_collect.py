@@ -0,0 +1,249 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# Distributed under the terms of the MIT License.
+
+"""
+Single entry point for the scripts of this repository.
+
+    cage_collect.py [--daemon] command [arguments of command]
+
+Each command runs one script with its own arguments (run a command
+without arguments or with --help for its usage). Only the standard
+library is imported here, and the script of a command (with its
+dependencies) is only loaded when that command is run. Scripts import
+their heavy dependencies (pandas, ASE, pyWindow, atools, the CSD API)
+after parsing their arguments, so the usage of any command is shown
+without them. With --daemon, the command is run in a warm
+cage_daemon.py instead.
+
+Author: Andrew Tarzia
+
+Date Created: 19 Oct 2026
+
+"""
+
+import os
+import sys
+import runpy
+import argparse
+
+
+# group: {command: (script relative to this file, description)}
+COMMANDS = {
+    'extraction': {
+        'to_pdbs': (
+            'CSD_API_python3/REFCODEs_to_PDBs.py',
+            'REFCODEs to PDBs (and CSD bond tables)'
+        ),
+        'to_cifs': (
+            'CSD_API_python3/REFCODEs_to_CIFs.py', 'REFCODEs to CIFs'
+        ),
+        'to_asu': (
+            'CSD_API_python3/REFCODEs_to_ASU.py',
+            'REFCODEs to asymmetric units (RC_asu.json)'
+        ),
+        'metadata': (
+            'CSD_API_python3/get_family_metadata.py',
+            'quality metadata of REFCODEs'
+        ),
+        'solvent_info': (
+            'CSD_API_python3/get_solvent_info.py',
+            'solvent information of REFCODEs'
+        ),
+        'from_author': (
+            'CSD_API_python3/get_from_author.py',
+            'search CSD for cages by author'
+        ),
+        'from_ccdc': (
+            'CSD_API_python3/get_from_CCDC.py',
+            'collect CIFs by CCDC number'
+        ),
+        'families': (
+            'refcode_families.py',
+            'select a representative of each REFCODE family'
+        ),
+    },
+    'sorting': {
+        'sort': (
+            'sort_structures.py',
+            'sort CIFs or PDBs by their pyWindow results'
+        ),
+        'extract_cages': (
+            'extract_indep_cages.py', 'extract independent cages of a CIF'
+        ),
+        'most_porous': (
+            'extract_most_porous.py',
+            'extract the most porous molecule of rebuilt pdbs'
+        ),
+    },
+    'classification': {
+        'classify': (
+            'classify_structures.py',
+            'classify structures by the molecules they contain'
+        ),
+        'asymmetric_unit': (
+            'analyse_asymmetric_unit.py',
+            'analyse symmetry-unique molecules of asymmetric units'
+        ),
+        'query': (
+            'query_cages.py', 'build and query an index of results'
+        ),
+        'fingerprints': (
+            'cage_fingerprints.py', 'shape fingerprints of cages'
+        ),
+        'sweep': (
+            'sweep_settings.py', 'grid of rebuild and analysis settings'
+        ),
+        'benchmark_windows': (
+            'benchmark_windows.py',
+            'benchmark the graph window engine against pyWindow'
+        ),
+        'shape': (
+            'test_shape.py', 'shape persistency of a cage molecule'
+        ),
+    },
+    'solvent removal': {
+        'remove_solvent': (
+            'remove_solvent.py', 'remove all non-cage molecules'
+        ),
+    },
+    'COM appending': {
+        'append_com': (
+            'pore_topologies/append_all_COM.py',
+            'append window and cage COMs to CIFs'
+        ),
+    },
+    'collation': {
+        'collate_windows': (
+            'pore_topologies/collate_window_sizes.py',
+            'collate window sizes of all cages'
+        ),
+        'network': (
+            'pore_topologies/cage_network.py',
+            'periodic cage-window networks'
+        ),
+        'sketches': (
+            'pore_topologies/size_sketches.py',
+            'streaming pore and window size distributions'
+        ),
+    },
+    'utilities': {
+        'cifs_to_gcd': (
+            'utils/CIFs_to_GCD.py', '.gcd of the CIFs in a directory'
+        ),
+        'pdbs_to_gcd': (
+            'utils/PDBs_to_GCD.py', '.gcd of the PDBs in a directory'
+        ),
+        'compare_db': (
+            'utils/compare_DB_REFCODES.py',
+            'compare the REFCODEs of two DB files'
+        ),
+        'cif_split': (
+            'utils/cif_split.py', 'split collated CSD CIF files'
+        ),
+        'analyse_cifs': (
+            'utils/analyse_CIFs.py', 'analyse CIFs in a directory'
+        ),
+        'n_atoms': (
+            'utils/number_atoms_per_UC.py',
+            'number of atoms in the unit cell of CIFs'
+        ),
+        'prepare': (
+            'utils/structure_preparation.py',
+            'clean up duplicate atom disorder'
+        ),
+        'atomtyper': (
+            'utils/run_atomtyper.py', 'run the atom typer on a structure'
+        ),
+        'schedule': (
+            'cost_scheduler.py',
+            'run a command on structures, largest cost first'
+        ),
+        'pipeline': (
+            'pipeline_dag.py',
+            'run the per-REFCODE pipeline, skipping unchanged stages'
+        ),
+        'stream': (
+            'stream_pipeline.py',
+            'stream REFCODEs from the CSD to classification results'
+        ),
+        'daemon': (
+            'cage_daemon.py', 'warm worker daemon for commands'
+        ),
+    },
+}
+
+
+def script_of(command):
+    """
+    Get the absolute path of the script of a command.
+
+    Returns:
+        (str) - path of script, None if command is unknown
+
+    """
+    for group in COMMANDS.values():
+        if command in group:
+            return os.path.join(
+                os.path.dirname(os.path.abspath(__file__)), group[command][0]
+            )
+    return None
+
+
+def command_list():
+    """
+    Text listing commands by group.
+
+    """
+    lines = ['commands:']
+    for group, commands in COMMANDS.items():
+        lines.append(f'  {group}:')
+        for command, (_, description) in commands.items():
+            lines.append(f'    {command:<18}{description}')
+    return '\n'.join(lines)
+
+
+def run_script(script, args):
+    """
+    Run script as __main__ in this process, with args as its arguments.
+
+    """
+    sys.argv = [script] + args
+    # as python does for a script
+    sys.path.insert(0, os.path.dirname(script))
+    runpy.run_path(script, run_name='__main__')
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Collect and analyse cage structures from the CSD.',
+        epilog=command_list(),
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument(
+        '--daemon', action='store_true',
+        help='run command in a running cage_daemon.py'
+    )
+    parser.add_argument(
+        '--socket', default=None,
+        help='Unix socket of the daemon (default of cage_daemon.py)'
+    )
+    parser.add_argument('command', help='command to run')
+    parser.add_argument(
+        'args', nargs=argparse.REMAINDER, help='arguments of command'
+    )
+    args = parser.parse_args()
+
+    script = script_of(args.command)
+    if script is None:
+        parser.error(f'unknown command {args.command}\n\n{command_list()}')
+    if args.daemon:
+        from cage_client import run_script as run_in_daemon
+        from cage_daemon import default_socket
+        socket_file = args.socket or default_socket()
+        sys.exit(run_in_daemon(script, args.args, socket_file))
+    run_script(script, args.args)
+
+
+if __name__ == "__main__":
+    main()
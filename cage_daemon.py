@@ -0,0 +1,337 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# Distributed under the terms of the MIT License.
+
+"""
+Warm worker daemon for running the scripts of this repository without
+paying their startup cost on every call.
+
+The daemon imports the heavy modules (pandas, ASE, pymatgen, pyWindow,
+atools, the CSD API), binds a Unix socket and forks --max_jobs
+long-lived workers that accept jobs (script and arguments, sent by
+cage_client.py) on it. A worker runs each job in-process with runpy,
+so it starts with all modules already imported, and sends the
+job's stdout and stderr back to the client, followed by the exit code
+of the script. Later requests wait for a free worker.
+
+Jobs of a worker share its imported modules: the working directory,
+sys.argv, sys.path and logging are restored after each job, other
+module state is not. A worker is replaced after --worker_jobs jobs to
+bound what accumulates.
+
+The CSD entry reader is not opened in the daemon: its sqlite
+connections must not be shared between processes, so each worker
+opens its own (with --csd_reader, on start) and reuses it for all of
+its jobs (CSD_f.get_entryreader).
+
+Usage:
+    python cage_daemon.py [--socket SOCKET] [--max_jobs N] \
+        [--worker_jobs N] [--csd_reader] &
+    python cage_client.py remove_solvent.py XXXX_extracted.pdb NONE
+    python cage_client.py --stop
+
+Author: Andrew Tarzia
+
+Date Created: 19 Oct 2026
+
+"""
+
+import os
+import sys
+import json
+import runpy
+import signal
+import socket
+import logging
+import argparse
+import tempfile
+import importlib
+import traceback
+
+
+# modules imported by the scripts that are slow to import
+WARM_MODULES = [
+    'numpy', 'scipy.spatial', 'pandas', 'ase.io', 'pymatgen',
+    'pywindow', 'atools', 'ccdc.io', 'ccdc.search'
+]
+
+# marks the exit code of a job at the end of its output
+EXIT_MARK = b'\x00cage_daemon exit '
+
+
+def default_socket():
+    """
+    Default socket of the daemon of this user.
+
+    """
+    return os.path.join(
+        tempfile.gettempdir(), f'cage_daemon-{os.getuid()}.sock'
+    )
+
+
+def warm_imports(modules=WARM_MODULES):
+    """
+    Import modules, skipping those that are not installed.
+
+    Returns:
+        (list) - names of imported modules
+
+    """
+    loaded = []
+    for name in modules:
+        try:
+            importlib.import_module(name)
+        except ImportError as e:
+            logging.info(f'> not warming {name}: {e}')
+            continue
+        loaded.append(name)
+    logging.info(f'> warmed: {", ".join(loaded)}')
+    return loaded
+
+
+def warm_csd_api(open_reader=False):
+    """
+    Import CSD_f (and the CSD API) for jobs of the CSD_API_python3
+    scripts and, in a worker, open its entry reader.
+
+    """
+    sys.path.insert(0, os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), 'CSD_API_python3'
+    ))
+    import CSD_f
+    if open_reader:
+        CSD_f.get_entryreader()
+    else:
+        logging.info(f'> warmed {CSD_f.__name__}')
+
+
+def read_request(conn):
+    """
+    Read the JSON request line of a connection.
+
+    """
+    with conn.makefile('rb') as f:
+        line = f.readline()
+    return json.loads(line.decode())
+
+
+def run_job(conn, request):
+    """
+    Run the script of request in this worker.
+
+    stdout and stderr are redirected to conn, and the exit code is
+    sent after the output. The working directory, sys.argv, sys.path
+    and logging handlers of the worker are restored afterwards, so
+    that only imported modules (and their state, e.g. the CSD entry
+    reader) are kept between jobs.
+
+    Returns:
+        (int) - exit code of the script
+
+    """
+    code = 1
+    saved_fds = (os.dup(1), os.dup(2))
+    cwd = os.getcwd()
+    argv = list(sys.argv)
+    path = list(sys.path)
+    handlers = list(logging.root.handlers)
+    level = logging.root.level
+    try:
+        os.chdir(request['cwd'])
+        sys.stdout.flush()
+        sys.stderr.flush()
+        os.dup2(conn.fileno(), 1)
+        os.dup2(conn.fileno(), 2)
+        script = request['script']
+        sys.argv = [script] + request['args']
+        # as python does for a script
+        sys.path.insert(0, os.path.dirname(script))
+        # scripts configure logging in their __main__ block
+        logging.root.handlers = []
+        try:
+            runpy.run_path(script, run_name='__main__')
+            code = 0
+        except SystemExit as e:
+            if e.code is None:
+                code = 0
+            elif isinstance(e.code, int):
+                code = e.code
+            else:
+                print(e.code, file=sys.stderr)
+                code = 1
+        except BaseException:
+            traceback.print_exc()
+    finally:
+        try:
+            sys.stdout.flush()
+            sys.stderr.flush()
+            conn.sendall(EXIT_MARK + f'{code}\n'.encode())
+        except OSError:
+            # client went away
+            pass
+        os.dup2(saved_fds[0], 1)
+        os.dup2(saved_fds[1], 2)
+        for fd in saved_fds:
+            os.close(fd)
+        os.chdir(cwd)
+        sys.argv = argv
+        sys.path[:] = path
+        logging.root.handlers = handlers
+        logging.root.setLevel(level)
+    return code
+
+
+def worker(server, worker_jobs, csd_reader):
+    """
+    Accept and run jobs on server until worker_jobs jobs were run or
+    the daemon stops.
+
+    A worker is stopped with SIGTERM: immediately if it is waiting for
+    a job, otherwise after its job.
+
+    """
+    state = {'busy': False, 'stop': False}
+
+    def terminate(*args):
+        if not state['busy']:
+            os._exit(0)
+        state['stop'] = True
+
+    signal.signal(signal.SIGTERM, terminate)
+    # scripts wait for their own subprocesses
+    signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+    if csd_reader:
+        warm_csd_api(open_reader=True)
+    n_jobs = 0
+    while n_jobs < worker_jobs and not state['stop']:
+        conn, _ = server.accept()
+        state['busy'] = True
+        with conn:
+            try:
+                request = read_request(conn)
+            except (ValueError, OSError) as e:
+                logging.warning(f'> bad request: {e}')
+                request = {'command': None}
+            command = request.get('command', 'run')
+            if command == 'stop':
+                conn.sendall(b'stopping\n')
+                os.kill(os.getppid(), signal.SIGTERM)
+                break
+            elif command == 'ping':
+                conn.sendall(
+                    f'{os.getppid()} worker {os.getpid()} '
+                    f'{n_jobs}\n'.encode()
+                )
+            elif command == 'run':
+                run_job(conn, request)
+                n_jobs += 1
+        state['busy'] = False
+
+
+def spawn_worker(server, worker_jobs, csd_reader):
+    """
+    Fork a worker.
+
+    Returns:
+        (int) - pid of worker
+
+    """
+    pid = os.fork()
+    if pid == 0:
+        try:
+            worker(server, worker_jobs, csd_reader)
+        finally:
+            os._exit(0)
+    return pid
+
+
+def serve(socket_file, max_jobs, worker_jobs=100, csd_reader=False):
+    """
+    Run max_jobs workers accepting jobs on socket_file until a stop
+    request, replacing workers that exit (after worker_jobs jobs).
+
+    """
+    if os.path.exists(socket_file):
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(socket_file)
+        except (ConnectionRefusedError, FileNotFoundError):
+            # left by a daemon that died
+            os.remove(socket_file)
+        else:
+            sys.exit(f'a daemon is already listening on {socket_file}')
+        finally:
+            probe.close()
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(socket_file)
+    os.chmod(socket_file, 0o600)
+    server.listen(64)
+    signal.signal(signal.SIGTERM, lambda *args: sys.exit(0))
+    workers = set()
+    n_spawned = 0
+    try:
+        for _ in range(max_jobs):
+            workers.add(spawn_worker(server, worker_jobs, csd_reader))
+        n_spawned = len(workers)
+        logging.info(f'> listening on {socket_file}, {max_jobs} workers')
+        while True:
+            pid, _ = os.wait()
+            workers.discard(pid)
+            workers.add(spawn_worker(server, worker_jobs, csd_reader))
+            n_spawned += 1
+    finally:
+        signal.signal(signal.SIGTERM, signal.SIG_IGN)
+        for pid in workers:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        # running jobs are finished first
+        for pid in workers:
+            try:
+                os.waitpid(pid, 0)
+            except ChildProcessError:
+                pass
+        server.close()
+        if os.path.exists(socket_file):
+            os.remove(socket_file)
+        logging.info(f'> stopped after starting {n_spawned} workers')
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Warm worker daemon for the scripts of this repository.'
+    )
+    parser.add_argument(
+        '--socket', default=default_socket(),
+        help='Unix socket to listen on'
+    )
+    parser.add_argument(
+        '--modules', nargs='*', default=[],
+        help='further modules to import before accepting jobs'
+    )
+    parser.add_argument(
+        '--max_jobs', type=int, default=os.cpu_count(),
+        help='number of workers (maximum number of jobs running at once)'
+    )
+    parser.add_argument(
+        '--worker_jobs', type=int, default=100,
+        help='number of jobs after which a worker is replaced'
+    )
+    parser.add_argument(
+        '--csd_reader', action='store_true',
+        help=(
+            'import CSD_f for jobs of the CSD_API_python3 scripts; each '
+            'worker opens its own entry reader and reuses it for its jobs'
+        )
+    )
+    args = parser.parse_args()
+    warm_imports(WARM_MODULES + args.modules)
+    if args.csd_reader:
+        warm_csd_api()
+    serve(args.socket, args.max_jobs, args.worker_jobs, args.csd_reader)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='')
+    main()
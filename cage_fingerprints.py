@@ -0,0 +1,360 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# Distributed under the terms of the MIT License.
+
+"""
+Script to compute rotation-invariant shape fingerprints of extracted
+cages (_MP_*.pdb from classify_structures.py) and search them for
+nearest neighbours.
+
+Fingerprints are computed in vectorized batches and contain:
+    - normalised principal moments, radius of gyration, asphericity
+      and acylindricity
+    - histogram of atom distances from the centre of mass
+    - smallest, mean and largest window diameter (0 without windows),
+      from pyWindow or (experimental, window_engine=graph) from the
+      molecular graph and convex hull (window_engine.py)
+    - pore diameter and number of windows (from the output of
+      classify_structures.py, if given)
+
+The fingerprints are standardised and stored on disk with an inverted
+file (IVF) index: k-means centroids partition the library and queries
+only scan the lists of the nearest centroids.
+
+Author: Andrew Tarzia
+
+Date Created: 19 Oct 2026
+
+"""
+
+import sys
+import logging
+import os
+import re
+import numpy as np
+from scipy.cluster.vq import kmeans2, vq
+
+from analysis_f import warn_engine
+
+
+RADIAL_BINS = np.linspace(0, 20, 21)
+
+
+def read_pdb_arrays(file):
+    """
+    Read elements and coordinates of ATOM/HETATM lines of a PDB.
+
+    """
+    elements = []
+    coordinates = []
+    with open(file, 'r') as f:
+        for line in f:
+            if line[:6] not in ['ATOM  ', 'HETATM']:
+                continue
+            coordinates.append(
+                (float(line[30:38]), float(line[38:46]), float(line[46:54]))
+            )
+            element = line[76:78].strip()
+            if element == '':
+                element = re.sub(r'[^A-Za-z]', '', line[12:16])[:2]
+            elements.append(element.title())
+    return np.array(elements), np.array(coordinates, dtype=float)
+
+
+def shape_fingerprints(coordinates, n_atoms):
+    """
+    Compute shape descriptors of a batch of molecules.
+
+    Keyword Arguments:
+        coordinates (ndarray) - (N, 3) coordinates of all molecules,
+            concatenated
+        n_atoms (ndarray) - number of atoms of each molecule
+
+    Returns:
+        (ndarray) - (n_molecules, n_descriptors) fingerprints
+
+    """
+    n_atoms = np.asarray(n_atoms)
+    starts = np.concatenate([[0], np.cumsum(n_atoms)[:-1]])
+    segment = np.repeat(np.arange(len(n_atoms)), n_atoms)
+    # unit masses: hydrogens are often missing in XRD structures
+    coms = np.add.reduceat(coordinates, starts, axis=0) / n_atoms[:, None]
+    centred = coordinates - coms[segment]
+    # gyration tensors of all molecules at once
+    outer = np.einsum('ni,nj->nij', centred, centred)
+    gyration = np.add.reduceat(outer, starts, axis=0) / n_atoms[:, None, None]
+    eigvals = np.linalg.eigvalsh(gyration)
+    l1, l2, l3 = eigvals[:, 0], eigvals[:, 1], eigvals[:, 2]
+    rg2 = l1 + l2 + l3
+    safe_rg2 = np.where(rg2 > 0, rg2, 1.0)
+    asphericity = (l3 - 0.5 * (l1 + l2)) / safe_rg2
+    acylindricity = (l2 - l1) / safe_rg2
+    safe_l3 = np.where(l3 > 0, l3, 1.0)
+    # radial distribution from COM, normalised by number of atoms
+    distances = np.linalg.norm(centred, axis=1)
+    n_bins = len(RADIAL_BINS) - 1
+    bins = np.clip(
+        np.digitize(distances, RADIAL_BINS) - 1, 0, n_bins - 1
+    )
+    radial = np.bincount(
+        segment * n_bins + bins, minlength=len(n_atoms) * n_bins
+    ).reshape(len(n_atoms), n_bins) / n_atoms[:, None]
+    return np.column_stack([
+        l1 / safe_l3, l2 / safe_l3, np.sqrt(rg2),
+        asphericity, acylindricity, radial
+    ])
+
+
+def window_fingerprint(elements, coordinates, name='', engine='pywindow'):
+    """
+    Smallest, mean and largest window diameter of a cage, all 0 if no
+    windows are found.
+
+    Keyword Arguments:
+        elements (ndarray) - element of each atom
+        coordinates (ndarray) - (N, 3) coordinates
+        name (str) - name of cage for logging
+        engine (str) - window detection engine, pywindow or graph
+
+    """
+    if engine == 'graph':
+        from window_engine import find_windows
+        diameters, _ = find_windows(elements, coordinates)
+    else:
+        import pywindow as pw
+        mol = pw.molecular.Molecule(
+            {'elements': elements, 'coordinates': coordinates}, name, 0
+        )
+        try:
+            diameters = mol.calculate_windows()
+        except ValueError:
+            logging.warning(f'{name} failed pywindow calculate_windows.')
+            diameters = None
+        if diameters is None:
+            diameters = np.empty(0)
+        diameters = np.asarray(diameters)
+    if len(diameters) == 0:
+        return (0.0, 0.0, 0.0)
+    return (diameters.min(), diameters.mean(), diameters.max())
+
+
+def cage_key(file):
+    """
+    (REFCODE, molecule) of a _MP_ cage file, None for other files.
+
+    """
+    match = re.match(r'(.+)_MP_(\d+)\.pdb$', os.path.basename(file))
+    if match is None:
+        return None
+    return match.group(1), int(match.group(2))
+
+
+def fingerprint_files(files, properties=None, batch_size=1000,
+                      engine='pywindow'):
+    """
+    Compute fingerprints of cage PDB files in batches.
+
+    Keyword Arguments:
+        files (list) - cage PDB files
+        properties (dict) - (REFCODE, molecule): (pore_diam_opt,
+            no_windows), see read_properties
+        batch_size (int) - number of molecules per vectorized batch
+        engine (str) - window detection engine, pywindow or graph
+
+    """
+    if properties is None:
+        properties = {}
+    fingerprints = []
+    for i in range(0, len(files), batch_size):
+        batch = files[i:i+batch_size]
+        arrays = [read_pdb_arrays(file) for file in batch]
+        coords = [j[1] for j in arrays]
+        n_atoms = np.array([len(j) for j in coords])
+        shape = shape_fingerprints(np.concatenate(coords), n_atoms)
+        windows = np.array([
+            window_fingerprint(elements, coordinates, file, engine)
+            for file, (elements, coordinates) in zip(batch, arrays)
+        ], dtype=float)
+        props = np.array([
+            properties.get(cage_key(file), (np.nan, np.nan))
+            for file in batch
+        ], dtype=float)
+        fingerprints.append(np.column_stack([shape, windows, props]))
+        logging.info(f'> fingerprinted {i+len(batch)} of {len(files)}')
+    return np.concatenate(fingerprints)
+
+
+def read_properties(classification_file):
+    """
+    Read pore diameter and window number of _MP_ files.
+
+    Returns:
+        (dict) - (REFCODE, molecule): (pore_diam_opt, no_windows), to
+            be matched to files with cage_key
+
+    """
+    properties = {}
+    with open(classification_file, 'r') as f:
+        f.readline()
+        for line in f:
+            RC, molec, pdo, nwind = line.rstrip().split(',')
+            # pandas may write molecule ids as floats
+            properties[(RC, int(float(molec)))] = (float(pdo), float(nwind))
+    return properties
+
+
+class FingerprintIndex:
+    """
+    Inverted file index of standardised fingerprints on disk.
+
+    Files in index_dir:
+        vectors.npy - standardised fingerprints, in list order
+        ivf.npz - centroids, list offsets, feature mean and std, window
+            engine
+        names.txt - cage file of each vector, in list order
+
+    """
+
+    def __init__(self, index_dir):
+        self.index_dir = index_dir
+        data = np.load(os.path.join(index_dir, 'ivf.npz'))
+        self.centroids = data['centroids']
+        self.offsets = data['offsets']
+        self.mean = data['mean']
+        self.std = data['std']
+        # indices built before the engine was stored used the graph
+        self.engine = str(data['engine']) if 'engine' in data else 'graph'
+        self.vectors = np.load(
+            os.path.join(index_dir, 'vectors.npy'), mmap_mode='r'
+        )
+        with open(os.path.join(index_dir, 'names.txt'), 'r') as f:
+            self.names = [i.rstrip() for i in f.readlines()]
+
+    @staticmethod
+    def build(index_dir, names, fingerprints, n_lists=None,
+              engine='pywindow'):
+        """
+        Standardise fingerprints, cluster them and write the index.
+
+        """
+        os.makedirs(index_dir, exist_ok=True)
+        mean = np.nanmean(fingerprints, axis=0)
+        std = np.nanstd(fingerprints, axis=0)
+        std[std == 0] = 1.0
+        vectors = (fingerprints - mean) / std
+        # missing properties are set to the library mean
+        vectors = np.nan_to_num(vectors).astype(np.float32)
+        if n_lists is None:
+            n_lists = max(1, int(np.sqrt(len(vectors))))
+        n_lists = min(n_lists, len(vectors))
+        # train centroids on a sample, then assign all vectors
+        rng = np.random.default_rng(1)
+        n_train = min(len(vectors), 50 * n_lists)
+        sample = rng.choice(len(vectors), n_train, replace=False)
+        centroids, _ = kmeans2(
+            vectors[sample].astype(float), n_lists, minit='points',
+            seed=1
+        )
+        labels, _ = vq(vectors.astype(float), centroids)
+        order = np.argsort(labels, kind='mergesort')
+        offsets = np.concatenate(
+            [[0], np.cumsum(np.bincount(labels, minlength=n_lists))]
+        )
+        np.save(os.path.join(index_dir, 'vectors.npy'), vectors[order])
+        np.savez(
+            os.path.join(index_dir, 'ivf.npz'),
+            centroids=centroids, offsets=offsets, mean=mean, std=std,
+            engine=engine
+        )
+        with open(os.path.join(index_dir, 'names.txt'), 'w') as f:
+            for i in order:
+                f.write(names[i] + '\n')
+
+    def standardise(self, fingerprint):
+        vector = (np.asarray(fingerprint, dtype=float) - self.mean)
+        return np.nan_to_num(vector / self.std)
+
+    def vector_of(self, name):
+        return np.asarray(self.vectors[self.names.index(name)])
+
+    def query(self, vector, k=10, n_probe=8):
+        """
+        Return the k nearest (name, distance) of a standardised vector.
+
+        """
+        to_centroids = np.linalg.norm(self.centroids - vector, axis=1)
+        probes = np.argsort(to_centroids)[:n_probe]
+        candidates = np.concatenate([
+            np.arange(self.offsets[i], self.offsets[i+1]) for i in probes
+        ])
+        distances = np.linalg.norm(
+            self.vectors[candidates] - vector, axis=1
+        )
+        best = np.argsort(distances)[:k]
+        return [
+            (self.names[candidates[i]], float(distances[i])) for i in best
+        ]
+
+
+def main():
+    if (len(sys.argv) < 4):
+        print("""
+    Usage: cage_fingerprints.py mode index_dir ...
+        build index_dir string [classification_file] [window_engine=graph] :
+            fingerprint all cage PDBs matching string
+            ('*_MP_*.pdb', files with '_coms' are ignored) and write
+            the index to index_dir. Pore diameters and window numbers
+            are read from classification_file (output of
+            classify_structures.py). Windows are found with pyWindow,
+            or with window_engine=graph (experimental, not yet
+            benchmarked) from the molecular graph and convex hull
+            (window_engine.py).
+        query index_dir pdb [k] :
+            print the k (default 10) nearest cages to pdb (a file in the
+            index or any cage PDB, whose windows are found with the
+            engine of the index)
+        """)
+        sys.exit()
+    engine = 'pywindow'
+    argv = []
+    for i in sys.argv:
+        if i.startswith('window_engine='):
+            engine = i.split('=', 1)[1]
+        else:
+            argv.append(i)
+    if engine not in ['pywindow', 'graph']:
+        sys.exit(f'unknown window engine {engine}')
+    mode = argv[1]
+    index_dir = argv[2]
+    if mode == 'build':
+        from glob import glob
+        warn_engine(engine)
+        files = sorted([
+            i for i in glob(argv[3]) if '_coms' not in i
+        ])
+        logging.info(f'> {len(files)} cages to fingerprint')
+        properties = None
+        if len(argv) == 5:
+            properties = read_properties(argv[4])
+        fingerprints = fingerprint_files(files, properties, engine=engine)
+        FingerprintIndex.build(index_dir, files, fingerprints, engine=engine)
+    elif mode == 'query':
+        pdb = argv[3]
+        k = int(argv[4]) if len(argv) == 5 else 10
+        index = FingerprintIndex(index_dir)
+        if pdb in index.names:
+            vector = index.vector_of(pdb)
+        else:
+            warn_engine(index.engine)
+            vector = index.standardise(
+                fingerprint_files([pdb], engine=index.engine)[0]
+            )
+        for name, distance in index.query(vector, k=k):
+            print(f'{name},{distance:.4f}')
+    else:
+        sys.exit(f'unknown mode {mode}')
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='')
+    main()
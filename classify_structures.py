@@ -13,26 +13,142 @@ Date Created: 23 May 2019
 
 import logging
 import sys
-import pandas as pd
+import argparse
 import os
-import atools
+from analysis_f import analyse_molecule, warn_engine
+from periodic_molecules import modularize, iter_molecules
+from pore_estimator import prescreen
+from solvent_library import split_solvents, write_solvent_report
 
 
 def main():
-    if (not len(sys.argv) == 3):
-        print("""
-    Usage: classify_structures.py DB_file output_file
-        DB_file (str) - file with initial list of REFCODEs
-        output_file (str) - file to output results of sorting to
-        """)
+    parser = argparse.ArgumentParser(
+        description=(
+            'Classify CIFs based on the molecules in the CIF.'
+        )
+    )
+    parser.add_argument(
+        'DB_file', help='file with initial list of REFCODEs'
+    )
+    parser.add_argument(
+        'output_file', help='file to output results of sorting to'
+    )
+    parser.add_argument(
+        '--analysis_cache', default=None,
+        help=(
+            'JSON file of pyWindow results keyed by molecular graph '
+            'hash, reused for the same cage across REFCODEs'
+        )
+    )
+    parser.add_argument(
+        '--family_metadata', default=None,
+        help=(
+            'quality metadata of REFCODEs (from get_family_metadata.py); '
+            'if given, only the representative of each REFCODE family '
+            'is processed'
+        )
+    )
+    parser.add_argument(
+        '--include_deferred', action='store_true',
+        help=(
+            'with --family_metadata, process the other family members '
+            'after all representatives'
+        )
+    )
+    parser.add_argument(
+        '--provenance', action='store_true',
+        help=(
+            'stamp results with provenance keys (output_file'
+            '.provenance.json) and recompute only results whose inputs, '
+            'parameters or pyWindow/atools code changed'
+        )
+    )
+    parser.add_argument(
+        '--bond_tables', action='store_true',
+        help=(
+            'build molecules from the CSD bond table (RC_extracted_bonds'
+            '.csv from REFCODEs_to_PDBs.py) where available, instead of '
+            'the pyWindow rebuild'
+        )
+    )
+    parser.add_argument(
+        '--prescreen', type=float, default=None, metavar='MARGIN',
+        help=(
+            'only run pyWindow on molecules whose upper bound of the pore '
+            'diameter (pore_estimator.py) is greater than -MARGIN '
+            'Angstrom; other molecules are skipped'
+        )
+    )
+    parser.add_argument(
+        '--window_engine', choices=['pywindow', 'graph'],
+        default='pywindow',
+        help=(
+            'find windows with pyWindow sampling or (experimental, not '
+            'yet benchmarked) from the molecular graph and convex hull '
+            '(window_engine.py)'
+        )
+    )
+    parser.add_argument(
+        '--stream', action='store_true',
+        help=(
+            'rebuild molecules one at a time by periodic graph traversal '
+            '(periodic_molecules.py) to bound memory use; molecule ids '
+            'follow the traversal order'
+        )
+    )
+    parser.add_argument(
+        '--solvent_library', action='store_true',
+        help=(
+            'skip molecules matching the library of common solvents and '
+            'counter-ions (solvent_library.py) and report them per '
+            'REFCODE in output_file.solvents.csv'
+        )
+    )
+    parser.add_argument(
+        '--queue', default=None, metavar='QUEUE_DIR',
+        help=(
+            'shared directory of a lease-based work queue (work_queue.py) '
+            'so that several nodes can classify the same DB_file; each '
+            'process writes a shard (with its provenance ledger), reused '
+            'by the same slot of its host on the next run, that is merged '
+            'into output_file'
+        )
+    )
+    if len(sys.argv) == 1:
+        # as before the options were added, print usage and exit
+        parser.print_help()
         sys.exit()
-    else:
-        DB_file = sys.argv[1]
-        output_file = sys.argv[2]
+    args = parser.parse_args()
+    import pandas as pd
+    warn_engine(args.window_engine)
+    DB_file = args.DB_file
+    output_file = args.output_file
+    cache = None
+    if args.analysis_cache is not None:
+        from graph_hash import AnalysisCache
+        cache = AnalysisCache(args.analysis_cache)
 
     refcodes = sorted([i.rstrip() for i in open(DB_file, 'r').readlines()])
+    if args.family_metadata is not None:
+        from refcode_families import read_quality_metadata, order_by_family
+        refcodes, deferred = order_by_family(
+            refcodes, read_quality_metadata(args.family_metadata)
+        )
+        logging.info(
+            f'> {len(refcodes)} family representatives, '
+            f'{len(deferred)} deferred.'
+        )
+        if args.include_deferred:
+            refcodes = refcodes + deferred
     pdbs = [i+'_extracted.pdb' for i in refcodes]
     logging.info(f'> started with: {len(refcodes)} structures to classify.')
+    queue = None
+    if args.queue is not None:
+        from work_queue import WorkQueue
+        queue = WorkQueue(args.queue)
+        # results of this node go to its own shard
+        merged_file = output_file
+        output_file = queue.shard_file(output_file)
 
     if os.path.isfile(output_file):
         # read CIFs already checked to avoid double calculations
@@ -46,6 +162,35 @@ def main():
         OUTDATA = pd.read_csv(output_file)
         done_RCs = []
 
+    ledger = None
+    if args.provenance:
+        from provenance import ProvenanceLedger
+        ledger = ProvenanceLedger(
+            output_file + '.provenance.json',
+            params={
+                'modularize': {
+                    'bond_tables': args.bond_tables, 'stream': args.stream
+                },
+                'analysis': {
+                    'min_atoms': 5,
+                    'prescreen': args.prescreen,
+                    'solvent_library': args.solvent_library,
+                    'window_engine': args.window_engine
+                }
+            }
+        )
+        redo = [
+            i for i in done_RCs
+            if ledger.invalidate(i, i+'_extracted.pdb')
+        ]
+        ledger.save()
+        OUTDATA = OUTDATA[~OUTDATA['REFCODE'].isin(redo)]
+        done_RCs = [i for i in done_RCs if i not in redo]
+        logging.info(f'> {len(redo)} structures invalidated.')
+        if queue is not None:
+            for i in redo:
+                queue.reopen(i)
+
     # iterate over CIFs
     count = len(done_RCs)
     for pdb in pdbs:
@@ -53,34 +198,61 @@ def main():
         # skip done cifs
         if RC in done_RCs:
             continue
+        if queue is not None and not queue.claim(RC):
+            # done or being done by another node
+            continue
         if os.path.isfile(pdb) is False:
             raise(f'{pdb} not present!')
         logging.info(f'> doing {count} of {len(pdbs)}: {RC}')
-        # load and modularize pdb
-        rbs = atools.modularize(file=pdb)
-        if rbs is None:
-            # handle pyWindow failure
-            raise(f'{pdb} failed modularize!')
+        solvents = []
+        if args.stream:
+            # molecules are rebuilt one at a time and discarded after
+            # analysis
+            molecules = iter_molecules(pdb, bond_tables=args.bond_tables)
+        else:
+            # load and modularize pdb
+            rbs = modularize(pdb, bond_tables=args.bond_tables)
+            if rbs is None:
+                # handle pyWindow failure
+                raise(f'{pdb} failed modularize!')
+            Mol = rbs.molecules
+            to_analyse = list(Mol)
+            if args.solvent_library:
+                # skip known solvents and counter-ions
+                to_analyse, solvents = split_solvents(Mol)
+            to_analyse = [i for i in to_analyse if Mol[i].no_of_atoms >= 5]
+            if args.prescreen is not None:
+                # reject clearly non-porous molecules in one batch
+                to_analyse = prescreen(
+                    {i: Mol[i] for i in to_analyse},
+                    threshold=0.0,
+                    margin=args.prescreen
+                )
+            molecules = ((i, Mol[i]) for i in to_analyse)
         # iterate over all molecules, skipping those with n_atoms < 5
-        Mol = rbs.molecules
-        for molec in Mol:
-            mol = Mol[molec]
-            if mol.no_of_atoms < 5:
-                continue
-            # run analysis
-            try:
-                analysis = mol.full_analysis()
-            except ValueError:
-                logging.warning(f'{pdb}_{molec} failed pywindow full_analysis.')
-                analysis = None
+        for molec, mol in molecules:
+            if args.stream:
+                if args.solvent_library:
+                    others, found = split_solvents({molec: mol})
+                    solvents.extend(found)
+                    if len(others) == 0:
+                        continue
+                if mol.no_of_atoms < 5:
+                    continue
+                if args.prescreen is not None and not prescreen(
+                    {molec: mol}, threshold=0.0, margin=args.prescreen
+                ):
+                    continue
+            # run analysis (or reuse that of an identical cage)
+            result, reused = analyse_molecule(
+                mol, name=f'{pdb}_{molec}', cache=cache,
+                engine=args.window_engine
+            )
             # define output
-            if analysis is None:
+            if result is None:
                 continue
-            pdo = analysis['pore_diameter_opt']['diameter']
-            if analysis['windows']['diameters'] is not None:
-                nwind = len(analysis['windows']['diameters'])
-            else:
-                nwind = 0
+            pdo = result['pore_diam_opt']
+            nwind = result['no_windows']
             # if it is a cage:
             if pdo > 0.0 and nwind >= 2:
                 # add to output
@@ -89,14 +261,28 @@ def main():
                                           'no_windows': nwind},
                                          ignore_index=True)
                 # output structure
-                Mol[molec].dump_molecule(
-                    RC + "_MP_{0}_coms.pdb".format(molec),
-                    include_coms=True,
-                    override=True)
-                Mol[molec].dump_molecule(
+                # (COMs are only known if pyWindow full_analysis was run
+                # here)
+                if not reused and args.window_engine == 'pywindow':
+                    mol.dump_molecule(
+                        RC + "_MP_{0}_coms.pdb".format(molec),
+                        include_coms=True,
+                        override=True)
+                elif reused:
+                    logging.info(
+                        f'> {RC}_MP_{molec}_coms.pdb not written, result '
+                        'reused from the analysis cache'
+                    )
+                mol.dump_molecule(
                     RC + "_MP_{0}.pdb".format(molec),
                     include_coms=False,
                     override=True)
+        if queue is not None and not queue.holds(RC):
+            # lease lost, RC is classified again by another node
+            OUTDATA = OUTDATA[OUTDATA['REFCODE'] != RC]
+            continue
+        if args.solvent_library:
+            write_solvent_report(output_file + '.solvents.csv', RC, solvents)
         if RC not in list(set(list(OUTDATA['REFCODE']))):
             # add to output empty line.
             OUTDATA = OUTDATA.append({'REFCODE': RC, 'molecule': 0,
@@ -107,8 +293,26 @@ def main():
         done_RCs.append(RC)
         # update output file
         OUTDATA.to_csv(output_file, index=False)
+        if ledger is not None:
+            ledger.stamp(RC, pdb)
+            ledger.save()
+        if cache is not None:
+            cache.checkpoint()
+        if queue is not None:
+            queue.complete(RC)
         count += 1
 
+    if cache is not None:
+        cache.save()
+        cache.report()
+    if queue is not None:
+        queue.merge_shards(merged_file, merged_file)
+        if args.solvent_library:
+            queue.merge_shards(
+                merged_file + '.solvents.csv', merged_file + '.solvents.csv'
+            )
+        queue.close()
+
 
 if __name__ == "__main__":
     logging.basicConfig(level=logging.INFO, format='')
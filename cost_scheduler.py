@@ -0,0 +1,270 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# Distributed under the terms of the MIT License.
+
+"""
+Script to run a command on a list of structures, largest predicted cost
+first (longest-processing-time scheduling).
+
+The cost of a structure is predicted from its number of atoms per unit
+cell, cell volume and disorder flag with a log-linear model,
+    log(runtime) = c0 + c1 log(n_atoms) + c2 log(volume) + c3 disorder
+fitted by least squares to the runtimes of previous runs in a cost
+ledger (CSV). Until the ledger has enough runs, n_atoms squared is used
+as the relative cost. Each finished run is appended to the ledger.
+
+The command is a template run in a shell for each structure, with
+{file} (structure file) and {REFCODE} (file name before the first
+'_') substituted, e.g.
+    'echo {REFCODE} > {REFCODE}.txt && python classify_structures.py
+     {REFCODE}.txt {REFCODE}_classify.csv'
+Runs should write separate outputs, since they run concurrently.
+
+Author: Andrew Tarzia
+
+Date Created: 19 Oct 2026
+
+"""
+
+import os
+import sys
+import time
+import logging
+import argparse
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+from periodic_molecules import read_cellpar, cellpar_to_lattice
+# number_atoms_per_UC.py is in utils
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'utils')
+)
+from number_atoms_per_UC import number_of_atoms  # noqa: E402
+
+
+LEDGER_HEADER = 'REFCODE,n_atoms,volume,disorder,runtime,returncode\n'
+
+
+def structure_features(file):
+    """
+    Get number of atoms and cell volume of a structure file.
+
+    PDBs are read from their CRYST1 and atom lines only, other formats
+    with ASE.
+
+    """
+    if file[-4:] == '.pdb':
+        n_atoms = number_of_atoms(file)
+        try:
+            lattice = cellpar_to_lattice(read_cellpar(file))
+            volume = abs(np.linalg.det(lattice))
+        except ValueError:
+            # no cell
+            volume = float(n_atoms) * 20.0
+        return n_atoms, volume
+    from ase.io import read
+    struct = read(file)
+    return len(struct), struct.get_volume()
+
+
+def read_ledger(ledger_file):
+    """
+    Read (n_atoms, volume, disorder, runtime) of successful runs.
+
+    """
+    rows = []
+    if not os.path.isfile(ledger_file):
+        return np.empty((0, 4))
+    with open(ledger_file, 'r') as f:
+        f.readline()
+        for line in f:
+            _, n_atoms, volume, disorder, runtime, code = line.rstrip().split(
+                ','
+            )
+            if int(code) == 0:
+                rows.append((
+                    float(n_atoms), float(volume), float(disorder),
+                    float(runtime)
+                ))
+    return np.array(rows).reshape(-1, 4)
+
+
+def design_matrix(features):
+    """
+    Columns of the log-linear cost model.
+
+    """
+    features = np.asarray(features, dtype=float).reshape(-1, 3)
+    return np.column_stack([
+        np.ones(len(features)),
+        np.log(np.maximum(features[:, 0], 1)),
+        np.log(np.maximum(features[:, 1], 1)),
+        features[:, 2]
+    ])
+
+
+class CostModel:
+    """
+    Log-linear runtime model fitted to a cost ledger.
+
+    """
+
+    def __init__(self, min_runs=10):
+        self.min_runs = min_runs
+        self.coefficients = None
+
+    def fit(self, ledger):
+        """
+        Fit model to ledger rows of (n_atoms, volume, disorder,
+        runtime).
+
+        """
+        if len(ledger) < self.min_runs:
+            logging.info(
+                f'> {len(ledger)} runs in ledger, using n_atoms^2 as cost'
+            )
+            return self
+        X = design_matrix(ledger[:, :3])
+        y = np.log(np.maximum(ledger[:, 3], 1E-3))
+        self.coefficients, *_ = np.linalg.lstsq(X, y, rcond=None)
+        residual = y - X @ self.coefficients
+        logging.info(
+            f'> cost model fitted to {len(ledger)} runs, '
+            f'coefficients {np.round(self.coefficients, 3).tolist()}, '
+            f'rms log error {np.sqrt(np.mean(residual**2)):.2f}'
+        )
+        return self
+
+    def predict(self, features):
+        """
+        Predicted runtime (or relative cost) of each structure.
+
+        """
+        features = np.asarray(features, dtype=float).reshape(-1, 3)
+        if self.coefficients is None:
+            return features[:, 0] ** 2
+        return np.exp(design_matrix(features) @ self.coefficients)
+
+
+def lpt_order(names, costs):
+    """
+    Return names in decreasing order of cost (ties by name).
+
+    Dispatching in this order to the first free worker is the
+    longest-processing-time-first list schedule.
+
+    """
+    return [
+        names[i] for i in sorted(
+            range(len(names)), key=lambda i: (-costs[i], names[i])
+        )
+    ]
+
+
+def run_schedule(jobs, command, n_workers, ledger_file):
+    """
+    Run command on jobs with a pool of workers, in order of jobs.
+
+    Keyword Arguments:
+        jobs (list) - (file, REFCODE, features) in dispatch order
+        command (str) - shell command template
+        n_workers (int) - number of concurrent runs
+        ledger_file (str) - cost ledger to append runs to
+
+    Returns:
+        (list) - REFCODEs of failed runs
+
+    """
+    lock = threading.Lock()
+    failed = []
+    if not os.path.isfile(ledger_file):
+        with open(ledger_file, 'w') as f:
+            f.write(LEDGER_HEADER)
+
+    def run(job):
+        file, RC, (n_atoms, volume, disorder) = job
+        start = time.time()
+        process = subprocess.run(
+            command.format(file=file, REFCODE=RC), shell=True
+        )
+        runtime = time.time() - start
+        with lock:
+            with open(ledger_file, 'a') as f:
+                f.write(
+                    f'{RC},{n_atoms},{volume:.3f},{int(disorder)},'
+                    f'{runtime:.3f},{process.returncode}\n'
+                )
+            if process.returncode != 0:
+                failed.append(RC)
+            logging.info(
+                f'> {RC} finished in {runtime:.1f} s '
+                f'(code {process.returncode})'
+            )
+
+    with ThreadPoolExecutor(max_workers=n_workers) as pool:
+        # consume results so exceptions in workers are raised
+        list(pool.map(run, jobs))
+    return failed
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=(
+            'Run a command on structures, largest predicted cost first.'
+        )
+    )
+    parser.add_argument(
+        'file_list', help='file with list of structure files'
+    )
+    parser.add_argument(
+        'command',
+        help='shell command template with {file} and {REFCODE}'
+    )
+    parser.add_argument(
+        'n_workers', type=int, help='number of concurrent runs'
+    )
+    parser.add_argument(
+        '--ledger', default='cost_ledger.csv',
+        help='CSV of past runtimes, appended to as runs finish'
+    )
+    parser.add_argument(
+        '--metadata', default=None,
+        help=(
+            'quality metadata of REFCODEs (from get_family_metadata.py) '
+            'for disorder flags'
+        )
+    )
+    args = parser.parse_args()
+
+    files = [i.rstrip() for i in open(args.file_list, 'r').readlines()]
+    metadata = {}
+    if args.metadata is not None:
+        from refcode_families import read_quality_metadata
+        metadata = read_quality_metadata(args.metadata)
+
+    names = []
+    features = []
+    for file in files:
+        RC = os.path.basename(file).split('_')[0].split('.')[0]
+        n_atoms, volume = structure_features(file)
+        disorder = metadata.get(RC, (None, False, True))[1]
+        names.append((file, RC))
+        features.append((n_atoms, volume, float(disorder)))
+
+    model = CostModel().fit(read_ledger(args.ledger))
+    costs = model.predict(features)
+    order = lpt_order(list(range(len(files))), costs)
+    jobs = [(names[i][0], names[i][1], features[i]) for i in order]
+    logging.info(
+        f'> {len(jobs)} structures on {args.n_workers} workers, '
+        f'largest first: {", ".join(i[1] for i in jobs[:5])}'
+    )
+    failed = run_schedule(jobs, args.command, args.n_workers, args.ledger)
+    logging.info(f'> {len(failed)} of {len(jobs)} runs failed')
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='')
+    main()
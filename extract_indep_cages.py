@@ -12,29 +12,40 @@ Date Created: 04 Apr 2019
 """
 
 import sys
-import atools
+from in_memory import modularize_file
 
 
 def main():
-    if (not len(sys.argv) == 2):
+    if (len(sys.argv) < 2 or sys.argv[2:] not in [[], ['in_memory']]
+            or sys.argv[1] in ['-h', '--help']):
         print("""
-Usage: extract_indep_cages.py CIF
+Usage: extract_indep_cages.py CIF [in_memory]
     CIF (str) - name of CIF to analyze
+    in_memory - parse and rebuild the CIF in memory (in_memory.py),
+        without intermediate PDBs
     """)
         sys.exit()
     else:
         CIF = sys.argv[1]
+        in_memory = len(sys.argv) == 3
 
+    import atools
     if CIF[-4:] != '.cif':
         raise Exception('input file: {} was not a CIF'.format(CIF))
 
-    pdb_file, struct = atools.convert_CIF_2_PDB(CIF)
-    if pdb_file is None and struct is None:
-        sys.exit()
-    rebuilt_structure = atools.modularize(file=pdb_file)
+    if in_memory:
+        # parse and rebuild in memory, without intermediate PDBs
+        struct, rebuilt_structure = modularize_file(CIF)
+        if struct is None:
+            sys.exit()
+    else:
+        pdb_file, struct = atools.convert_CIF_2_PDB(CIF)
+        if pdb_file is None and struct is None:
+            sys.exit()
+        rebuilt_structure = atools.modularize(file=pdb_file)
     if rebuilt_structure is None:
         # handle pyWindow failure
-        sys.exit(f'pyWindow failure on {pdb_file}')
+        sys.exit(f'pyWindow failure on {CIF}')
     res = atools.analyze_rebuilt(rebuilt_structure, file_prefix=CIF.rstrip('.cif'),
                                  atom_limit=20, include_coms=False, verbose=False)
     print('===================================================')
@@ -13,24 +13,135 @@ Date Created: 23 May 2019
 
 import logging
 import sys
-import pandas as pd
+import argparse
 import os
-import atools
+from analysis_f import analyse_molecule, warn_engine
+from periodic_molecules import modularize, iter_molecules
+from pore_estimator import estimate_pore_diameters
+from solvent_library import split_solvents, write_solvent_report
 
 
 def main():
-    if (not len(sys.argv) == 3):
-        print("""
-    Usage: extract_most_porous.py DB_file output_file
-        DB_file (str) - file with initial list of REFCODEs
-        output_file (str) - file to output results of sorting to
-        """)
+    parser = argparse.ArgumentParser(
+        description=(
+            'Extract the most porous molecule from a rebuilt pdb.'
+        )
+    )
+    parser.add_argument(
+        'DB_file', help='file with initial list of REFCODEs'
+    )
+    parser.add_argument(
+        'output_file', help='file to output results of sorting to'
+    )
+    parser.add_argument(
+        '--analysis_cache', default=None,
+        help=(
+            'JSON file of pyWindow results keyed by molecular graph '
+            'hash, reused for the same cage across REFCODEs'
+        )
+    )
+    parser.add_argument(
+        '--family_metadata', default=None,
+        help=(
+            'quality metadata of REFCODEs (from get_family_metadata.py); '
+            'if given, only the representative of each REFCODE family '
+            'is processed'
+        )
+    )
+    parser.add_argument(
+        '--include_deferred', action='store_true',
+        help=(
+            'with --family_metadata, process the other family members '
+            'after all representatives'
+        )
+    )
+    parser.add_argument(
+        '--provenance', action='store_true',
+        help=(
+            'stamp results with provenance keys (output_file'
+            '.provenance.json) and recompute only results whose inputs, '
+            'parameters or pyWindow/atools code changed'
+        )
+    )
+    parser.add_argument(
+        '--bond_tables', action='store_true',
+        help=(
+            'build molecules from the CSD bond table (RC_extracted_bonds'
+            '.csv from REFCODEs_to_PDBs.py) where available, instead of '
+            'the pyWindow rebuild'
+        )
+    )
+    parser.add_argument(
+        '--branch_and_bound', action='store_true',
+        help=(
+            'analyse molecules in decreasing order of an upper bound of '
+            'their pore diameter (pore_estimator.py) and skip those that '
+            'cannot be the most porous'
+        )
+    )
+    parser.add_argument(
+        '--window_engine', choices=['pywindow', 'graph'],
+        default='pywindow',
+        help=(
+            'find windows with pyWindow sampling or (experimental, not '
+            'yet benchmarked) from the molecular graph and convex hull '
+            '(window_engine.py)'
+        )
+    )
+    parser.add_argument(
+        '--stream', action='store_true',
+        help=(
+            'rebuild molecules one at a time by periodic graph traversal '
+            '(periodic_molecules.py) to bound memory use; molecule ids '
+            'follow the traversal order'
+        )
+    )
+    parser.add_argument(
+        '--solvent_library', action='store_true',
+        help=(
+            'skip molecules matching the library of common solvents and '
+            'counter-ions (solvent_library.py) and report them per '
+            'REFCODE in output_file.solvents.csv'
+        )
+    )
+    parser.add_argument(
+        '--mp_dir', default='.',
+        help=(
+            'directory to write the most porous molecules (RC_MP_n.pdb) '
+            'to, e.g. to keep them apart from those of '
+            'classify_structures.py'
+        )
+    )
+    if len(sys.argv) == 1:
+        # as before the options were added, print usage and exit
+        parser.print_help()
         sys.exit()
-    else:
-        DB_file = sys.argv[1]
-        output_file = sys.argv[2]
+    args = parser.parse_args()
+    import pandas as pd
+    warn_engine(args.window_engine)
+    if args.stream and args.branch_and_bound:
+        parser.error('--branch_and_bound needs all molecules, not --stream')
+    DB_file = args.DB_file
+    output_file = args.output_file
+    cache = None
+    if args.analysis_cache is not None:
+        from graph_hash import AnalysisCache
+        cache = AnalysisCache(args.analysis_cache)
+
+    os.makedirs(args.mp_dir, exist_ok=True)
 
     refcodes = sorted([i.rstrip() for i in open(DB_file, 'r').readlines()])
+    if args.family_metadata is not None:
+        from refcode_families import read_quality_metadata, order_by_family
+        refcodes, deferred = order_by_family(
+            refcodes, read_quality_metadata(args.family_metadata)
+        )
+        logging.info(
+            f'> {len(refcodes)} family representatives, '
+            f'{len(deferred)} deferred.'
+        )
+        if args.include_deferred:
+            refcodes = refcodes + deferred
     pdbs = [i+'_extracted.pdb' for i in refcodes]
     logging.info(f'> started with: {len(refcodes)} structures to classify.')
     if os.path.isfile(output_file):
@@ -45,6 +156,31 @@ def main():
         OUTDATA = pd.read_csv(output_file)
         done_RCs = []
 
+    ledger = None
+    if args.provenance:
+        from provenance import ProvenanceLedger
+        ledger = ProvenanceLedger(
+            output_file + '.provenance.json',
+            params={
+                'modularize': {
+                    'bond_tables': args.bond_tables, 'stream': args.stream
+                },
+                'analysis': {
+                    'min_atoms': 5,
+                    'solvent_library': args.solvent_library,
+                    'window_engine': args.window_engine
+                }
+            }
+        )
+        redo = [
+            i for i in done_RCs
+            if ledger.invalidate(i, i+'_extracted.pdb')
+        ]
+        ledger.save()
+        OUTDATA = OUTDATA[~OUTDATA['REFCODE'].isin(redo)]
+        done_RCs = [i for i in done_RCs if i not in redo]
+        logging.info(f'> {len(redo)} structures invalidated.')
+
     # iterate over CIFs
     count = len(done_RCs)
     for pdb in pdbs:
@@ -54,43 +190,134 @@ def main():
             continue
         if os.path.isfile(pdb):
             logging.info(f'> doing {count} of {len(pdbs)}: {RC}')
-            # load and modularize pdb
-            rbs = atools.modularize(file=pdb)
-            if rbs is None:
-                # handle pyWindow failure
-                raise(f'{pdb} failed modularize!')
-            # iterate over all molecules, skipping those with n_atoms < 5
-            mol_dict = {}
-            Mol = rbs.molecules
-            for molec in Mol:
-                mol = Mol[molec]
-                if mol.no_of_atoms < 5:
-                    continue
-                # run analysis
-                try:
-                    analysis = mol.full_analysis()
-                except ValueError:
-                    logging.warning(f'{pdb}_{molec} failed pywindow full_analysis.')
-                    analysis = None
-                # define output
-                if analysis is not None:
-                    pdo = analysis['pore_diameter_opt']['diameter']
-                    if analysis['windows']['diameters'] is not None:
-                        nwind = len(analysis['windows']['diameters'])
-                    else:
-                        nwind = 0
-                    mol_dict[molec] = (pdo, nwind)
-
-            # get molecule with largest pore diameter
-            pdos = [mol_dict[i][0] for i in mol_dict]
-            max_pdo = max(pdos)
-            max_molec = list(mol_dict.keys())[pdos.index(max_pdo)]
-            max_nwind = mol_dict[max_molec][1]
-            # output structure
-            Mol[max_molec].dump_molecule(
-                RC + "_MP_{0}.pdb".format(max_molec),
-                include_coms=True,
-                override=True)
+            solvents = []
+            if args.stream:
+                # molecules are rebuilt one at a time and only the most
+                # porous so far is kept (ties go to the earliest)
+                best = None
+                for molec, mol in iter_molecules(
+                    pdb, bond_tables=args.bond_tables
+                ):
+                    if args.solvent_library:
+                        others, found = split_solvents({molec: mol})
+                        solvents.extend(found)
+                        if len(others) == 0:
+                            continue
+                    if mol.no_of_atoms < 5:
+                        continue
+                    result, reused = analyse_molecule(
+                        mol, name=f'{pdb}_{molec}', cache=cache,
+                        engine=args.window_engine
+                    )
+                    if result is None:
+                        continue
+                    if best is None or result['pore_diam_opt'] > best[0]:
+                        best = (
+                            result['pore_diam_opt'], result['no_windows'],
+                            reused, molec, mol
+                        )
+                if best is not None:
+                    (
+                        max_pdo, max_nwind, max_reused, max_molec, max_mol
+                    ) = best
+            else:
+                # load and modularize pdb
+                rbs = modularize(pdb, bond_tables=args.bond_tables)
+                if rbs is None:
+                    # handle pyWindow failure
+                    raise(f'{pdb} failed modularize!')
+                # iterate over all molecules, skipping those with
+                # n_atoms < 5
+                mol_dict = {}
+                Mol = rbs.molecules
+                candidates = list(Mol)
+                if args.solvent_library:
+                    # skip known solvents and counter-ions
+                    candidates, solvents = split_solvents(Mol)
+                candidates = [
+                    i for i in candidates if Mol[i].no_of_atoms >= 5
+                ]
+                order = candidates
+                if args.branch_and_bound:
+                    # analyse in decreasing order of pore diameter bound
+                    bounds = dict(zip(candidates, estimate_pore_diameters([
+                        (Mol[i].elements, Mol[i].coordinates)
+                        for i in candidates
+                    ])))
+                    order = sorted(candidates, key=lambda i: -bounds[i])
+                    position = {j: i for i, j in enumerate(candidates)}
+                    best = None
+                for molec in order:
+                    mol = Mol[molec]
+                    if args.branch_and_bound and best is not None:
+                        # skip molecules that cannot beat the best so far
+                        # (ties go to the earliest molecule)
+                        if bounds[molec] < best[0] or (
+                            bounds[molec] == best[0]
+                            and position[molec] > best[1]
+                        ):
+                            continue
+                    # run analysis (or reuse that of an identical cage)
+                    result, reused = analyse_molecule(
+                        mol, name=f'{pdb}_{molec}', cache=cache,
+                        engine=args.window_engine
+                    )
+                    # define output
+                    if result is not None:
+                        pdo = result['pore_diam_opt']
+                        nwind = result['no_windows']
+                        mol_dict[molec] = (pdo, nwind, reused)
+                        if args.branch_and_bound and (
+                            best is None or (pdo, -position[molec]) > (
+                                best[0], -best[1]
+                            )
+                        ):
+                            best = (pdo, position[molec])
+                if args.branch_and_bound:
+                    logging.info(
+                        f'> analysed {len(mol_dict)} of {len(candidates)} '
+                        'molecules'
+                    )
+                    mol_dict = {
+                        i: mol_dict[i] for i in candidates if i in mol_dict
+                    }
+
+                # get molecule with largest pore diameter
+                best = None
+                if len(mol_dict) > 0:
+                    pdos = [mol_dict[i][0] for i in mol_dict]
+                    max_pdo = max(pdos)
+                    max_molec = list(mol_dict.keys())[pdos.index(max_pdo)]
+                    max_nwind = mol_dict[max_molec][1]
+                    max_mol = Mol[max_molec]
+                    max_reused = mol_dict[max_molec][2]
+                    best = max_molec
+            if args.solvent_library:
+                write_solvent_report(
+                    output_file + '.solvents.csv', RC, solvents
+                )
+            if best is None:
+                # only solvents or failed molecules, add empty line.
+                logging.warning(f'> no molecules analysed in {RC}')
+                max_molec, max_pdo, max_nwind = 0, 0, 0
+            else:
+                # output structure
+                # (COMs are only known if pyWindow full_analysis was run
+                # here)
+                if max_reused:
+                    logging.info(
+                        f'> COMs of {RC}_MP_{max_molec}.pdb not written, '
+                        'result reused from the analysis cache'
+                    )
+                max_mol.dump_molecule(
+                    os.path.join(
+                        args.mp_dir, RC + "_MP_{0}.pdb".format(max_molec)
+                    ),
+                    include_coms=(
+                        not max_reused
+                        and args.window_engine == 'pywindow'
+                    ),
+                    override=True)
             OUTDATA = OUTDATA.append({'REFCODE': RC, 'molecule': max_molec,
                                       'pore_diam_opt': max_pdo,
                                       'no_windows': max_nwind},
@@ -103,8 +330,17 @@ def main():
         done_RCs.append(RC)
         # update output file
         OUTDATA.to_csv(output_file, index=False)
+        if ledger is not None:
+            ledger.stamp(RC, pdb)
+            ledger.save()
+        if cache is not None:
+            cache.checkpoint()
         count += 1
 
+    if cache is not None:
+        cache.save()
+        cache.report()
+
 
 if __name__ == "__main__":
     logging.basicConfig(level=logging.INFO, format='')
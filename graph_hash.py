@@ -0,0 +1,249 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# Distributed under the terms of the MIT License.
+
+"""
+Functions for molecular graph hashing and reuse of pyWindow analysis
+across REFCODEs (solvates, polymorphs, redeterminations).
+
+Bonds are perceived from covalent radii (with the same tolerance as
+the pyWindow rebuild) and the element-labelled graph is hashed with
+Weisfeiler-Lehman refinement. Molecules with the same hash are the
+same compound; a permutation-invariant geometric signature decides if
+the conformations are close enough to reuse an analysis.
+
+Author: Andrew Tarzia
+
+Date Created: 19 Oct 2026
+
+"""
+
+import json
+import atexit
+import logging
+import os
+import hashlib
+from collections import Counter
+import numpy as np
+from scipy.spatial import cKDTree
+
+
+# covalent radii in Angstrom (Cordero et al., 2008)
+COVALENT_RADII = {
+    'H': 0.31, 'B': 0.84, 'C': 0.76, 'N': 0.71, 'O': 0.66, 'F': 0.57,
+    'Na': 1.66, 'Mg': 1.41, 'Al': 1.21, 'Si': 1.11, 'P': 1.07,
+    'S': 1.05, 'Cl': 1.02, 'K': 2.03, 'Ca': 1.76, 'Ti': 1.60,
+    'V': 1.53, 'Cr': 1.39, 'Mn': 1.39, 'Fe': 1.32, 'Co': 1.26,
+    'Ni': 1.24, 'Cu': 1.32, 'Zn': 1.22, 'Ga': 1.22, 'Ge': 1.20,
+    'As': 1.19, 'Se': 1.20, 'Br': 1.20, 'Rb': 2.20, 'Sr': 1.95,
+    'Y': 1.90, 'Zr': 1.75, 'Mo': 1.54, 'Ru': 1.46, 'Rh': 1.42,
+    'Pd': 1.39, 'Ag': 1.45, 'Cd': 1.44, 'In': 1.42, 'Sn': 1.39,
+    'Sb': 1.39, 'Te': 1.38, 'I': 1.39, 'Cs': 2.44, 'Ba': 2.15,
+    'La': 2.07, 'Ce': 2.04, 'Eu': 1.98, 'Gd': 1.96, 'Tb': 1.94,
+    'Dy': 1.92, 'Er': 1.89, 'Yb': 1.87, 'W': 1.62, 'Re': 1.51,
+    'Os': 1.44, 'Ir': 1.41, 'Pt': 1.36, 'Au': 1.36, 'Hg': 1.32,
+    'Tl': 1.45, 'Pb': 1.46, 'Bi': 1.48, 'U': 1.96,
+}
+DEFAULT_RADIUS = 1.50
+
+
+def covalent_radii(elements):
+    return np.array([
+        COVALENT_RADII.get(i.title(), DEFAULT_RADIUS) for i in elements
+    ])
+
+
+def perceive_bonds(elements, coordinates, tol=0.4):
+    """
+    Perceive bonds from covalent radii.
+
+    A bond between atoms i and j exists if their distance is within
+    tol of the sum of their covalent radii.
+
+    Returns:
+        (ndarray) - (n_bonds, 2) atom indices
+
+    """
+    radii = covalent_radii(elements)
+    if len(radii) < 2:
+        return np.empty((0, 2), dtype=int)
+    tree = cKDTree(coordinates)
+    pairs = tree.query_pairs(r=2 * radii.max() + tol, output_type='ndarray')
+    if len(pairs) == 0:
+        return np.empty((0, 2), dtype=int)
+    d = np.linalg.norm(
+        coordinates[pairs[:, 0]] - coordinates[pairs[:, 1]], axis=1
+    )
+    r_cov = radii[pairs[:, 0]] + radii[pairs[:, 1]]
+    return pairs[(d > r_cov - tol) & (d < r_cov + tol)]
+
+
+def formula(elements, heavy_only=False):
+    """
+    Return Hill-ordered formula string.
+
+    """
+    counts = Counter(i.title() for i in elements)
+    if heavy_only:
+        counts.pop('H', None)
+    if 'C' in counts:
+        order = ['C'] + (['H'] if 'H' in counts else []) + sorted(
+            i for i in counts if i not in ['C', 'H']
+        )
+    else:
+        order = sorted(counts)
+    return ''.join(
+        f'{i}{counts[i]}' if counts[i] > 1 else i for i in order
+    )
+
+
+def wl_hash(elements, bonds, iterations=3, heavy_only=False):
+    """
+    Weisfeiler-Lehman hash of an element-labelled molecular graph.
+
+    Keyword Arguments:
+        elements (list) - element of each atom
+        bonds (ndarray) - (n_bonds, 2) atom indices
+        iterations (int) - number of refinement iterations
+        heavy_only (bool) - ignore hydrogens (often missing or
+            disordered in XRD structures)
+
+    Returns:
+        (str) - hex digest
+
+    """
+    elements = [i.title() for i in elements]
+    keep = [i for i, e in enumerate(elements) if not (
+        heavy_only and e == 'H'
+    )]
+    index = {j: i for i, j in enumerate(keep)}
+    neighbours = [[] for _ in keep]
+    for a, b in bonds:
+        if a in index and b in index:
+            neighbours[index[a]].append(index[b])
+            neighbours[index[b]].append(index[a])
+    labels = [elements[i] for i in keep]
+    for _ in range(iterations):
+        labels = [
+            hashlib.sha1((
+                labels[i] + '|' + ','.join(sorted(
+                    labels[j] for j in neighbours[i]
+                ))
+            ).encode()).hexdigest()[:16]
+            for i in range(len(labels))
+        ]
+    digest = hashlib.sha1()
+    digest.update(formula([elements[i] for i in keep]).encode())
+    for label in sorted(labels):
+        digest.update(label.encode())
+    return digest.hexdigest()
+
+
+def molecule_hash(elements, coordinates, tol=0.4, heavy_only=False):
+    """
+    Perceive bonds of a molecule and return its graph hash.
+
+    """
+    bonds = perceive_bonds(elements, coordinates, tol=tol)
+    return wl_hash(elements, bonds, heavy_only=heavy_only)
+
+
+def conformer_signature(coordinates, n_quantiles=32):
+    """
+    Permutation and rotation invariant geometric signature.
+
+    Quantiles of the atom distances from the centroid and the
+    eigenvalues of the gyration tensor.
+
+    """
+    centred = coordinates - coordinates.mean(axis=0)
+    distances = np.linalg.norm(centred, axis=1)
+    quantiles = np.quantile(distances, np.linspace(0, 1, n_quantiles))
+    gyration = np.linalg.eigvalsh(centred.T @ centred / len(centred))
+    return np.concatenate([quantiles, np.sqrt(np.abs(gyration))])
+
+
+class AnalysisCache:
+    """
+    Store of analysis results keyed by molecular graph hash.
+
+    Each hash holds a list of conformers (signature, result, source).
+    A result is reused if the signature of a new molecule is within
+    tolerance (max absolute difference in Angstrom) of a stored one.
+
+    The cache file is rewritten by checkpoint() once save_every new
+    results were added, and at exit.
+
+    """
+
+    def __init__(self, cache_file, tolerance=0.1, save_every=100):
+        self.cache_file = cache_file
+        self.tolerance = tolerance
+        self.save_every = save_every
+        self.hits = 0
+        self.misses = 0
+        self.unsaved = 0
+        self.entries = {}
+        if os.path.isfile(cache_file):
+            with open(cache_file, 'r') as f:
+                self.entries = json.load(f)
+        atexit.register(self.save)
+
+    def lookup(self, elements, coordinates, variant=None):
+        """
+        Find a reusable result for a molecule.
+
+        Results of different analysis variants (e.g. window engines)
+        are stored under separate keys.
+
+        Returns:
+            key (tuple) - (graph hash, signature) to use with add()
+            result (dict) - stored result or None
+
+        """
+        graph = molecule_hash(elements, coordinates)
+        if variant is not None:
+            graph = f'{graph}:{variant}'
+        signature = conformer_signature(coordinates)
+        for conformer in self.entries.get(graph, []):
+            diff = np.abs(np.array(conformer['signature']) - signature)
+            if diff.max() <= self.tolerance:
+                self.hits += 1
+                return (graph, signature), conformer['result']
+        self.misses += 1
+        return (graph, signature), None
+
+    def add(self, key, result, source):
+        graph, signature = key
+        self.entries.setdefault(graph, []).append({
+            'signature': signature.tolist(),
+            'result': result,
+            'source': source
+        })
+        self.unsaved += 1
+
+    def checkpoint(self):
+        """
+        Save the cache if save_every results were added since the last
+        save.
+
+        """
+        if self.unsaved >= self.save_every:
+            self.save()
+
+    def save(self):
+        if self.unsaved == 0:
+            return
+        temp = f'{self.cache_file}.tmp'
+        with open(temp, 'w') as f:
+            json.dump(self.entries, f)
+        os.replace(temp, self.cache_file)
+        self.unsaved = 0
+
+    def report(self):
+        total = self.hits + self.misses
+        rate = 100 * self.hits / total if total > 0 else 0.0
+        logging.info(
+            f'> analysis reuse: {self.hits} of {total} molecules '
+            f'({rate:.1f}%), {len(self.entries)} unique graphs'
+        )
@@ -0,0 +1,109 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# Distributed under the terms of the MIT License.
+
+"""
+Functions for an in-memory structure to pyWindow analysis path.
+
+Structures are parsed once with ASE and the arrays are passed straight
+into a pywindow.MolecularSystem, instead of writing a PDB
+(atools.convert_CIF_2_PDB) and a rebuilt PDB (atools.modularize) that
+pyWindow reads back.
+
+Author: Andrew Tarzia
+
+Date Created: 19 Oct 2026
+
+"""
+
+import os
+import logging
+import numpy as np
+
+
+def read_structure(file):
+    """
+    Read a structure file with ASE.
+
+    Returns:
+        (ase.Atoms) - periodic structure, None if ASE failed
+
+    """
+    from ase.io import read
+    try:
+        struct = read(file)
+    except Exception as e:
+        logging.warning(f'> ASE failed to load {file}: {e}')
+        return None
+    struct.set_pbc(True)
+    struct.wrap()
+    return struct
+
+
+def system_from_atoms(struct, system_id):
+    """
+    Build a pywindow.MolecularSystem from an ASE structure.
+
+    """
+    import pywindow as pw
+    return pw.MolecularSystem.load_system(
+        {
+            'elements': np.array(struct.get_chemical_symbols()),
+            'coordinates': struct.get_positions(),
+            'unit_cell': np.array(struct.cell.cellpar())
+        },
+        system_id=system_id
+    )
+
+
+def modularize_atoms(struct, system_id):
+    """
+    Rebuild and modularize an ASE structure with pyWindow in memory.
+
+    Returns:
+        rebuilt_structure (pywindow.MolecularSystem) - modularized
+            system, None if pyWindow failed
+
+    """
+    molsys = system_from_atoms(struct, system_id)
+    try:
+        rebuilt_structure = molsys.rebuild_system()
+        rebuilt_structure.make_modular()
+    except (ValueError, IndexError) as e:
+        logging.warning(f'> pyWindow failed to rebuild {system_id}: {e}')
+        return None
+    return rebuilt_structure
+
+
+def modularize_file(file):
+    """
+    Read and modularize a structure file without intermediate files.
+
+    Returns:
+        struct (ase.Atoms) - structure, None if ASE failed
+        rebuilt_structure (pywindow.MolecularSystem) - modularized
+            system, None if ASE or pyWindow failed
+
+    """
+    struct = read_structure(file)
+    if struct is None:
+        return None, None
+    system_id = os.path.splitext(os.path.basename(file))[0]
+    return struct, modularize_atoms(struct, system_id)
+
+
+def has_pore(rebuilt_structure, diam=0.0):
+    """
+    Check if any molecule has a pore_diameter_opt above diam (as
+    atools.check_PDB_for_pore).
+
+    """
+    for molecule in rebuilt_structure.molecules:
+        mol = rebuilt_structure.molecules[molecule]
+        try:
+            pdo = mol.calculate_pore_diameter_opt()
+        except ValueError:
+            continue
+        if pdo > diam:
+            return True
+    return False
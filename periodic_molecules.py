@@ -0,0 +1,429 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# Distributed under the terms of the MIT License.
+
+"""
+Functions for building discrete molecules from periodic structures as
+a graph traversal.
+
+Bonds are edges between atoms of the unit cell, each with the periodic
+image of the second atom. A breadth-first traversal assigns every atom
+of a molecule an image offset so the molecule is whole, which replaces
+the supercell rebuild of pyWindow. Molecules that bond to their own
+periodic image (polymeric structures) are flagged.
+
+Structures exported as an asymmetric unit with space group operators
+(CSD_API_python3/REFCODEs_to_ASU.py) are expanded to the unit cell
+here, keeping the asymmetric unit atom that each atom is a copy of.
+
+Packed cells exported with their CSD bond table (RC_extracted_bonds.csv
+from CSD_API_python3/REFCODEs_to_PDBs.py) are modularized from the
+curated bonds directly, with image offsets by minimum image.
+
+Author: Andrew Tarzia
+
+Date Created: 19 Oct 2026
+
+"""
+
+import os
+import re
+import logging
+import itertools
+from fractions import Fraction
+from collections import deque
+import numpy as np
+from scipy.spatial import cKDTree
+
+from graph_hash import covalent_radii
+
+
+IMAGES = np.array(list(itertools.product([-1, 0, 1], repeat=3)))
+
+
+def cellpar_to_lattice(cellpar):
+    """
+    Convert cell parameters to lattice vectors (rows), with a along x
+    and b in the xy plane (as ASE and the PDB format).
+
+    """
+    a, b, c, alpha, beta, gamma = cellpar
+    alpha, beta, gamma = np.radians([alpha, beta, gamma])
+    cx = c * np.cos(beta)
+    cy = c * (np.cos(alpha) - np.cos(beta) * np.cos(gamma))
+    cy /= np.sin(gamma)
+    cz = np.sqrt(c ** 2 - cx ** 2 - cy ** 2)
+    return np.array([
+        [a, 0, 0],
+        [b * np.cos(gamma), b * np.sin(gamma), 0],
+        [cx, cy, cz]
+    ])
+
+
+def perceive_periodic_bonds(elements, frac, lattice, tol=0.4):
+    """
+    Perceive bonds between atoms of a unit cell and their images.
+
+    Keyword Arguments:
+        elements (list) - element of each atom
+        frac (ndarray) - (N, 3) fractional coordinates (wrapped)
+        lattice (ndarray) - (3, 3) lattice vectors as rows
+        tol (float) - bond tolerance around the sum of covalent radii,
+            as in the pyWindow rebuild
+
+    Returns:
+        bonds (ndarray) - (n_bonds, 2) atom indices (i, j)
+        images (ndarray) - (n_bonds, 3) image of j bonded to i in the
+            home cell
+
+    """
+    radii = covalent_radii(elements)
+    cart = frac @ lattice
+    n_atoms = len(cart)
+    image_points = (
+        cart[None, :, :] + (IMAGES @ lattice)[:, None, :]
+    ).reshape(-1, 3)
+    tree = cKDTree(image_points)
+    hits = tree.query_ball_point(cart, r=2 * radii.max() + tol)
+    i = np.repeat(np.arange(n_atoms), [len(h) for h in hits])
+    if len(i) == 0:
+        return np.empty((0, 2), dtype=int), np.empty((0, 3), dtype=int)
+    hit = np.concatenate(hits).astype(int)
+    image_id, j = np.divmod(hit, n_atoms)
+    d = np.linalg.norm(image_points[hit] - cart[i], axis=1)
+    r_cov = radii[i] + radii[j]
+    keep = (d > r_cov - tol) & (d < r_cov + tol) & (d > 0.1)
+    # each bond is found from both atoms, keep one direction (IMAGES
+    # index 13 is the home cell)
+    keep &= (i < j) | ((i == j) & (image_id > 13))
+    return np.column_stack([i[keep], j[keep]]), IMAGES[image_id[keep]]
+
+
+def discrete_molecules(n_atoms, bonds, images, seeds=None):
+    """
+    Traverse the periodic bond graph to find discrete molecules.
+
+    Keyword Arguments:
+        n_atoms (int) - number of atoms in unit cell
+        bonds (ndarray) - (n_bonds, 2) atom indices, both directions
+            are not required
+        images (ndarray) - (n_bonds, 3) image of j bonded to i
+        seeds (list) - atoms to start molecules from (default: all);
+            only molecules containing a seed are built
+
+    Yields:
+        indices (ndarray) - atom indices of molecule
+        offsets (ndarray) - (n, 3) image offset of each atom
+        polymeric (bool) - True if molecule bonds to its own image
+
+    """
+    # adjacency in CSR form with both directions of each bond
+    src = np.concatenate([bonds[:, 0], bonds[:, 1]])
+    dst = np.concatenate([bonds[:, 1], bonds[:, 0]])
+    img = np.concatenate([images, -images])
+    order = np.argsort(src, kind='mergesort')
+    dst, img = dst[order], img[order]
+    starts = np.searchsorted(src[order], np.arange(n_atoms + 1))
+
+    visited = np.zeros(n_atoms, dtype=bool)
+    offsets = np.zeros((n_atoms, 3), dtype=int)
+    if seeds is None:
+        seeds = range(n_atoms)
+    for seed in seeds:
+        if visited[seed]:
+            continue
+        visited[seed] = True
+        offsets[seed] = 0
+        molecule = [seed]
+        polymeric = False
+        queue = deque([seed])
+        while queue:
+            a = queue.popleft()
+            for k in range(starts[a], starts[a+1]):
+                b = dst[k]
+                offset = offsets[a] + img[k]
+                if not visited[b]:
+                    visited[b] = True
+                    offsets[b] = offset
+                    molecule.append(b)
+                    queue.append(b)
+                elif np.any(offsets[b] != offset):
+                    polymeric = True
+        indices = np.array(molecule)
+        yield indices, offsets[indices].copy(), polymeric
+
+
+def molecule_coordinates(frac, lattice, indices, offsets):
+    """
+    Cartesian coordinates of a whole molecule, translated so that its
+    centroid is in the unit cell.
+
+    """
+    mol_frac = frac[indices] + offsets
+    shift = np.floor(mol_frac.mean(axis=0))
+    return (mol_frac - shift) @ lattice
+
+
+def parse_symmetry_operator(operator):
+    """
+    Parse a symmetry operator string (e.g. '-x+1/2,y,1/2-z').
+
+    Returns:
+        rotation (ndarray) - (3, 3) matrix acting on fractional coords
+        translation (ndarray) - (3, ) fractional translation
+
+    """
+    rotation = np.zeros((3, 3))
+    translation = np.zeros(3)
+    term = re.compile(r'([+-]?)([0-9./]*)\*?([xyz]?)')
+    components = operator.replace(' ', '').lower().split(',')
+    if len(components) != 3:
+        raise ValueError(f'cannot parse symmetry operator {operator}')
+    for row, component in enumerate(components):
+        for sign, number, axis in term.findall(component):
+            if number == '' and axis == '':
+                continue
+            value = float(Fraction(number)) if number != '' else 1.0
+            if sign == '-':
+                value = -value
+            if axis == '':
+                translation[row] += value
+            else:
+                rotation[row, 'xyz'.index(axis)] += value
+    return rotation, translation
+
+
+def expand_asymmetric_unit(elements, frac, operators, tol=1E-3):
+    """
+    Apply symmetry operators to the asymmetric unit to get the unit
+    cell, removing atoms on special positions generated twice.
+
+    Keyword Arguments:
+        elements (list) - element of each asymmetric unit atom
+        frac (ndarray) - (N, 3) fractional coordinates of asymmetric
+            unit
+        operators (list) - symmetry operator strings
+        tol (float) - fractional tolerance for duplicate atoms
+
+    Returns:
+        cell_elements (list) - element of each unit cell atom
+        cell_frac (ndarray) - (M, 3) wrapped fractional coordinates
+        orbit (ndarray) - (M, ) asymmetric unit atom of each atom
+        operator (ndarray) - (M, ) operator that generated each atom
+
+    """
+    ops = [parse_symmetry_operator(i) for i in operators]
+    n_atoms = len(frac)
+    all_frac = np.concatenate([frac @ R.T + t for R, t in ops])
+    all_frac -= np.floor(all_frac)
+    orbit = np.tile(np.arange(n_atoms), len(ops))
+    operator = np.repeat(np.arange(len(ops)), n_atoms)
+    # duplicates are the same orbit at the same (wrapped) position
+    keys = np.round(all_frac / tol).astype(np.int64) % int(round(1 / tol))
+    _, unique = np.unique(
+        np.column_stack([orbit, keys]), axis=0, return_index=True
+    )
+    unique = np.sort(unique)
+    return (
+        [elements[i] for i in orbit[unique]],
+        all_frac[unique],
+        orbit[unique],
+        operator[unique]
+    )
+
+
+def read_cellpar(file):
+    """
+    Read cell parameters from the CRYST1 record of a PDB.
+
+    """
+    with open(file, 'r') as f:
+        for line in f:
+            if line.startswith('CRYST1'):
+                return [float(i) for i in line[6:54].split()]
+    raise ValueError(f'{file} has no CRYST1 record')
+
+
+def read_cell_pdb(file):
+    """
+    Read elements, fractional coordinates and lattice of a PDB.
+
+    """
+    from cage_fingerprints import read_pdb_arrays
+    lattice = cellpar_to_lattice(read_cellpar(file))
+    elements, coordinates = read_pdb_arrays(file)
+    frac = coordinates @ np.linalg.inv(lattice)
+    return list(elements), frac - np.floor(frac), lattice
+
+
+def bond_table_file(file):
+    """
+    Return the bond table side-car of an exported structure file.
+
+    """
+    return os.path.splitext(file)[0] + '_bonds.csv'
+
+
+def read_bond_table(file):
+    """
+    Read (n_bonds, 2) atom indices from a bond table CSV.
+
+    """
+    bonds = np.loadtxt(
+        file, delimiter=',', skiprows=1, usecols=(0, 1), dtype=int,
+        ndmin=2
+    )
+    return bonds.reshape(-1, 2)
+
+
+def bond_images(frac, bonds):
+    """
+    Image of atom j bonded to atom i by minimum image (bonds are much
+    shorter than half of any cell length).
+
+    """
+    return np.round(
+        frac[bonds[:, 0]] - frac[bonds[:, 1]]
+    ).astype(int)
+
+
+def whole_molecules(elements, frac, lattice, bonds, images, name=''):
+    """
+    Yield the discrete molecules of a unit cell as pyWindow molecule
+    dicts (elements and whole cartesian coordinates).
+
+    Yields:
+        indices (ndarray) - unit cell atom indices of molecule
+        molecule (dict) - elements and coordinates of molecule
+        polymeric (bool) - True if molecule bonds to its own image, so
+            it is a network and not a discrete molecule
+
+    """
+    for indices, offsets, polymeric in discrete_molecules(
+        len(elements), bonds, images
+    ):
+        if polymeric:
+            logging.warning(
+                f'{name}: polymeric molecule of {len(indices)} atoms'
+            )
+        yield indices, {
+            'elements': np.array([elements[i] for i in indices]),
+            'coordinates': molecule_coordinates(
+                frac, lattice, indices, offsets
+            )
+        }, polymeric
+
+
+def modular_system(file, molecules):
+    """
+    Build a pywindow.MolecularSystem of whole molecules, with molecules
+    dict as after pywindow.MolecularSystem.make_modular().
+
+    """
+    import pywindow as pw
+    system_id = os.path.basename(file).replace('.pdb', '')
+    rebuilt_structure = pw.MolecularSystem.load_system(
+        {
+            'elements': np.concatenate([i['elements'] for i in molecules]),
+            'coordinates': np.concatenate(
+                [i['coordinates'] for i in molecules]
+            ),
+            'unit_cell': np.array(read_cellpar(file))
+        },
+        system_id=system_id
+    )
+    rebuilt_structure.molecules = {
+        i: pw.molecular.Molecule(mol, system_id, i)
+        for i, mol in enumerate(molecules)
+    }
+    return rebuilt_structure
+
+
+def modularize_from_bonds(file, bond_file=None):
+    """
+    Build the discrete molecules of a packed cell PDB from its bond
+    table, without distance-based bond perception.
+
+    Returns:
+        rebuilt_structure (pywindow.MolecularSystem) - whole molecules
+            of the unit cell
+
+    """
+    if bond_file is None:
+        bond_file = bond_table_file(file)
+    elements, frac, lattice = read_cell_pdb(file)
+    bonds = read_bond_table(bond_file)
+    if len(bonds) > 0 and bonds.max() >= len(elements):
+        raise ValueError(f'{bond_file} does not match atoms of {file}')
+    images = bond_images(frac, bonds)
+    molecules = [
+        i[1] for i in whole_molecules(
+            elements, frac, lattice, bonds, images, name=file
+        )
+    ]
+    return modular_system(file, molecules)
+
+
+class PolymericError(ValueError):
+    """
+    Raised for a structure with a polymeric (or disordered) network
+    where discrete molecules are expected.
+
+    """
+
+
+def iter_molecules(file, bond_tables=False, tol=0.4, polymeric='skip'):
+    """
+    Yield the molecules of a packed cell PDB one at a time.
+
+    Only the unit cell arrays and its bond graph are held in memory
+    with the molecule being yielded, so callers can analyse and discard
+    each molecule (unlike the supercell and full molecules dict of the
+    pyWindow rebuild).
+
+    Polymeric molecules (bonded to their own image, e.g. coordination
+    polymers or networks of overlapping disordered atoms) are not
+    cages: they are skipped, or PolymericError is raised when the
+    first is found if polymeric='raise'.
+
+    Keyword Arguments:
+        file (str) - packed cell PDB with CRYST1 record
+        bond_tables (bool) - use the CSD bond table of file if
+            available, otherwise perceive bonds with tolerance tol
+        polymeric (str) - 'skip' or 'raise'
+
+    Yields:
+        molecule (int) - id of molecule
+        mol (pywindow.Molecule) - whole molecule
+
+    """
+    import pywindow as pw
+    elements, frac, lattice = read_cell_pdb(file)
+    if bond_tables and os.path.isfile(bond_table_file(file)):
+        bonds = read_bond_table(bond_table_file(file))
+        images = bond_images(frac, bonds)
+    else:
+        bonds, images = perceive_periodic_bonds(
+            elements, frac, lattice, tol=tol
+        )
+    system_id = os.path.basename(file).replace('.pdb', '')
+    for i, (_, molecule, is_polymeric) in enumerate(whole_molecules(
+        elements, frac, lattice, bonds, images, name=file
+    )):
+        if is_polymeric:
+            if polymeric == 'raise':
+                raise PolymericError(f'{file} has a polymeric molecule')
+            continue
+        yield i, pw.molecular.Molecule(molecule, system_id, i)
+
+
+def modularize(file, bond_tables=False):
+    """
+    Modularize a packed cell PDB, from its bond table if requested and
+    available, otherwise with atools.modularize.
+
+    """
+    if bond_tables and os.path.isfile(bond_table_file(file)):
+        return modularize_from_bonds(file)
+    import atools
+    return atools.modularize(file=file)
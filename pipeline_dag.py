@@ -0,0 +1,529 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# Distributed under the terms of the MIT License.
+
+"""
+Script to run the pipeline from a list of REFCODEs to pore topologies
+as a DAG of per-REFCODE stages:
+
+    extract -> sort -> classify -> most_porous
+                    -> remove_solvent -> append_com
+    (then collate over all REFCODEs)
+
+Each stage declares its input and output files per REFCODE. A stage is
+rerun only if its key (hash of script, the repo-local modules it
+imports, arguments and the hashes of its inputs) differs from the one
+in the DAG ledger, or one of its outputs is missing. Outputs are hashed
+after each run, so a rerun that gives identical outputs does not
+trigger downstream stages. REFCODEs whose structure is missing
+(extract) or that have no pore (sort) are not passed downstream. Stages
+of different REFCODEs, and independent stages of one REFCODE, run
+concurrently.
+
+Stage outputs are removed before a stage runs, so that the scripts'
+own skip logic does not keep stale results. Outputs may be glob
+patterns (e.g. the RC_MP_n.pdb of classify), and the rebuilt structure
+that atools.modularize writes and reuses is an output of sort, so it is
+removed when the extracted structure changes. classify and most_porous
+both rebuild and write RC_MP_n.pdb, so most_porous runs after classify
+and writes its molecules to most_porous/.
+
+Author: Andrew Tarzia
+
+Date Created: 19 Oct 2026
+
+"""
+
+import os
+import sys
+import ast
+import glob
+import json
+import shlex
+import hashlib
+import logging
+import argparse
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from provenance import file_hash
+
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def record_hash(record):
+    """
+    Return sha1 of a JSON serialisable record.
+
+    """
+    return hashlib.sha1(
+        json.dumps(record, sort_keys=True).encode()
+    ).hexdigest()
+
+
+def local_modules(script):
+    """
+    Return the repo-local modules that script imports, directly or
+    through other local modules (including imports inside functions).
+
+    Modules are looked up next to the importing file and in this
+    directory, as the scripts import them.
+
+    """
+    found = set()
+    to_visit = [script]
+    while to_visit:
+        file = to_visit.pop()
+        with open(file, 'r') as f:
+            tree = ast.parse(f.read(), filename=file)
+        names = set()
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                names.update(i.name.split('.')[0] for i in node.names)
+            elif isinstance(node, ast.ImportFrom) and node.level == 0:
+                names.add(node.module.split('.')[0])
+        for name in names:
+            for directory in [os.path.dirname(file), HERE]:
+                module = os.path.join(directory, name + '.py')
+                if os.path.isfile(module):
+                    if module not in found:
+                        found.add(module)
+                        to_visit.append(module)
+                    break
+    return sorted(found)
+
+
+class Stage:
+    """
+    Per-REFCODE stage of the pipeline.
+
+    Keyword Arguments:
+        name (str) - name of stage
+        script (str) - script relative to this file
+        args (list) - arguments of script, {RC} is the REFCODE
+        deps (list) - names of upstream stages
+        inputs (list) - input files (outputs of deps)
+        outputs (list) - output files (or glob patterns)
+        removes (list) - input files the script may delete
+        gate (function) - gate(RC, record) is False if downstream
+            stages should not run for RC
+
+    """
+
+    def __init__(self, name, script, args, deps=[], inputs=[],
+                 outputs=[], removes=[], gate=None):
+        self.name = name
+        self.script = os.path.join(HERE, script)
+        self.args = args
+        self.deps = deps
+        self.inputs = inputs
+        self.outputs = outputs
+        self.removes = removes
+        self.gate = gate
+
+    def files(self, files, RC):
+        return [i.format(RC=RC) for i in files]
+
+    def output_files(self, RC):
+        """
+        Output files of RC, with glob patterns expanded.
+
+        """
+        files = []
+        for file in self.files(self.outputs, RC):
+            if glob.has_magic(file):
+                files.extend(sorted(glob.glob(file)))
+            else:
+                files.append(file)
+        return files
+
+
+def has_structure(RC, record):
+    """
+    Gate of extract: a structure was extracted.
+
+    """
+    return record['outputs'].get(f'{RC}_extracted.pdb') is not None
+
+
+def kept_by_sort(RC, record):
+    """
+    Gate of sort: the structure was kept (has a pore).
+
+    """
+    file = f'{RC}_sort.csv'
+    if not os.path.isfile(file):
+        return False
+    with open(file, 'r') as f:
+        f.readline()
+        return any(i.rstrip().split(',')[-1] == 'N' for i in f)
+
+
+STAGES = [
+    Stage(
+        'extract', 'CSD_API_python3/REFCODEs_to_PDBs.py',
+        ['{RC}_list.txt', '{RC}_missing.txt', '{RC}_cross_refs.txt'],
+        outputs=['{RC}_extracted.pdb', '{RC}_extracted_bonds.csv'],
+        gate=has_structure
+    ),
+    Stage(
+        'sort', 'sort_structures.py',
+        ['{RC}_list.txt', '{RC}_sort.csv', 'pdb'],
+        deps=['extract'], inputs=['{RC}_extracted.pdb'],
+        outputs=['{RC}_sort.csv', '{RC}_extracted_rebuild.pdb'],
+        removes=['{RC}_extracted.pdb', '{RC}_extracted_rebuild.pdb'],
+        gate=kept_by_sort
+    ),
+    Stage(
+        'classify', 'classify_structures.py',
+        ['{RC}_list.txt', '{RC}_classify.csv'],
+        deps=['sort'], inputs=['{RC}_extracted.pdb'],
+        outputs=['{RC}_classify.csv', '{RC}_MP_*.pdb']
+    ),
+    Stage(
+        'most_porous', 'extract_most_porous.py',
+        [
+            '{RC}_list.txt', '{RC}_most_porous.csv',
+            '--mp_dir', 'most_porous'
+        ],
+        deps=['sort', 'classify'], inputs=['{RC}_extracted.pdb'],
+        outputs=['{RC}_most_porous.csv', 'most_porous/{RC}_MP_*.pdb']
+    ),
+    Stage(
+        'remove_solvent', 'remove_solvent.py',
+        ['{RC}_extracted.pdb', 'NONE'],
+        deps=['sort'], inputs=['{RC}_extracted.pdb'],
+        outputs=['{RC}_extracted_nosolv.pdb', '{RC}_extracted_nosolv.cif']
+    ),
+    Stage(
+        'append_com', 'pore_topologies/append_all_COM.py',
+        ['{RC}_extracted_nosolv.pdb', 'NONE'],
+        deps=['remove_solvent'], inputs=['{RC}_extracted_nosolv.pdb'],
+        outputs=['{RC}_extracted_nosolv_appended.cif']
+    ),
+]
+
+
+class DAGLedger:
+    """
+    JSON ledger of the key and output hashes of each stage and REFCODE.
+
+    """
+
+    def __init__(self, ledger_file):
+        self.ledger_file = ledger_file
+        self.records = {}
+        self._lock = threading.Lock()
+        if os.path.isfile(ledger_file):
+            with open(ledger_file, 'r') as f:
+                self.records = json.load(f)
+
+    def get(self, stage, RC):
+        with self._lock:
+            return self.records.get(stage, {}).get(RC)
+
+    def set(self, stage, RC, record):
+        with self._lock:
+            self.records.setdefault(stage, {})[RC] = record
+            temp = f'{self.ledger_file}.tmp'
+            with open(temp, 'w') as f:
+                json.dump(self.records, f, indent=1, sort_keys=True)
+            os.replace(temp, self.ledger_file)
+
+
+class Pipeline:
+    """
+    Runs the stages of a list of REFCODEs.
+
+    Keyword Arguments:
+        stages (list) - Stage in topological order
+        ledger (DAGLedger) - ledger of previous runs
+        extra_args (dict) - stage: further arguments of its script
+        force (list) - names of stages to rerun regardless of key
+
+    """
+
+    def __init__(self, stages, ledger, extra_args={}, force=[]):
+        self.stages = {i.name: i for i in stages}
+        self.order = [i.name for i in stages]
+        self.ledger = ledger
+        self.extra_args = extra_args
+        self.force = force
+        self.modules = {i.name: local_modules(i.script) for i in stages}
+        self.producer = {}
+        for stage in stages:
+            for i in stage.outputs:
+                if not glob.has_magic(i):
+                    self.producer[i] = stage.name
+        # reruns of upstream stages for a missing input
+        self._rc_locks = {}
+        self._lock = threading.Lock()
+
+    def _rc_lock(self, RC):
+        with self._lock:
+            return self._rc_locks.setdefault(RC, threading.Lock())
+
+    def command(self, stage, RC):
+        return (
+            [sys.executable, stage.script]
+            + stage.files(stage.args, RC)
+            + self.extra_args.get(stage.name, [])
+        )
+
+    def key(self, stage, RC):
+        """
+        Hash of script, its local modules, arguments and input hashes
+        of stage for RC.
+
+        Inputs are hashed on disk, so that edited files are noticed;
+        the hash recorded by the producer is only used for inputs that
+        a stage may have deleted (e.g. the pdb of sort).
+
+        """
+        inputs = {}
+        removable = self.removable(RC)
+        for template in stage.inputs:
+            file = template.format(RC=RC)
+            record = self.ledger.get(self.producer[template], RC)
+            if os.path.isfile(file):
+                inputs[file] = file_hash(file)
+            elif (
+                file in removable and record is not None
+                and file in record['outputs']
+            ):
+                inputs[file] = record['outputs'][file]
+            else:
+                inputs[file] = None
+        record = {
+            'script': file_hash(stage.script),
+            'modules': {
+                os.path.relpath(i, HERE): file_hash(i)
+                for i in self.modules[stage.name]
+            },
+            'command': self.command(stage, RC)[2:],
+            'inputs': inputs,
+        }
+        return record_hash(record)
+
+    def removable(self, RC):
+        files = set()
+        for stage in self.stages.values():
+            files.update(stage.files(stage.removes, RC))
+        return files
+
+    def is_current(self, stage, RC, key):
+        if stage.name in self.force:
+            return False
+        record = self.ledger.get(stage.name, RC)
+        if record is None or record['key'] != key:
+            return False
+        removable = self.removable(RC)
+        for file, sha1 in record['outputs'].items():
+            if sha1 is None or file in removable:
+                continue
+            if not os.path.isfile(file):
+                return False
+        return True
+
+    def execute(self, stage, RC, key):
+        """
+        Run stage for RC and record its outputs.
+
+        Returns:
+            (bool) - True if script succeeded
+
+        """
+        for file in stage.output_files(RC):
+            if os.path.isfile(file):
+                os.remove(file)
+        with open(f'{RC}_{stage.name}.log', 'w') as log:
+            process = subprocess.run(
+                self.command(stage, RC), stdout=log, stderr=subprocess.STDOUT
+            )
+        if process.returncode != 0:
+            logging.warning(
+                f'> {stage.name} failed for {RC} (see {RC}_{stage.name}.log)'
+            )
+            return False
+        outputs = {
+            i: file_hash(i) if os.path.isfile(i) else None
+            for i in stage.output_files(RC)
+        }
+        self.ledger.set(stage.name, RC, {'key': key, 'outputs': outputs})
+        return True
+
+    def ensure_inputs(self, stage, RC):
+        """
+        Rerun the producers of missing inputs (e.g. removed by sort).
+
+        """
+        for template in stage.inputs:
+            if os.path.isfile(template.format(RC=RC)):
+                continue
+            producer = self.stages[self.producer[template]]
+            with self._rc_lock(RC):
+                if os.path.isfile(template.format(RC=RC)):
+                    continue
+                if not self.ensure_inputs(producer, RC):
+                    return False
+                logging.info(f'> rerunning {producer.name} for {RC}')
+                if not self.execute(producer, RC, self.key(producer, RC)):
+                    return False
+        return True
+
+    def run_task(self, name, RC):
+        """
+        Run one stage of one REFCODE if it is not current.
+
+        Returns:
+            (str) - 'ran', 'current', 'failed' or 'gated'
+
+        """
+        stage = self.stages[name]
+        key = self.key(stage, RC)
+        if self.is_current(stage, RC, key):
+            status = 'current'
+        else:
+            if not self.ensure_inputs(stage, RC):
+                return 'failed'
+            # the key depends on the hashes of rerun inputs
+            key = self.key(stage, RC)
+            logging.info(f'> running {name} for {RC}')
+            if not self.execute(stage, RC, key):
+                return 'failed'
+            status = 'ran'
+        if stage.gate is not None:
+            if not stage.gate(RC, self.ledger.get(name, RC)):
+                return 'gated'
+        return status
+
+    def run(self, refcodes, n_workers):
+        """
+        Run all stages of refcodes with n_workers concurrent scripts.
+
+        Returns:
+            (dict) - (stage, RC): status
+
+        """
+        for RC in refcodes:
+            if not os.path.isfile(f'{RC}_list.txt'):
+                with open(f'{RC}_list.txt', 'w') as f:
+                    f.write(f'{RC}\n')
+        status = {}
+        pending = [(name, RC) for RC in refcodes for name in self.order]
+        running = {}
+        with ThreadPoolExecutor(max_workers=n_workers) as pool:
+            while pending or running:
+                still_pending = []
+                for name, RC in pending:
+                    deps = [
+                        status.get((i, RC)) for i in self.stages[name].deps
+                    ]
+                    if any(i is None for i in deps):
+                        still_pending.append((name, RC))
+                    elif all(i in ['ran', 'current'] for i in deps):
+                        future = pool.submit(self.run_task, name, RC)
+                        running[future] = (name, RC)
+                    else:
+                        # upstream failed or filtered RC out
+                        status[(name, RC)] = 'skipped'
+                pending = still_pending
+                if not running:
+                    continue
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    status[running.pop(future)] = future.result()
+        return status
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=(
+            'Run the pipeline from REFCODEs to pore topologies, skipping '
+            'stages whose inputs, arguments and scripts are unchanged.'
+        )
+    )
+    parser.add_argument(
+        'REFCODE_file', help='file with list of REFCODEs'
+    )
+    parser.add_argument(
+        'n_workers', type=int, help='number of concurrent scripts'
+    )
+    parser.add_argument(
+        '--ledger', default='pipeline_dag.json',
+        help='JSON ledger of stage keys and output hashes'
+    )
+    parser.add_argument(
+        '--stages', nargs='*', default=[i.name for i in STAGES],
+        choices=[i.name for i in STAGES],
+        help='stages to run (with their upstream stages)'
+    )
+    parser.add_argument(
+        '--stage_args', nargs='*', default=[], metavar='STAGE=ARGS',
+        help=(
+            'further arguments of the script of a stage, e.g. '
+            'classify="--stream --window_engine graph"; they are part '
+            'of the stage key'
+        )
+    )
+    parser.add_argument(
+        '--force', nargs='*', default=[], choices=[i.name for i in STAGES],
+        help='rerun these stages even if their key is unchanged'
+    )
+    parser.add_argument(
+        '--collate', nargs=3, default=None,
+        metavar=('WINDOW_FILE', 'PORE_FILE', 'MANIFEST'),
+        help=(
+            'collate window sizes of all append_com JSONs after the '
+            'per-REFCODE stages (collate_window_sizes.py)'
+        )
+    )
+    args = parser.parse_args()
+
+    extra_args = {}
+    for i in args.stage_args:
+        name, value = i.split('=', 1)
+        extra_args[name] = shlex.split(value)
+    # requested stages and everything upstream of them
+    by_name = {i.name: i for i in STAGES}
+    needed = set()
+    to_visit = list(args.stages)
+    while to_visit:
+        name = to_visit.pop()
+        if name not in needed:
+            needed.add(name)
+            to_visit.extend(by_name[name].deps)
+    stages = [i for i in STAGES if i.name in needed]
+
+    refcodes = sorted(set(
+        i.strip() for i in open(args.REFCODE_file, 'r') if i.strip()
+    ))
+    pipeline = Pipeline(
+        stages, DAGLedger(args.ledger), extra_args=extra_args,
+        force=args.force
+    )
+    status = pipeline.run(refcodes, args.n_workers)
+    for name in pipeline.order:
+        counts = {}
+        for RC in refcodes:
+            i = status[(name, RC)]
+            counts[i] = counts.get(i, 0) + 1
+        logging.info(
+            f'> {name}: '
+            + ', '.join(f'{counts[i]} {i}' for i in sorted(counts))
+        )
+
+    if args.collate is not None:
+        window_file, pore_file, manifest = args.collate
+        subprocess.run([
+            sys.executable,
+            os.path.join(HERE, 'pore_topologies/collate_window_sizes.py'),
+            '*_nosolv_*.json', window_file, pore_file, manifest
+        ], check=True)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='')
+    main()
@@ -0,0 +1,179 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# Distributed under the terms of the MIT License.
+
+"""
+Functions for a fast upper bound of the pore diameter of molecules, used
+to reject clearly non-porous molecules before pyWindow is run.
+
+pyWindow's pore_diameter_opt is the largest pore diameter at a point of
+a box of half-width |r| around the centre of mass, where r is the pore
+radius at the centre of mass. Two bounds are computed for all molecules
+of a structure, with the atomic masses and vdW radii of pyWindow:
+    box - no point in the box (furthest at a corner, sqrt(3) |r| away)
+        can have a pore radius above r + sqrt(3) |r|
+    empty sphere - any point in the convex hull of the molecule is at
+        most the largest Delaunay circumradius from its nearest atom
+        centre, minus the smallest vdW radius of the molecule
+The empty sphere bound only applies if the whole box is inside the
+convex hull, in which case the smaller of the two is used. A molecule
+is only rejected if its bound is below the threshold by more than a
+margin.
+
+Author: Andrew Tarzia
+
+Date Created: 19 Oct 2026
+
+"""
+
+import logging
+import numpy as np
+from scipy.spatial import Delaunay
+
+
+# for elements missing from the pyWindow tables
+DEFAULT_VDW = 2.00
+DEFAULT_MASS = 0.0
+
+
+def vdw_radii(elements):
+    from pywindow.tables import atomic_vdw_radius
+    return np.array([
+        atomic_vdw_radius.get(i.upper(), DEFAULT_VDW) for i in elements
+    ])
+
+
+def masses(elements):
+    from pywindow.tables import atomic_mass
+    return np.array([
+        atomic_mass.get(i.upper(), DEFAULT_MASS) for i in elements
+    ])
+
+
+def com_pore_diameters(elements, coordinates, n_atoms):
+    """
+    Pore diameter at the centre of mass of a batch of molecules.
+
+    Keyword Arguments:
+        elements (list) - elements of all molecules, concatenated
+        coordinates (ndarray) - (N, 3) coordinates of all molecules,
+            concatenated
+        n_atoms (ndarray) - number of atoms of each molecule
+
+    Returns:
+        (ndarray, ndarray) - diameter and centre of mass of each molecule
+
+    """
+    n_atoms = np.asarray(n_atoms)
+    starts = np.concatenate([[0], np.cumsum(n_atoms)[:-1]])
+    weights = masses(elements)
+    coms = np.add.reduceat(coordinates * weights[:, None], starts, axis=0)
+    coms /= np.add.reduceat(weights, starts)[:, None]
+    distances = np.linalg.norm(
+        coordinates - np.repeat(coms, n_atoms, axis=0), axis=1
+    )
+    surface = distances - vdw_radii(elements)
+    return 2 * np.minimum.reduceat(surface, starts), coms
+
+
+def empty_sphere_diameter(elements, coordinates, points):
+    """
+    Upper bound of the pore diameter at any point of the convex hull of
+    a molecule.
+
+    For a point p of a tetrahedron with circumcentre c and circumradius
+    R, some vertex v has |p - v|^2 <= R^2 - |p - c|^2, so no point of
+    the convex hull is further than the largest circumradius of the
+    Delaunay tetrahedra from an atom centre, and no atom has a smaller
+    vdW radius than the smallest of the molecule.
+
+    Keyword Arguments:
+        elements (list) - elements of molecule
+        coordinates (ndarray) - (N, 3) coordinates of molecule
+        points (ndarray) - (M, 3) points that must be in the convex hull
+
+    Returns:
+        (float) - upper bound, inf if any of points is outside the
+            convex hull
+
+    """
+    if len(coordinates) < 4:
+        return np.inf
+    try:
+        # joggle input so that flat molecules do not fail; circumspheres
+        # are computed from the unmoved coordinates, where those of
+        # flat tetrahedra become large or infinite (no bound)
+        tri = Delaunay(coordinates, qhull_options='QJ')
+    except Exception:
+        return np.inf
+    if np.any(tri.find_simplex(points) < 0):
+        return np.inf
+    tetra = coordinates[tri.simplices]
+    # circumcentres from the linear system 2(p_i - p_0).c = |p_i|^2 - |p_0|^2
+    A = 2 * (tetra[:, 1:] - tetra[:, :1])
+    b = (tetra[:, 1:] ** 2).sum(axis=2) - (tetra[:, :1] ** 2).sum(axis=2)
+    with np.errstate(all='ignore'):
+        try:
+            centres = np.linalg.solve(A, b[..., None])[..., 0]
+        except np.linalg.LinAlgError:
+            return np.inf
+        radii = np.linalg.norm(centres - tetra[:, 0], axis=1)
+    if not np.all(np.isfinite(radii)):
+        return np.inf
+    return 2 * (radii.max() - vdw_radii(elements).min())
+
+
+def estimate_pore_diameters(molecules):
+    """
+    Upper bound of the pore_diameter_opt of a batch of molecules.
+
+    Keyword Arguments:
+        molecules (list) - (elements, coordinates) of each molecule
+
+    Returns:
+        (ndarray) - bound of the diameter of each molecule
+
+    """
+    if len(molecules) == 0:
+        return np.empty(0)
+    n_atoms = np.array([len(i[0]) for i in molecules])
+    elements = np.concatenate([np.asarray(i[0]) for i in molecules])
+    coordinates = np.concatenate([np.asarray(i[1]) for i in molecules])
+    diameters, coms = com_pore_diameters(elements, coordinates, n_atoms)
+    estimates = diameters + np.sqrt(3) * np.abs(diameters)
+    # corners of the box pyWindow searches
+    signs = np.array(np.meshgrid([-1, 1], [-1, 1], [-1, 1])).reshape(3, -1).T
+    for i, (elem, coords) in enumerate(molecules):
+        corners = coms[i] + signs * abs(diameters[i]) / 2
+        estimates[i] = min(
+            estimates[i],
+            empty_sphere_diameter(
+                np.asarray(elem), np.asarray(coords), corners
+            )
+        )
+    return estimates
+
+
+def prescreen(molecules, threshold=0.0, margin=1.0):
+    """
+    Select molecules that may have a pore diameter above threshold.
+
+    Keyword Arguments:
+        molecules (dict) - id: pywindow.Molecule
+        threshold (float) - pore diameter a molecule must exceed
+        margin (float) - molecules are kept if their bound is above
+            threshold - margin
+
+    Returns:
+        (list) - ids of molecules to analyse with pyWindow
+
+    """
+    ids = list(molecules)
+    estimates = estimate_pore_diameters([
+        (molecules[i].elements, molecules[i].coordinates) for i in ids
+    ])
+    keep = [i for i, j in zip(ids, estimates) if j > threshold - margin]
+    logging.debug(
+        f'prescreen kept {len(keep)} of {len(ids)} molecules'
+    )
+    return keep
@@ -11,23 +11,30 @@ Date Created: 19 Feb 2019
 """
 
 import sys
-from ase.io import read
-import pywindow as pw
 import logging
 import os
-import atools
 
 
 def main():
-    if (not len(sys.argv) == 3):
+    if (not len(sys.argv) >= 3):
         print("""
-    Usage: append_all_COM.py pdb ignore
+    Usage: append_all_COM.py pdb ignore [provenance] [queue=DIR]
         pdb: file (.pdb) :
             to analyze and add pseudo atoms to
             ('*.pdb' for all in working dir)
         ignore (str) :
             string to use to ignore certain files
             (set NONE if not used)
+        provenance (str) :
+            set to 'provenance' to stamp JSONs with provenance keys
+            and redo structures whose inputs, parameters or
+            pyWindow/atools code changed
+            (ledger in append_all_COM.provenance.json, with a
+            queue in the shard of each node)
+        queue=DIR (str) :
+            claim files from a lease-based work queue in shared
+            directory DIR (work_queue.py) so that several nodes can
+            run on the same pdbs
         """)
         sys.exit()
     if '*' in sys.argv[1]:
@@ -42,15 +49,60 @@ def main():
     else:
         pdbs = [sys.argv[1]]
 
+    from ase.io import read
+    import pywindow as pw
+    import atools
+    options = sys.argv[3:]
+    queue_dir = None
+    for i in options:
+        if i.startswith('queue='):
+            queue_dir = i.split('=', 1)[1]
+    # provenance.py and work_queue.py are in the parent directory
+    sys.path.insert(
+        0, os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    )
+    n_pdbs = len(pdbs)
+    queue = None
+    if queue_dir is not None:
+        from work_queue import WorkQueue
+        queue = WorkQueue(queue_dir)
+
+    ledger = None
+    if 'provenance' in options:
+        from provenance import ProvenanceLedger, stamp_jsons
+        ledger_file = 'append_all_COM.provenance.json'
+        if queue is not None:
+            # each node keeps the ledger of its files in its shard
+            ledger_file = queue.shard_file(ledger_file)
+        ledger = ProvenanceLedger(
+            ledger_file,
+            params={'analysis': {'atom_limit': 20}}
+        )
+        if queue is not None:
+            # redo outdated files done by this node
+            for file in pdbs:
+                if file in ledger.records and ledger.invalidate(file, file):
+                    queue.reopen(file)
+            ledger.save()
+
+    if queue is not None:
+        # files claimed by this node
+        pdbs = queue.items(pdbs)
+
     count = 1
     for file in pdbs:
-        # do not redo
+        # do not redo (unless provenance changed)
         if os.path.isfile(file.replace('.pdb', '_appended.cif')):
-            count += 1
-            continue
-        logging.info(f'doing {file}: {count} of {len(pdbs)}')
+            if ledger is None or not ledger.invalidate(file, file):
+                if queue is not None:
+                    queue.complete(file)
+                count += 1
+                continue
+        logging.info(f'doing {file}: {count} of {n_pdbs}')
         ASE_structure = read(file)
         if ASE_structure is None:
+            if queue is not None:
+                queue.complete(file)
             count += 1
             continue
         pdb = file
@@ -66,6 +118,10 @@ def main():
         if struct is None:
             # handle pyWindow failure
             sys.exit(f'pyWindow failure on {pdb}')
+        if queue is not None and not queue.holds(file):
+            # lease lost, the file is done by another node
+            count += 1
+            continue
         # run analysis
         COM_dict = atools.analyze_rebuilt(
             struct,
@@ -82,8 +138,20 @@ def main():
             file,
             suffix='.pdb'
         )
+        if ledger is not None:
+            keys = ledger.stamp(file, file)
+            stamp_jsons(file.replace('.pdb', ''), keys, COM_dict)
+            ledger.save()
+        if queue is not None:
+            queue.complete(file)
         count += 1
 
+    if ledger is not None:
+        # keep baseline stamps of skipped files
+        ledger.save()
+    if queue is not None:
+        queue.close()
+
 
 if __name__ == "__main__":
     logging.basicConfig(level=logging.INFO, format='')
@@ -0,0 +1,346 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# Distributed under the terms of the MIT License.
+
+"""
+Script to build the periodic cage-window network of crystal structures
+and determine the dimensionality of their channels.
+
+Cages are nodes and an edge is placed between two cages when one
+window of each cage face each other (window centroids within a
+tolerance) under periodic boundary conditions. The cage and window
+COMs are read from the JSON files written by `atools.analyze_rebuilt`
+(i.e. after running append_all_COM.py).
+
+Author: Andrew Tarzia
+
+Date Created: 19 Oct 2026
+"""
+
+import sys
+import logging
+import os
+import re
+import json
+import itertools
+import numpy as np
+from scipy.spatial import cKDTree
+
+
+def read_lattice(file):
+    """
+    Read the lattice vectors of a structure file.
+
+    PDB files are read from their CRYST1 line only, which avoids
+    parsing all atoms. Other formats are read with ASE.
+
+    """
+    if file[-4:] == '.pdb':
+        # same orientation as ASE uses to write PDB files
+        from ase.geometry import cellpar_to_cell
+        with open(file, 'r') as f:
+            for line in f:
+                if line.startswith('CRYST1'):
+                    cellpar = [float(i) for i in line[6:54].split()]
+                    return np.array(cellpar_to_cell(cellpar))
+        return None
+    from ase.io import read
+    return np.array(read(file).cell)
+
+
+def index_cage_jsons(directory):
+    """
+    Group the analyze_rebuilt JSON files of a directory by prefix.
+
+    Returns:
+        (dict) - prefix (with directory): [(molecule id, file)]
+
+    """
+    pattern = re.compile(r'(.+)_(\d+)\.json$')
+    index = {}
+    for file in sorted(os.listdir(directory or '.')):
+        match = pattern.match(file)
+        if match is None:
+            continue
+        index.setdefault(
+            os.path.join(directory, match.group(1)), []
+        ).append((int(match.group(2)), os.path.join(directory, file)))
+    return index
+
+
+def read_cage_data(file_prefix, index=None):
+    """
+    Read cage and window COMs from analyze_rebuilt JSON files.
+
+    Keyword Arguments:
+        file_prefix (str) - prefix of JSON files
+        index (dict) - output of index_cage_jsons for the directory of
+            file_prefix (listed here if not given)
+
+    Returns:
+        cages (list) - (molecule id, COM (3, ), window COMs (n, 3))
+            for each cage with a prefix of file_prefix
+
+    """
+    if index is None:
+        index = index_cage_jsons(os.path.dirname(file_prefix))
+    cages = []
+    for molecule, file in index.get(file_prefix, []):
+        with open(file, 'rb') as f:
+            data = json.load(f)
+        window_coms = data['windows']['centre_of_mass']
+        if window_coms is None:
+            window_coms = np.empty((0, 3))
+        cages.append((
+            molecule,
+            np.array(data['centre_of_mass'], dtype=float),
+            np.array(window_coms, dtype=float).reshape(-1, 3)
+        ))
+    return cages
+
+
+class PeriodicUnionFind:
+    """
+    Union-find that tracks the periodic image offset of each node.
+
+    When two nodes that are already in the same component are joined
+    through a different image, the difference is a lattice vector
+    that the component spans. The rank of these vectors is the
+    dimensionality of the component.
+
+    """
+
+    def __init__(self, n):
+        self.parent = list(range(n))
+        self.offset = np.zeros((n, 3), dtype=int)
+        self.cycles = {i: [] for i in range(n)}
+
+    def find(self, x):
+        """
+        Return root of x and image offset of x relative to the root.
+
+        """
+        path = []
+        while self.parent[x] != x:
+            path.append(x)
+            x = self.parent[x]
+        root = x
+        # compress path, accumulating offsets from the top down
+        total = np.zeros(3, dtype=int)
+        for node in reversed(path):
+            total = total + self.offset[node]
+            self.offset[node] = total
+            self.parent[node] = root
+        return root, (self.offset[path[0]] if path else total)
+
+    def _add_cycle(self, root, vector):
+        basis = self.cycles[root]
+        if len(basis) == 3 or not np.any(vector):
+            return
+        if np.linalg.matrix_rank(np.array(basis + [vector])) > len(basis):
+            basis.append(vector)
+
+    def union(self, a, b, image):
+        """
+        Join node b in periodic image `image` to node a.
+
+        """
+        ra, oa = self.find(a)
+        rb, ob = self.find(b)
+        if ra == rb:
+            self._add_cycle(ra, oa + image - ob)
+            return
+        self.parent[rb] = ra
+        self.offset[rb] = oa + image - ob
+        for vector in self.cycles.pop(rb):
+            self._add_cycle(ra, vector)
+
+    def components(self):
+        """
+        Return dict of root: (list of nodes, dimensionality).
+
+        """
+        comps = {}
+        for node in range(len(self.parent)):
+            root, _ = self.find(node)
+            comps.setdefault(root, []).append(node)
+        return {
+            root: (comps[root], len(self.cycles[root]))
+            for root in comps
+        }
+
+
+def build_network(lattice, cages, tolerance=1.0):
+    """
+    Find edges between cages whose windows face each other.
+
+    Windows are matched with a KD-tree over the 27 nearest periodic
+    images of all windows, which gives the minimum image match for
+    window separations smaller than the cell.
+
+    Keyword Arguments:
+        lattice (ndarray) - (3, 3) lattice vectors as rows
+        cages (list) - output of read_cage_data
+        tolerance (float) - maximum distance between window COMs of
+            two connected cages (Angstrom)
+
+    Returns:
+        edges (list) - (cage i, cage j, image of j) tuples
+
+    """
+    inv_lattice = np.linalg.inv(lattice)
+    owners = []
+    windows = []
+    directions = []
+    for i, (_, com, window_coms) in enumerate(cages):
+        # place every cage (and its windows) in the home cell
+        shift = np.floor(com @ inv_lattice) @ lattice
+        for window in window_coms:
+            owners.append(i)
+            windows.append(window - shift)
+            directions.append(window - com)
+    if len(windows) == 0:
+        return []
+    owners = np.array(owners)
+    windows = np.array(windows)
+    directions = np.array(directions)
+
+    images = np.array(list(itertools.product([-1, 0, 1], repeat=3)))
+    image_points = (
+        windows[None, :, :] + (images @ lattice)[:, None, :]
+    ).reshape(-1, 3)
+    tree = cKDTree(image_points)
+    n_windows = len(windows)
+    edges = set()
+    for a, hits in enumerate(tree.query_ball_point(windows, r=tolerance)):
+        for hit in hits:
+            image_id, b = divmod(hit, n_windows)
+            image = images[image_id]
+            if b == a and not np.any(image):
+                continue
+            # windows face each other if they point in opposite
+            # directions from their cage COMs
+            if np.dot(directions[a], directions[b]) >= 0:
+                continue
+            i, j = int(owners[a]), int(owners[b])
+            key = (i, j, tuple(int(k) for k in image))
+            reverse = (j, i, tuple(int(-k) for k in image))
+            if reverse not in edges:
+                edges.add(key)
+    return sorted(edges)
+
+
+def channel_dimensionality(n_cages, edges):
+    """
+    Determine the dimensionality of the cage network.
+
+    Returns:
+        dimensionality (int) - maximum dimensionality of all
+            components (0 to 3)
+        components (dict) - output of PeriodicUnionFind.components
+
+    """
+    uf = PeriodicUnionFind(n_cages)
+    for i, j, image in edges:
+        uf.union(i, j, np.array(image))
+    components = uf.components()
+    if len(components) == 0:
+        return 0, components
+    dimensionality = max(components[i][1] for i in components)
+    return dimensionality, components
+
+
+def analyse_structure(file, tolerance, index=None):
+    """
+    Build the cage network of one structure file.
+
+    Keyword Arguments:
+        file (str) - structure file
+        tolerance (float) - max distance between facing window COMs
+        index (dict) - output of index_cage_jsons for the directory of
+            file
+
+    """
+    prefix = file.replace('.pdb', '').replace('.cif', '')
+    cages = read_cage_data(prefix, index=index)
+    lattice = read_lattice(file)
+    if lattice is None:
+        logging.warning(f'{file} has no unit cell')
+        return None
+    edges = build_network(lattice, cages, tolerance=tolerance)
+    dimensionality, components = channel_dimensionality(
+        len(cages), edges
+    )
+    return {
+        'n_cages': len(cages),
+        'n_windows': sum(len(i[2]) for i in cages),
+        'n_edges': len(edges),
+        'n_components': len(components),
+        'dimensionality': dimensionality
+    }
+
+
+def main():
+    if (not len(sys.argv) in [4, 5]):
+        print("""
+    Usage: cage_network.py pdb ignore output_file [tolerance]
+        pdb: file (.pdb) :
+            structure that was analyzed with append_all_COM.py
+            ('*.pdb' for all in working dir, of which only
+            *_extracted.pdb and *_nosolv.pdb structures are used)
+        ignore (str) :
+            string to use to ignore certain files
+            (set NONE if not used)
+        output_file (str) :
+            file to output network data to (csv, will be overwritten)
+        tolerance (float) :
+            max distance between facing window COMs in Angstrom
+            (default 1.0)
+        """)
+        sys.exit()
+    if '*' in sys.argv[1]:
+        from glob import glob
+        # skip the molecule files (prefix_N.pdb) of analyze_rebuilt
+        structures = [
+            i for i in glob(sys.argv[1])
+            if i.endswith(('_extracted.pdb', '_nosolv.pdb'))
+        ]
+        if sys.argv[2] != 'NONE':
+            pdbs = sorted(
+                [i for i in structures if sys.argv[2] not in i]
+            )
+        else:
+            pdbs = sorted(structures)
+        logging.info(f'{len(pdbs)} pdbs to analyze')
+    else:
+        pdbs = [sys.argv[1]]
+    output_file = sys.argv[3]
+    tolerance = float(sys.argv[4]) if len(sys.argv) == 5 else 1.0
+
+    with open(output_file, 'w') as f:
+        f.write(
+            'filename,n_cages,n_windows,n_edges,n_components,'
+            'dimensionality\n'
+        )
+        # JSONs are listed once per directory
+        indices = {}
+        for file in pdbs:
+            directory = os.path.dirname(file)
+            if directory not in indices:
+                indices[directory] = index_cage_jsons(directory)
+            res = analyse_structure(
+                file, tolerance, index=indices[directory]
+            )
+            if res is None:
+                continue
+            logging.info(f"{file}: {res['dimensionality']}D")
+            f.write(
+                f"{file},{res['n_cages']},{res['n_windows']},"
+                f"{res['n_edges']},{res['n_components']},"
+                f"{res['dimensionality']}\n"
+            )
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='')
+    main()
@@ -5,6 +5,13 @@
 """
 Script to collate the window sizes of all cages of all CIFs.
 
+Collation is incremental: a manifest of the modification time, size
+and hash of every JSON is kept in an sqlite database, alongside the
+parsed rows. Only new or modified JSONs are read (in parallel) on each
+run. Rows of JSONs that no longer exist are removed from the manifest;
+those of JSONs that exist but do not match the search string are kept
+for later runs, but not written.
+
 Author: Andrew Tarzia
 
 Date Created: 02 Jan 2020
@@ -13,21 +20,189 @@ Date Created: 02 Jan 2020
 import sys
 import logging
 import json
+import os
+import sqlite3
+import hashlib
+from multiprocessing import Pool
+
+
+def connect_manifest(manifest_file):
+    """
+    Connect to (and initialise) the collation manifest database.
+
+    """
+    db = sqlite3.connect(manifest_file)
+    db.executescript("""
+        CREATE TABLE IF NOT EXISTS manifest (
+            filename TEXT PRIMARY KEY, mtime INTEGER, size INTEGER,
+            sha1 TEXT
+        );
+        CREATE TABLE IF NOT EXISTS windows (
+            filename TEXT, REFCODE TEXT, cage_no TEXT,
+            window_no INTEGER, window_diam REAL
+        );
+        CREATE TABLE IF NOT EXISTS pores (
+            filename TEXT PRIMARY KEY, REFCODE TEXT, cage_no TEXT,
+            pore_diam REAL
+        );
+        CREATE INDEX IF NOT EXISTS windows_file ON windows (filename);
+    """)
+    return db
+
+
+def parse_json(file):
+    """
+    Read one cage JSON and return its hash and output rows.
+
+    Returns:
+        file (str) - JSON file name
+        sha1 (str) - hash of file contents
+        pore (tuple) - row of pore table
+        windows (list) - rows of window table
+
+    """
+    with open(file, 'rb') as f:
+        content = f.read()
+    sha1 = hashlib.sha1(content).hexdigest()
+    data = json.loads(content)
+
+    REFCODE = file.split('_')[0]
+    cage_no = os.path.splitext(file)[0].split('_')[-1]
+    windows = data['windows']['diameters']
+    if windows is None:
+        windows = []
+    pores = data['pore_diameter_opt']['diameter']
+
+    pore = (file, REFCODE, cage_no, pores)
+    window_rows = [
+        (file, REFCODE, cage_no, i, diam)
+        for i, diam in enumerate(windows)
+    ]
+    return file, sha1, pore, window_rows
+
+
+def changed_files(db, jsons):
+    """
+    Compare JSON files to the manifest.
+
+    Returns:
+        to_read (dict) - file: (mtime, size) of new or modified files
+        removed (list) - files in manifest that no longer exist
+
+    """
+    manifest = {
+        i[0]: (i[1], i[2])
+        for i in db.execute('SELECT filename, mtime, size FROM manifest')
+    }
+    to_read = {}
+    for file in jsons:
+        stat = os.stat(file)
+        current = (stat.st_mtime_ns, stat.st_size)
+        if manifest.pop(file, None) != current:
+            to_read[file] = current
+    removed = [i for i in manifest if not os.path.isfile(i)]
+    return to_read, removed
+
+
+def update_manifest(db, jsons, ncpus=None):
+    """
+    Read new or modified JSONs in parallel and update the database.
+
+    """
+    to_read, removed = changed_files(db, jsons)
+    logging.info(
+        f'{len(to_read)} new or modified jsons, {len(removed)} removed'
+    )
+    for file in removed:
+        db.execute('DELETE FROM manifest WHERE filename = ?', (file, ))
+        db.execute('DELETE FROM windows WHERE filename = ?', (file, ))
+        db.execute('DELETE FROM pores WHERE filename = ?', (file, ))
+    if len(to_read) == 0:
+        db.commit()
+        return
+    hashes = dict(db.execute(
+        'SELECT filename, sha1 FROM manifest'
+    ).fetchall())
+    with Pool(ncpus) as pool:
+        results = pool.imap_unordered(
+            parse_json, sorted(to_read), chunksize=256
+        )
+        for file, sha1, pore, window_rows in results:
+            mtime, size = to_read[file]
+            db.execute(
+                'INSERT OR REPLACE INTO manifest VALUES (?, ?, ?, ?)',
+                (file, mtime, size, sha1)
+            )
+            # touched but unchanged files only need a new mtime
+            if hashes.get(file) == sha1:
+                continue
+            db.execute('DELETE FROM windows WHERE filename = ?', (file, ))
+            db.execute(
+                'INSERT OR REPLACE INTO pores VALUES (?, ?, ?, ?)', pore
+            )
+            db.executemany(
+                'INSERT INTO windows VALUES (?, ?, ?, ?, ?)',
+                window_rows
+            )
+    db.commit()
+
+
+def select_files(db, jsons):
+    """
+    Fill the temporary table selected with the file names of jsons.
+
+    """
+    db.execute(
+        'CREATE TEMP TABLE IF NOT EXISTS selected (filename TEXT PRIMARY KEY)'
+    )
+    db.execute('DELETE FROM selected')
+    db.executemany(
+        'INSERT OR IGNORE INTO selected VALUES (?)', [(i, ) for i in jsons]
+    )
+
+
+def write_tables(db, jsons, window_outfile, pore_outfile):
+    """
+    Write the long format window table and the pore table of jsons.
+
+    """
+    select_files(db, jsons)
+    with open(window_outfile, 'w') as f:
+        top_line = 'filename,REFCODE,cage_no,window_no,window_diam\n'
+        f.write(top_line)
+        for row in db.execute(
+            'SELECT * FROM windows WHERE filename IN selected '
+            'ORDER BY filename, window_no'
+        ):
+            f.write(','.join([str(i) for i in row]) + '\n')
+
+    with open(pore_outfile, 'w') as f:
+        top_line = 'filename,REFCODE,cage_no,pore_diam\n'
+        f.write(top_line)
+        for row in db.execute(
+            'SELECT * FROM pores WHERE filename IN selected '
+            'ORDER BY filename'
+        ):
+            f.write(','.join([str(i) for i in row]) + '\n')
 
 
 def main():
-    if (not len(sys.argv) == 4):
+    if (not len(sys.argv) in [4, 5]):
         print("""
     Usage: collate_window_sizes.py string window_outfile pore_outfile
+    [manifest_file]
         string (str) :
             string to use to search for JSON files to collect data from
             [*.json should be part of this search string]
         window_outfile (str) :
-            file to output window data too (should be a csv file, will
-            be overwritten)
+            file to output window data too, one row per window
+            (should be a csv file, will be overwritten)
         pore_outfile (str) :
-            file to output pore data too (should be a csv file, will
-            be overwritten)
+            file to output pore data too, one row per cage
+            (should be a csv file, will be overwritten)
+        manifest_file (str) :
+            sqlite file to keep collated data in between runs
+            (default: collate_manifest.db)
         """)
         sys.exit()
     if '*' in sys.argv[1]:
@@ -38,45 +213,15 @@ def main():
         jsons = [sys.argv[1]]
     window_outfile = sys.argv[2]
     pore_outfile = sys.argv[3]
+    if len(sys.argv) == 5:
+        manifest_file = sys.argv[4]
+    else:
+        manifest_file = 'collate_manifest.db'
 
-    final_output = {}
-
-    for file in jsons:
-        with open(file, 'rb') as f:
-            data = json.load(f)
-
-        REFCODE = file.split('_')[0]
-        cage_no = file.rstrip('.json').split('_')[-1]
-        windows = data['windows']['diameters']
-        pores = data['pore_diameter_opt']['diameter']
-
-        final_output[file] = {
-            'ref': REFCODE,
-            'cage_no': cage_no,
-            'windows': windows,
-            'pores': pores
-        }
-
-    with open(window_outfile, 'w') as f:
-        top_line = 'filename,REFCODE,cage_no,window_diams\n'
-        f.write(top_line)
-        for file in final_output:
-            d = final_output[file]
-            window_string = ','.join([str(i) for i in d['windows']])
-            out_line = (
-                f"{file},{d['ref']},{d['cage_no']},{window_string}\n"
-            )
-            f.write(out_line)
-
-    with open(pore_outfile, 'w') as f:
-        top_line = 'filename,REFCODE,cage_no,pore_diam\n'
-        f.write(top_line)
-        for file in final_output:
-            d = final_output[file]
-            out_line = (
-                f"{file},{d['ref']},{d['cage_no']},{d['pores']}\n"
-            )
-            f.write(out_line)
+    db = connect_manifest(manifest_file)
+    update_manifest(db, jsons)
+    write_tables(db, jsons, window_outfile, pore_outfile)
+    db.close()
 
 
 if __name__ == "__main__":
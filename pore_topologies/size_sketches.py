@@ -0,0 +1,455 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# Distributed under the terms of the MIT License.
+
+"""
+Script to aggregate pore and window size distributions with mergeable
+streaming sketches (t-digest quantiles and fixed-bin histograms).
+
+Sketches are kept per group: per harvest (all cages of that harvest)
+and per cage family within a harvest (REFCODE root, the first six
+letters of the REFCODE). Memory per group is bounded by the t-digest
+compression and the number of histogram bins, no matter how many cages
+are processed, and sketch files from sharded or parallel runs can be
+merged. JSONs are parsed into the sqlite manifest of
+collate_window_sizes.py, which also records the JSONs added to each
+harvest of each sketch file, so that updating twice does not count a
+cage twice. Merged sketch files are for summaries, updates go to the
+sketch files of the shards.
+
+Author: Andrew Tarzia
+
+Date Created: 19 Oct 2026
+"""
+
+import sys
+import logging
+import json
+import os
+import numpy as np
+
+from collate_window_sizes import (
+    connect_manifest, update_manifest, select_files
+)
+
+
+class TDigest:
+    """
+    Merging t-digest for streaming quantile estimates.
+
+    Keyword Arguments:
+        compression (float) - controls the number of centroids
+            (and the accuracy of the tails)
+
+    """
+
+    def __init__(self, compression=100):
+        self.compression = compression
+        self.means = np.empty(0)
+        self.weights = np.empty(0)
+        self.buffer = []
+
+    def add(self, value, weight=1.0):
+        self.buffer.append((value, weight))
+        if len(self.buffer) > 10 * self.compression:
+            self.compress()
+
+    def compress(self):
+        """
+        Merge buffered values and centroids into new centroids.
+
+        """
+        if len(self.buffer) > 0:
+            values, weights = np.array(self.buffer).T
+            means = np.concatenate([self.means, values])
+            weights = np.concatenate([self.weights, weights])
+            self.buffer = []
+        else:
+            means, weights = self.means, self.weights
+        if len(means) == 0:
+            return
+        order = np.argsort(means, kind='mergesort')
+        means, weights = means[order], weights[order]
+        total = weights.sum()
+        new_means = [means[0]]
+        new_weights = [weights[0]]
+        cumulative = 0.0
+        k_lower = self._scale(0.0)
+        for mean, weight in zip(means[1:], weights[1:]):
+            q = (cumulative + new_weights[-1] + weight) / total
+            if self._scale(q) - k_lower <= 1.0:
+                # merge into current centroid
+                w = new_weights[-1] + weight
+                new_means[-1] += (mean - new_means[-1]) * weight / w
+                new_weights[-1] = w
+            else:
+                cumulative += new_weights[-1]
+                k_lower = self._scale(cumulative / total)
+                new_means.append(mean)
+                new_weights.append(weight)
+        self.means = np.array(new_means)
+        self.weights = np.array(new_weights)
+
+    def _scale(self, q):
+        q = min(max(q, 0.0), 1.0)
+        return self.compression / (2 * np.pi) * np.arcsin(2 * q - 1)
+
+    def merge(self, other):
+        self.buffer.extend(zip(other.means, other.weights))
+        self.buffer.extend(other.buffer)
+        self.compress()
+
+    def quantile(self, q):
+        """
+        Estimate the q quantile (0 <= q <= 1).
+
+        """
+        self.compress()
+        if len(self.means) == 0:
+            return None
+        if len(self.means) == 1:
+            return float(self.means[0])
+        # centroid centres in cumulative weight space
+        centres = np.cumsum(self.weights) - self.weights / 2
+        target = q * self.weights.sum()
+        return float(np.interp(target, centres, self.means))
+
+    def to_dict(self):
+        self.compress()
+        return {
+            'compression': self.compression,
+            'means': self.means.tolist(),
+            'weights': self.weights.tolist()
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        digest = cls(compression=data['compression'])
+        digest.means = np.array(data['means'], dtype=float)
+        digest.weights = np.array(data['weights'], dtype=float)
+        return digest
+
+
+class SizeSketch:
+    """
+    Count, moments, extrema, t-digest and histogram of one quantity.
+
+    Keyword Arguments:
+        bin_width (float) - histogram bin width in Angstrom
+        max_size (float) - upper edge of the histogram (values above
+            are counted in the last bin)
+
+    """
+
+    def __init__(self, bin_width=0.1, max_size=50.0):
+        self.bin_width = bin_width
+        self.max_size = max_size
+        self.count = 0
+        self.total = 0.0
+        self.total_sq = 0.0
+        self.min = None
+        self.max = None
+        self.digest = TDigest()
+        self.histogram = np.zeros(
+            int(round(max_size / bin_width)), dtype=np.int64
+        )
+
+    def add(self, value):
+        value = float(value)
+        self.count += 1
+        self.total += value
+        self.total_sq += value ** 2
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+        self.digest.add(value)
+        bin_no = min(
+            max(int(value / self.bin_width), 0), len(self.histogram) - 1
+        )
+        self.histogram[bin_no] += 1
+
+    def merge(self, other):
+        if (
+            other.bin_width != self.bin_width
+            or other.max_size != self.max_size
+        ):
+            raise ValueError('cannot merge sketches with different bins')
+        self.count += other.count
+        self.total += other.total
+        self.total_sq += other.total_sq
+        for value in [other.min, other.max]:
+            if value is None:
+                continue
+            self.min = value if self.min is None else min(self.min, value)
+            self.max = value if self.max is None else max(self.max, value)
+        self.digest.merge(other.digest)
+        self.histogram += other.histogram
+
+    def summary(self, quantiles=(0.05, 0.25, 0.5, 0.75, 0.95)):
+        """
+        Return dict of summary statistics.
+
+        """
+        if self.count == 0:
+            return {'count': 0}
+        mean = self.total / self.count
+        var = max(self.total_sq / self.count - mean ** 2, 0.0)
+        summary = {
+            'count': self.count,
+            'mean': mean,
+            'std': var ** 0.5,
+            'min': self.min,
+            'max': self.max
+        }
+        for q in quantiles:
+            summary[f'p{int(q * 100)}'] = self.digest.quantile(q)
+        return summary
+
+    def to_dict(self):
+        return {
+            'bin_width': self.bin_width,
+            'max_size': self.max_size,
+            'count': self.count,
+            'total': self.total,
+            'total_sq': self.total_sq,
+            'min': self.min,
+            'max': self.max,
+            'digest': self.digest.to_dict(),
+            'histogram': self.histogram.tolist()
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        sketch = cls(bin_width=data['bin_width'], max_size=data['max_size'])
+        sketch.count = data['count']
+        sketch.total = data['total']
+        sketch.total_sq = data['total_sq']
+        sketch.min = data['min']
+        sketch.max = data['max']
+        sketch.digest = TDigest.from_dict(data['digest'])
+        sketch.histogram = np.array(data['histogram'], dtype=np.int64)
+        return sketch
+
+
+def read_sketches(sketch_file):
+    """
+    Read the sketches of a sketch file.
+
+    Returns:
+        sketches (dict) - group: {'pore': SizeSketch, 'window':
+            SizeSketch}
+        generation (int) - number of updates written to sketch_file
+
+    """
+    if not os.path.isfile(sketch_file):
+        return {}, 0
+    with open(sketch_file, 'r') as f:
+        data = json.load(f)
+    groups = data['groups']
+    sketches = {
+        group: {
+            i: SizeSketch.from_dict(groups[group][i]) for i in groups[group]
+        }
+        for group in groups
+    }
+    return sketches, data.get('generation', 0)
+
+
+def write_sketches(sketches, generation, sketch_file):
+    """
+    Write sketches atomically.
+
+    """
+    data = {
+        'groups': {
+            group: {i: sketches[group][i].to_dict() for i in sketches[group]}
+            for group in sketches
+        },
+        'generation': generation
+    }
+    temp = f'{sketch_file}.tmp'
+    with open(temp, 'w') as f:
+        json.dump(data, f)
+    os.replace(temp, sketch_file)
+
+
+def merge_sketches(sketches, other):
+    """
+    Merge the groups of other into sketches (in place).
+
+    """
+    for group in other:
+        if group not in sketches:
+            sketches[group] = other[group]
+            continue
+        for i in other[group]:
+            sketches[group][i].merge(other[group][i])
+    return sketches
+
+
+def connect_ledger(manifest_file, sketch_file, generation):
+    """
+    Connect to the collation manifest (collate_window_sizes.py) and
+    its table of JSONs added to each sketch file.
+
+    Rows of updates whose sketch file was not written (generation
+    above that of the file) are removed.
+
+    """
+    db = connect_manifest(manifest_file)
+    db.executescript("""
+        CREATE TABLE IF NOT EXISTS sketched (
+            sketch_file TEXT, harvest TEXT, filename TEXT, sha1 TEXT,
+            generation INTEGER,
+            PRIMARY KEY (sketch_file, harvest, filename)
+        );
+    """)
+    db.execute(
+        'DELETE FROM sketched WHERE sketch_file = ? AND generation > ?',
+        (os.path.abspath(sketch_file), generation)
+    )
+    db.commit()
+    return db
+
+
+def update_sketches(sketches, db, jsons, harvest, sketch_file,
+                    generation, ncpus=None):
+    """
+    Stream cage JSONs into per harvest and per family sketches.
+
+    JSONs are parsed (in parallel, only if new or modified) into the
+    collation manifest db, which also records the JSONs added to each
+    harvest of sketch_file, so that updating twice does not count a
+    cage twice. Values cannot be removed from sketches, so JSONs
+    modified after they were added are reported and not added again.
+
+    Keyword Arguments:
+        sketches (dict) - sketches of sketch_file
+        db (sqlite3.Connection) - ledger from connect_ledger
+        jsons (list) - cage JSON files
+        harvest (str) - harvest the JSONs belong to
+        sketch_file (str) - file sketches are written to
+        generation (int) - generation of this update of sketch_file
+
+    """
+    update_manifest(db, jsons, ncpus)
+    select_files(db, jsons)
+    key = (os.path.abspath(sketch_file), harvest)
+    to_add = []
+    modified = 0
+    for file, sha1, added_sha1 in db.execute(
+        'SELECT m.filename, m.sha1, s.sha1 FROM manifest AS m '
+        'JOIN selected USING (filename) '
+        'LEFT JOIN sketched AS s ON s.filename = m.filename '
+        'AND s.sketch_file = ? AND s.harvest = ? '
+        'WHERE s.sha1 IS NULL OR s.sha1 != m.sha1', key
+    ).fetchall():
+        if added_sha1 is None:
+            to_add.append((file, sha1))
+        else:
+            modified += 1
+    logging.info(f'{len(to_add)} of {len(jsons)} jsons to add to {harvest}')
+    for file, sha1 in to_add:
+        family = os.path.basename(file)[:6]
+        pores = [
+            i[0] for i in db.execute(
+                'SELECT pore_diam FROM pores WHERE filename = ?', (file, )
+            ) if i[0] is not None
+        ]
+        windows = [
+            i[0] for i in db.execute(
+                'SELECT window_diam FROM windows WHERE filename = ?',
+                (file, )
+            ) if i[0] is not None
+        ]
+        for group in [harvest, f'{harvest}/{family}']:
+            if group not in sketches:
+                sketches[group] = {
+                    'pore': SizeSketch(), 'window': SizeSketch()
+                }
+            for value in pores:
+                sketches[group]['pore'].add(value)
+            for value in windows:
+                sketches[group]['window'].add(value)
+        db.execute(
+            'INSERT INTO sketched VALUES (?, ?, ?, ?, ?)',
+            key + (file, sha1, generation)
+        )
+    if modified > 0:
+        logging.warning(
+            f'{modified} jsons were modified after they were added to '
+            f'{harvest} and were not added again (rebuild the sketches '
+            'of this harvest to include them)'
+        )
+    return sketches
+
+
+def main():
+    usage = {'update': 5, 'merge': 4, 'summary': 3}
+    if len(sys.argv) < 2 or len(sys.argv) < usage.get(sys.argv[1], 0) or (
+        sys.argv[1] in ['-h', '--help']
+    ):
+        print("""
+    Usage: size_sketches.py mode ...
+        update string harvest sketch_file [manifest_file] :
+            stream JSON files matching string into the sketches of
+            harvest (str) and its families, stored in sketch_file
+            [*.json should be part of this search string]; JSONs
+            added are recorded in manifest_file (default:
+            collate_manifest.db, as collate_window_sizes.py)
+        merge out_file sketch_file [sketch_file ...] :
+            merge sketch files from sharded runs into out_file
+        summary sketch_file [group] :
+            print summary statistics of all groups (or one group)
+        """)
+        sys.exit()
+    mode = sys.argv[1]
+    if mode == 'update':
+        if len(sys.argv) not in [5, 6]:
+            sys.exit(
+                'update needs: string harvest sketch_file [manifest_file]'
+            )
+        from glob import glob
+        jsons = sorted(glob(sys.argv[2]))
+        harvest = sys.argv[3]
+        sketch_file = sys.argv[4]
+        if len(sys.argv) == 6:
+            manifest_file = sys.argv[5]
+        else:
+            manifest_file = 'collate_manifest.db'
+        logging.info(f'{len(jsons)} jsons found for {harvest}')
+        sketches, generation = read_sketches(sketch_file)
+        db = connect_ledger(manifest_file, sketch_file, generation)
+        update_sketches(
+            sketches, db, jsons, harvest, sketch_file, generation + 1
+        )
+        # rows of this generation are removed on the next run if the
+        # sketch file is not written
+        db.commit()
+        write_sketches(sketches, generation + 1, sketch_file)
+        db.close()
+    elif mode == 'merge':
+        out_file = sys.argv[2]
+        sketches = {}
+        for sketch_file in sys.argv[3:]:
+            merge_sketches(sketches, read_sketches(sketch_file)[0])
+        write_sketches(sketches, 0, out_file)
+    elif mode == 'summary':
+        sketches, _ = read_sketches(sys.argv[2])
+        groups = sys.argv[3:] if len(sys.argv) > 3 else sorted(sketches)
+        for group in groups:
+            for i in ['pore', 'window']:
+                summary = sketches[group][i].summary()
+                values = ', '.join(
+                    f'{j}: {summary[j]:.3f}'
+                    if isinstance(summary[j], float) else
+                    f'{j}: {summary[j]}'
+                    for j in summary
+                )
+                print(f'{group} {i}: {values}')
+    else:
+        sys.exit(f'unknown mode {mode}')
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='')
+    main()
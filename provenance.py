@@ -0,0 +1,238 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# Distributed under the terms of the MIT License.
+
+"""
+Functions for stamping results with provenance keys and selectively
+invalidating them when inputs, parameters or code change.
+
+Each result has one key per stage:
+    input - hash of the input structure file
+    modularize - input key, rebuild code and rebuild parameters
+    analysis - modularize key, analysis code and parameters
+Code is fingerprinted by the source of the functions used in each
+stage (falling back to the package version), so a patch to pyWindow
+window detection changes the analysis key only and the rebuilt
+structure (_rebuild.pdb, written by atools.modularize) is reused.
+
+Author: Andrew Tarzia
+
+Date Created: 19 Oct 2026
+
+"""
+
+import os
+import json
+import hashlib
+import inspect
+import logging
+import importlib
+
+
+STAGES = ['input', 'modularize', 'analysis']
+
+# functions that determine the result of each stage
+STAGE_CODE = {
+    'modularize': [
+        'atools.modularize',
+        'pywindow.molecular.MolecularSystem.rebuild_system',
+        'pywindow.molecular.MolecularSystem.make_modular',
+        'pywindow.utilities.create_supercell',
+        'pywindow.utilities.discrete_molecules',
+        'periodic_molecules.modularize_from_bonds',
+        'periodic_molecules.discrete_molecules',
+    ],
+    'analysis': [
+        'atools.analyze_rebuilt',
+        'pywindow.molecular.Molecule.full_analysis',
+        'pywindow.utilities.opt_pore_diameter',
+        'pywindow.utilities.pore_diameter',
+        'pywindow.utilities.find_windows',
+        'pywindow.utilities.window_analysis',
+        'analysis_f.run_pywindow',
+    ],
+}
+
+
+def file_hash(file):
+    """
+    Return sha1 of file contents.
+
+    """
+    sha1 = hashlib.sha1()
+    with open(file, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            sha1.update(chunk)
+    return sha1.hexdigest()
+
+
+def code_fingerprint(path):
+    """
+    Return a fingerprint of the source of a dotted function path.
+
+    Falls back to the version of the top level package if the source
+    is not available, and to 'missing' if it cannot be imported.
+
+    """
+    parts = path.split('.')
+    try:
+        obj = importlib.import_module(parts[0])
+    except ImportError:
+        return 'missing'
+    package = obj
+    for part in parts[1:]:
+        obj = getattr(obj, part, None)
+        if obj is None:
+            return 'missing'
+    try:
+        source = inspect.getsource(obj)
+    except (OSError, TypeError):
+        source = str(getattr(package, '__version__', 'unknown'))
+    return hashlib.sha1(source.encode()).hexdigest()
+
+
+def stage_fingerprints(params={}):
+    """
+    Return dict of stage: hash of code fingerprints and parameters.
+
+    Keyword Arguments:
+        params (dict) - stage: dict of parameters of that stage
+
+    """
+    fingerprints = {}
+    for stage in STAGE_CODE:
+        record = {i: code_fingerprint(i) for i in STAGE_CODE[stage]}
+        record['params'] = params.get(stage, {})
+        fingerprints[stage] = hashlib.sha1(
+            json.dumps(record, sort_keys=True).encode()
+        ).hexdigest()
+    return fingerprints
+
+
+class ProvenanceLedger:
+    """
+    JSON ledger of the provenance keys of all results of a script.
+
+    Keyword Arguments:
+        ledger_file (str) - JSON file to store ledger in
+        params (dict) - stage: dict of parameters of that stage
+
+    """
+
+    def __init__(self, ledger_file, params={}):
+        self.ledger_file = ledger_file
+        self.fingerprints = stage_fingerprints(params)
+        self.records = {}
+        self.inputs = {}
+        # results from before the ledger existed are the baseline
+        self.baseline = not os.path.isfile(ledger_file)
+        self.n_baseline = 0
+        if os.path.isfile(ledger_file):
+            with open(ledger_file, 'r') as f:
+                data = json.load(f)
+            self.records = data['records']
+            self.inputs = data['inputs']
+
+    def input_hash(self, file):
+        """
+        Hash of input file, only recomputed if mtime or size changed.
+
+        """
+        stat = os.stat(file)
+        current = [stat.st_mtime_ns, stat.st_size]
+        stored = self.inputs.get(file)
+        if stored is None or stored[:2] != current:
+            self.inputs[file] = current + [file_hash(file)]
+        return self.inputs[file][2]
+
+    def keys(self, input_file):
+        """
+        Return dict of stage: current provenance key of input_file.
+
+        """
+        keys = {'input': self.input_hash(input_file)}
+        previous = keys['input']
+        for stage in STAGES[1:]:
+            previous = hashlib.sha1(
+                (previous + self.fingerprints[stage]).encode()
+            ).hexdigest()
+            keys[stage] = previous
+        return keys
+
+    def outdated(self, name, input_file):
+        """
+        Return the stages of result name that must be recomputed.
+
+        """
+        if not os.path.isfile(input_file):
+            return []
+        current = self.keys(input_file)
+        stored = self.records.get(name, {})
+        return [i for i in STAGES if stored.get(i) != current[i]]
+
+    def invalidate(self, name, input_file):
+        """
+        Check if result name is outdated and remove stale rebuilds.
+
+        The rebuilt structure written by atools.modularize is only
+        deleted if the input or the modularize stage changed. On a new
+        ledger, existing results are stamped with the current keys
+        (taken as the baseline) instead of all being recomputed.
+
+        Returns:
+            (bool) - True if the result must be recomputed
+
+        """
+        if self.baseline and name not in self.records:
+            if os.path.isfile(input_file):
+                self.stamp(name, input_file)
+                self.n_baseline += 1
+            return False
+        stages = self.outdated(name, input_file)
+        if 'modularize' in stages:
+            rebuild = os.path.splitext(input_file)[0] + '_rebuild.pdb'
+            if os.path.isfile(rebuild):
+                os.remove(rebuild)
+        return len(stages) > 0
+
+    def stamp(self, name, input_file):
+        """
+        Record current provenance keys of result name.
+
+        """
+        self.records[name] = self.keys(input_file)
+        return self.records[name]
+
+    def save(self):
+        if self.n_baseline > 0:
+            logging.info(
+                f'> {self.n_baseline} existing results stamped as the '
+                f'baseline of {self.ledger_file}'
+            )
+            self.n_baseline = 0
+        with open(self.ledger_file, 'w') as f:
+            json.dump({'records': self.records, 'inputs': self.inputs}, f)
+
+
+def stamp_jsons(file_prefix, keys, molecules):
+    """
+    Add provenance keys to the JSON files written by analyze_rebuilt.
+
+    Keyword Arguments:
+        file_prefix (str) - file_prefix given to analyze_rebuilt
+        keys (dict) - provenance keys
+        molecules (iterable) - ids of analysed molecules (keys of the
+            output of analyze_rebuilt), whose JSONs are file_prefix_ID
+            .json
+
+    """
+    for molecule in molecules:
+        file = f'{file_prefix}_{molecule}.json'
+        if not os.path.isfile(file):
+            continue
+        with open(file, 'r') as f:
+            data = json.load(f)
+        data['provenance'] = keys
+        with open(file, 'w') as f:
+            json.dump(data, f)
+    logging.debug(f'stamped provenance of {file_prefix} JSONs')
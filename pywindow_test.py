@@ -18,16 +18,19 @@ import numpy as np
 import glob
 import scipy.spatial.distance as scpy_dist
 import atools
+from in_memory import modularize_file
 
 
 def main():
-    if (not len(sys.argv) == 1):
+    if (sys.argv[1:] not in [[], ['in_memory']]):
         print("""
-    Usage: pywindow_test.py
+    Usage: pywindow_test.py [in_memory]
+        in_memory - parse and rebuild CIFs in memory (in_memory.py),
+            without intermediate PDBs
         """)
         sys.exit()
     else:
-        pass
+        in_memory = len(sys.argv) == 2
 
     CIFs = glob.glob('*cif')
     output_file = 'pywindow_test.out'
@@ -36,10 +39,20 @@ def main():
     for cif in CIFs:
         file_prefix = cif.replace('.cif', '')
         output_str += cif + ':\n'
-        pdb = atools.convert_CIF_2_PDB(cif, wstruct=False)
-        logging.info(f'> doing {pdb}')
-        # modularize
-        RB_s = atools.modularize(file=pdb)
+        if in_memory:
+            logging.info(f'> doing {cif}')
+            # modularize in memory
+            _, RB_s = modularize_file(cif)
+        else:
+            pdb = atools.convert_CIF_2_PDB(cif, wstruct=False)
+            logging.info(f'> doing {pdb}')
+            # modularize
+            RB_s = atools.modularize(file=pdb)
+        if RB_s is None:
+            # record failure in output
+            logging.warning(f'> pyWindow failure on {cif}')
+            output_str += 'pyWindow failure\n'
+            continue
         logging.info(f'> modularized')
         # run pywindow on each molecule
         for mol in RB_s.molecules:
@@ -87,7 +100,7 @@ def main():
                 include_coms=True,
                 override=True)
             if PD_opt > 0:
-                logging.info(f'> doing {pdb}')
+                logging.info(f'> doing {cif}')
                 logging.info(f'> doing {mol}')
                 logging.info(f'> PD {PD}, PD_opt {PD_opt}')
                 logging.info(f'> PV {PV}, PV_opt {PV_opt}')
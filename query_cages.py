@@ -0,0 +1,262 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# Distributed under the terms of the MIT License.
+
+"""
+Script to build and query an index of classification results.
+
+The index joins the output of classify_structures.py with window data
+(long format table from pore_topologies/collate_window_sizes.py),
+solvent/disorder data (solvent_prop.csv from get_solvent_info.py) and
+any number of REFCODE tag files (.gcd). Each numeric property is stored
+with a sorted order array, so range queries are binary searches.
+
+Author: Andrew Tarzia
+
+Date Created: 19 Oct 2026
+
+"""
+
+import sys
+import logging
+import re
+import numpy as np
+
+
+OPERATORS = ['>=', '<=', '==', '!=', '>', '<']
+
+
+class CageIndex:
+    """
+    Columnar index of cage properties with sorted-array indexes.
+
+    Attributes:
+        refcodes (ndarray) - REFCODE of each row
+        molecules (ndarray) - molecule id of each row
+        columns (dict) - name: float array of each property
+        orders (dict) - name: argsort of each column (and 'REFCODE')
+
+    """
+
+    def __init__(self, refcodes, molecules, columns):
+        self.refcodes = np.asarray(refcodes, dtype=str)
+        self.molecules = np.asarray(molecules, dtype=np.int64)
+        self.columns = {
+            i: np.asarray(columns[i], dtype=float) for i in columns
+        }
+        self.orders = {
+            i: np.argsort(self.columns[i], kind='mergesort')
+            for i in self.columns
+        }
+        self.orders['REFCODE'] = np.argsort(
+            self.refcodes, kind='mergesort'
+        )
+
+    def save(self, index_file):
+        arrays = {'refcodes': self.refcodes, 'molecules': self.molecules}
+        for i in self.columns:
+            arrays[f'column_{i}'] = self.columns[i]
+            arrays[f'order_{i}'] = self.orders[i]
+        arrays['order_REFCODE'] = self.orders['REFCODE']
+        np.savez(index_file, **arrays)
+
+    @classmethod
+    def load(cls, index_file):
+        data = np.load(index_file)
+        index = cls.__new__(cls)
+        index.refcodes = data['refcodes']
+        index.molecules = data['molecules']
+        index.columns = {}
+        index.orders = {'REFCODE': data['order_REFCODE']}
+        for key in data.files:
+            if key.startswith('column_'):
+                name = key.replace('column_', '', 1)
+                index.columns[name] = data[key]
+                index.orders[name] = data[f'order_{name}']
+        return index
+
+    def _range(self, name, low, high, low_incl, high_incl):
+        """
+        Return row ids with low (<=/<) column (<=/<) high.
+
+        """
+        if name == 'REFCODE':
+            values = self.refcodes
+        else:
+            values = self.columns[name]
+        order = self.orders[name]
+        sorted_values = values[order]
+        if name == 'REFCODE':
+            n_valid = len(sorted_values)
+        else:
+            # NaNs (missing data) are sorted to the end
+            n_valid = int(np.count_nonzero(~np.isnan(values)))
+            sorted_values = sorted_values[:n_valid]
+        start, end = 0, n_valid
+        if low is not None:
+            side = 'left' if low_incl else 'right'
+            start = np.searchsorted(sorted_values, low, side=side)
+        if high is not None:
+            side = 'right' if high_incl else 'left'
+            end = np.searchsorted(sorted_values, high, side=side)
+        return order[start:max(start, end)]
+
+    def select(self, name, operator, value):
+        """
+        Return boolean mask of rows that satisfy one predicate.
+
+        """
+        if name != 'REFCODE' and name not in self.columns:
+            raise KeyError(
+                f'{name} not in index, options: {sorted(self.columns)}'
+            )
+        if name != 'REFCODE':
+            value = float(value)
+        mask = np.zeros(len(self.refcodes), dtype=bool)
+        if operator == '==':
+            rows = self._range(name, value, value, True, True)
+        elif operator == '>=':
+            rows = self._range(name, value, None, True, True)
+        elif operator == '>':
+            rows = self._range(name, value, None, False, True)
+        elif operator == '<=':
+            rows = self._range(name, None, value, True, True)
+        elif operator == '<':
+            rows = self._range(name, None, value, True, False)
+        elif operator == '!=':
+            mask[self._range(name, value, value, True, True)] = True
+            return ~mask
+        else:
+            raise ValueError(f'unknown operator {operator}')
+        mask[rows] = True
+        return mask
+
+    def query(self, predicates):
+        """
+        Return (REFCODE, molecule) of rows that satisfy all predicates.
+
+        Keyword Arguments:
+            predicates (list) - strings like 'pore_diam_opt>=4' or
+                'REFCODE==ABCDEF'
+
+        """
+        mask = np.ones(len(self.refcodes), dtype=bool)
+        for predicate in predicates:
+            name, operator, value = parse_predicate(predicate)
+            mask &= self.select(name, operator, value)
+        rows = np.flatnonzero(mask)
+        return [
+            (str(self.refcodes[i]), int(self.molecules[i])) for i in rows
+        ]
+
+
+def parse_predicate(predicate):
+    """
+    Split predicate string into (name, operator, value).
+
+    """
+    pattern = '|'.join(re.escape(i) for i in OPERATORS)
+    match = re.match(rf'\s*(\w+)\s*({pattern})\s*(\S+)\s*$', predicate)
+    if match is None:
+        raise ValueError(f'could not parse predicate: {predicate}')
+    return match.group(1), match.group(2), match.group(3)
+
+
+def build_index(classification_file, solvent_file=None, window_file=None,
+                tag_files={}):
+    """
+    Join result files into a CageIndex.
+
+    Keyword Arguments:
+        classification_file (str) - output of classify_structures.py
+        solvent_file (str) - output of get_solvent_info.py
+        window_file (str) - window output of collate_window_sizes.py
+        tag_files (dict) - tag name: .gcd file of REFCODEs with tag
+
+    """
+    import pandas as pd
+    data = pd.read_csv(classification_file)
+    data = data.astype({'REFCODE': str, 'molecule': np.int64})
+    if window_file is not None:
+        windows = pd.read_csv(window_file)
+        windows = windows.rename(columns={'cage_no': 'molecule'})
+        windows = windows.astype({'REFCODE': str, 'molecule': np.int64})
+        windows = windows.groupby(['REFCODE', 'molecule'])['window_diam']
+        windows = windows.agg(['max', 'min', 'mean']).add_suffix(
+            '_window_diam'
+        ).reset_index()
+        data = data.merge(windows, how='left', on=['REFCODE', 'molecule'])
+    if solvent_file is not None:
+        solvent = pd.read_csv(
+            solvent_file, names=['REFCODE', 'squeeze', 'disorder']
+        )
+        solvent['squeeze'] = (solvent['squeeze'] == 'y').astype(float)
+        solvent['disorder'] = (solvent['disorder'] == 'y').astype(float)
+        data = data.merge(solvent, how='left', on='REFCODE')
+    for tag in tag_files:
+        with open(tag_files[tag], 'r') as f:
+            tagged = set([i.rstrip() for i in f.readlines()])
+        data[tag] = data['REFCODE'].isin(tagged).astype(float)
+
+    columns = {
+        i: data[i].to_numpy(dtype=float)
+        for i in data.columns if i not in ['REFCODE', 'molecule']
+    }
+    return CageIndex(
+        refcodes=data['REFCODE'].to_numpy(dtype=str),
+        molecules=data['molecule'].to_numpy(),
+        columns=columns
+    )
+
+
+def main():
+    if (len(sys.argv) < 4):
+        print("""
+    Usage: query_cages.py mode index_file ...
+        build index_file classification_file [key=file ...] :
+            build index (.npz) from the output of
+            classify_structures.py and optional files:
+                solvent=solvent_prop.csv (from get_solvent_info.py)
+                window=window.csv (from collate_window_sizes.py)
+                TAG=file.gcd (adds column TAG, 1 if REFCODE in file)
+        query index_file predicate [predicate ...] :
+            print REFCODE,molecule of all cages satisfying all
+            predicates, e.g.
+            'pore_diam_opt>=4' 'pore_diam_opt<=7' 'no_windows>=4'
+            'organic==1' 'squeeze==0' 'REFCODE==ABCDEF'
+        """)
+        sys.exit()
+    mode = sys.argv[1]
+    index_file = sys.argv[2]
+    if not index_file.endswith('.npz'):
+        index_file += '.npz'
+    if mode == 'build':
+        classification_file = sys.argv[3]
+        extra = dict(i.split('=', 1) for i in sys.argv[4:])
+        solvent_file = extra.pop('solvent', None)
+        window_file = extra.pop('window', None)
+        index = build_index(
+            classification_file,
+            solvent_file=solvent_file,
+            window_file=window_file,
+            tag_files=extra
+        )
+        index.save(index_file)
+        logging.info(
+            f'> indexed {len(index.refcodes)} rows with columns: '
+            f'{sorted(index.columns)}'
+        )
+    elif mode == 'query':
+        index = CageIndex.load(index_file)
+        results = index.query(sys.argv[3:])
+        print('REFCODE,molecule')
+        for RC, molecule in results:
+            print(f'{RC},{molecule}')
+        logging.info(f'> {len(results)} matches')
+    else:
+        sys.exit(f'unknown mode {mode}')
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='')
+    main()
@@ -0,0 +1,137 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# Distributed under the terms of the MIT License.
+
+"""
+Script to group REFCODEs into CSD families (ABCDEF, ABCDEF01, ...) and
+select a representative of each family by quality metadata.
+
+Quality metadata is written by CSD_API_python3/get_family_metadata.py
+(or get_from_author.py) as REFCODE,r_factor,has_disorder,
+has_3d_structure.
+
+Author: Andrew Tarzia
+
+Date Created: 19 Oct 2026
+
+"""
+
+import sys
+import logging
+
+
+def family_root(REFCODE):
+    """
+    Return the six letter root of a REFCODE.
+
+    """
+    return REFCODE[:6]
+
+
+def read_quality_metadata(file):
+    """
+    Read quality metadata CSV into dict of REFCODE: (r_factor,
+    has_disorder, has_3d_structure).
+
+    """
+    metadata = {}
+    with open(file, 'r') as f:
+        f.readline()
+        for line in f:
+            RC, r_factor, disorder, has_3d = line.rstrip().split(',')
+            metadata[RC] = (
+                float(r_factor) if r_factor not in ['', 'None'] else None,
+                disorder == 'y',
+                has_3d == 'y'
+            )
+    return metadata
+
+
+def quality_key(REFCODE, metadata):
+    """
+    Sort key of family members: best representative first.
+
+    Prefers entries with 3D coordinates, then without disorder, then
+    with the lowest R-factor, then the parent (shortest) REFCODE.
+
+    """
+    r_factor, disorder, has_3d = metadata.get(
+        REFCODE, (None, True, True)
+    )
+    return (
+        not has_3d,
+        disorder,
+        r_factor if r_factor is not None else float('inf'),
+        len(REFCODE),
+        REFCODE
+    )
+
+
+def group_families(refcodes):
+    """
+    Return dict of family root: sorted list of REFCODEs.
+
+    """
+    families = {}
+    for RC in sorted(set(refcodes)):
+        families.setdefault(family_root(RC), []).append(RC)
+    return families
+
+
+def order_by_family(refcodes, metadata):
+    """
+    Split REFCODEs into family representatives and deferred members.
+
+    Returns:
+        representatives (list) - best member of each family
+        deferred (list) - all other members, in family order
+
+    """
+    representatives = []
+    deferred = []
+    families = group_families(refcodes)
+    for root in sorted(families):
+        members = sorted(
+            families[root], key=lambda i: quality_key(i, metadata)
+        )
+        representatives.append(members[0])
+        deferred.extend(members[1:])
+    return representatives, deferred
+
+
+def main():
+    if (not len(sys.argv) == 5):
+        print("""
+    Usage: refcode_families.py REFCODE_file metadata_file rep_file
+    deferred_file
+        REFCODE_file (str) - file with list of REFCODEs
+        metadata_file (str) - quality metadata of REFCODEs
+            (from get_family_metadata.py)
+        rep_file (str) - file to write representative REFCODEs to
+        deferred_file (str) - file to write deferred REFCODEs to
+        """)
+        sys.exit()
+    else:
+        RCODE_file = sys.argv[1]
+        metadata_file = sys.argv[2]
+        rep_file = sys.argv[3]
+        deferred_file = sys.argv[4]
+
+    refcodes = [i.rstrip() for i in open(RCODE_file, 'r').readlines()]
+    metadata = read_quality_metadata(metadata_file)
+    representatives, deferred = order_by_family(refcodes, metadata)
+    with open(rep_file, 'w') as f:
+        for RC in representatives:
+            f.write(RC+'\n')
+    with open(deferred_file, 'w') as f:
+        for RC in deferred:
+            f.write(RC+'\n')
+    logging.info(
+        f'> {len(refcodes)} REFCODEs in {len(representatives)} families, '
+        f'{len(deferred)} deferred'
+    )
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='')
+    main()
@@ -13,24 +13,267 @@ Date Created: 15 Apr 2019
 
 import sys
 import logging
-from ase.io import read
-from ase.atoms import Atoms
-from ase.geometry import get_duplicate_atoms
+import numpy as np
 import os
-import atools
+from in_memory import read_structure, modularize_atoms
+from periodic_molecules import iter_molecules, PolymericError
+from solvent_library import split_solvents, write_solvent_report
+
+
+def assemble_kept_molecules(molecules, n_atoms_list, cell):
+    """
+    Build one ASE structure from the molecules kept after solvent removal.
+
+    Molecules with the maximum number of atoms are kept (the same
+    rule as `atools.remove_solvent`). Their elements and coordinates
+    are copied into preallocated arrays using index masks, and the
+    final structure is constructed once, rather than growing an
+    `Atoms` object atom by atom.
+
+    Keyword Arguments:
+        molecules (dict) - molecules of the modularized system
+            (`rebuilt_structure.molecules`)
+        n_atoms_list (list) - number of atoms of each molecule, in the
+            order of `molecules`
+        cell (ase.cell.Cell) - unit cell of the input structure
+
+    Returns:
+        final_struct (ase.Atoms) - periodic structure of kept molecules
+
+    """
+    from ase.atoms import Atoms
+    n_atoms = np.asarray(n_atoms_list)
+    keep = n_atoms == n_atoms.max()
+    total = int(n_atoms[keep].sum())
+    symbols = np.empty(total, dtype=object)
+    positions = np.empty((total, 3), dtype=float)
+    # offsets of each kept molecule in the preallocated arrays
+    ends = np.cumsum(np.where(keep, n_atoms, 0))
+    for i, molecule in enumerate(molecules):
+        if not keep[i]:
+            continue
+        mol = molecules[molecule]
+        start = ends[i] - n_atoms[i]
+        symbols[start:ends[i]] = [j.title() for j in mol.elements]
+        positions[start:ends[i]] = mol.coordinates
+    final_struct = Atoms(
+        symbols=list(symbols),
+        positions=positions,
+        cell=cell,
+        pbc=[True, True, True]
+    )
+    return final_struct
+
+
+# options of main (queue=DIR is handled separately)
+OPTIONS = ['stream', 'solvent_library', 'in_memory']
+
+
+def record_solvent_only(file, pdb):
+    """
+    Append pdb to the CSV of structures with no molecules left after
+    solvent removal, which are skipped by later runs.
+
+    """
+    if not os.path.isfile(file):
+        with open(file, 'w') as f:
+            f.write('pdb\n')
+    with open(file, 'a') as f:
+        f.write(f'{pdb}\n')
+
+
+def read_solvent_only(file):
+    """
+    Read the CSV of structures with no molecules left after solvent
+    removal.
+
+    Returns:
+        (set) - pdbs of file, empty if file does not exist
+
+    """
+    if not os.path.isfile(file):
+        return set()
+    with open(file, 'r') as f:
+        f.readline()
+        return set(i.rstrip() for i in f if i.strip())
+
+
+def remove_solvent(pdb, stream, use_library, report_file, queue=None,
+                   in_memory=False, solvent_only_file=None):
+    """
+    Write the kept (cage) molecules of pdb to *_nosolv.cif and
+    *_nosolv.pdb.
+
+    Keyword Arguments:
+        pdb (str) - name of pdb to analyze
+        stream (bool) - rebuild molecules one at a time
+        use_library (bool) - remove library solvents first
+        report_file (str) - CSV to report removed solvents to
+        queue (WorkQueue) - queue pdb was claimed from, nothing is
+            written if its lease was lost
+        in_memory (bool) - rebuild from the parsed structure instead of
+            reading pdb again (in_memory.py)
+        solvent_only_file (str) - CSV to record pdb to if no molecules
+            are left (e.g. all are library solvents)
+
+    """
+    from ase.io import read
+    from ase.geometry import get_duplicate_atoms
+    import atools
+    if pdb[-4:] != '.pdb':
+        raise Exception(f'input file: {pdb} was not a pdb')
+
+    # pdb_file, struct = IO_tools.convert_CIF_2_PDB(pdb)
+    # if pdb_file is None and struct is None:
+    #     continue
+    if in_memory:
+        struct = read_structure(pdb)
+        if struct is None:
+            return
+    else:
+        struct = read(pdb)
+    solvents = []
+    if stream:
+        # only keep molecules with the largest number of atoms so
+        # far
+        molecules = {}
+        try:
+            for molecule, mol in iter_molecules(pdb, polymeric='raise'):
+                if use_library:
+                    others, found = split_solvents({molecule: mol})
+                    solvents.extend(found)
+                    if len(others) == 0:
+                        continue
+                if len(molecules) > 0:
+                    largest = next(iter(molecules.values())).no_of_atoms
+                    if mol.no_of_atoms < largest:
+                        continue
+                    if mol.no_of_atoms > largest:
+                        molecules = {}
+                molecules[molecule] = mol
+        except PolymericError as e:
+            # a network bonded to its own image, from disorder or a
+            # polymeric structure, as the huge molecules of the
+            # pyWindow rebuild below
+            logging.info(f'{e}')
+            logging.info(
+                f'skipping this CIF because modularising failed.'
+            )
+            logging.info(
+                f'----------------------------------------------'
+            )
+            return
+    else:
+        if in_memory:
+            # rebuild from the parsed structure, without reading the
+            # pdb again
+            rebuilt_structure = modularize_atoms(
+                struct, system_id=pdb.replace('.pdb', '')
+            )
+        else:
+            rebuilt_structure = atools.modularize(file=pdb)
+        if rebuilt_structure is None:
+            # handle pyWindow failure
+            sys.exit(f'pyWindow failure on {pdb}')
+        molecules = rebuilt_structure.molecules
+        if use_library:
+            others, solvents = split_solvents(molecules)
+            molecules = {i: molecules[i] for i in others}
+    if queue is not None and not queue.holds(pdb):
+        return
+    if use_library:
+        write_solvent_report(
+            report_file, pdb.replace('_extracted.pdb', ''), solvents
+        )
+    if len(molecules) == 0:
+        logging.info(f'no molecules left in {pdb}')
+        if solvent_only_file is not None:
+            record_solvent_only(solvent_only_file, pdb)
+        return
+    # test if one molecule is huge because disorder breaks pywindow
+    # code
+    no_atoms_orig = len(struct)
+    n_atoms_list = []
+    for molecule in molecules:
+        n_atoms_list.append(molecules[molecule].no_of_atoms)
+    max_count = max(n_atoms_list)
+    if max_count > no_atoms_orig:
+        logging.info(
+            f'1 UC: {no_atoms_orig} modularized max: {max_count}'
+        )
+        # implies that this structure is too disordered for
+        # pywindow to handle
+        # sys.exit(
+        #     'skipping this CIF because modularising failed.'
+        # )
+        logging.info(
+            f'skipping this CIF because modularising failed.'
+        )
+        logging.info(
+            f'----------------------------------------------'
+        )
+        return
+    # gather kept molecules into a single structure with the
+    # same cell as the input struct
+    final_struct = assemble_kept_molecules(
+        molecules=molecules,
+        n_atoms_list=n_atoms_list,
+        cell=struct.cell
+    )
+    # only output structures with more than 0 atoms
+    if len(final_struct):
+        ##########################################################
+        # should implement a check for duplicated atoms
+        ##########################################################
+        get_duplicate_atoms(
+            atoms=final_struct,
+            cutoff=0.001,
+            delete=True
+        )
+        # view(final_struct)
+        # output to CIF
+        output = pdb.replace('.pdb', '_nosolv.cif')
+        final_struct.write(output, format='cif')
+        # # turn off PBC and cells for writing pdb
+        # final_struct.set_cell([0, 0, 0])
+        # final_struct.set_pbc(False)
+        output = pdb.replace('.pdb', '_nosolv.pdb')
+        final_struct.write(output)
+    logging.info(f'done')
+    logging.info(f'----------------------------------------------')
 
 
 def main():
-    if (not len(sys.argv) == 3):
+    if (not len(sys.argv) >= 3):
         print("""
-Usage: remove_solvent.py pdb ignore
+Usage: remove_solvent.py pdb ignore [options]
     pdb (str) - name of pdb to analyze
         ('*_extracted.pdb' for all in working dir)
     ignore (str) - string to use to ignore certain files
         (set NONE if not used)
+    options (str) - any of:
+        stream - rebuild molecules one at a time by periodic graph
+            traversal (periodic_molecules.py) and only keep the
+            largest, to bound memory use
+        solvent_library - remove molecules matching the library of
+            common solvents and counter-ions (solvent_library.py)
+            first, reported in removed_solvents.csv; structures with
+            no other molecules are listed in solvent_only.csv and
+            skipped by later runs
+        in_memory - rebuild from the structure parsed by ASE
+            (in_memory.py) instead of reading the pdb again
+        queue=DIR - claim structures from a lease-based work queue
+            in shared directory DIR (work_queue.py) so that several
+            nodes can run on the same pdbs
 
     """)
         sys.exit()
+    unknown = [
+        i for i in sys.argv[3:]
+        if i not in OPTIONS and not i.startswith('queue=')
+    ]
+    if len(unknown) > 0:
+        sys.exit(f'unknown options: {", ".join(unknown)}')
     else:
         if '*' in sys.argv[1]:
             from glob import glob
@@ -44,6 +287,27 @@ Usage: remove_solvent.py pdb ignore
             print('{} pdbs to analyze'.format(len(pdbs)))
         else:
             pdbs = [sys.argv[1]]
+        stream = 'stream' in sys.argv[3:]
+        use_library = 'solvent_library' in sys.argv[3:]
+        in_memory = 'in_memory' in sys.argv[3:]
+        queue_dir = None
+        for i in sys.argv[3:]:
+            if i.startswith('queue='):
+                queue_dir = i.split('=', 1)[1]
+
+    n_pdbs = len(pdbs)
+    report_file = 'removed_solvents.csv'
+    solvent_only_file = 'solvent_only.csv'
+    # structures with no molecules left in earlier runs
+    solvent_only = read_solvent_only(solvent_only_file)
+    queue = None
+    if queue_dir is not None:
+        from work_queue import WorkQueue
+        queue = WorkQueue(queue_dir)
+        report_file = queue.shard_file(report_file)
+        solvent_only_file = queue.shard_file(solvent_only_file)
+        # structures claimed by this node
+        pdbs = queue.items(pdbs)
 
     count = 0
     for pdb in pdbs:
@@ -51,78 +315,28 @@ Usage: remove_solvent.py pdb ignore
         if os.path.isfile(pdb.replace('.pdb', '_nosolv.cif')):
             if os.path.isfile(pdb.replace('.pdb', '_nosolv.pdb')):
                 continue
-        logging.info(f'doing {pdb}: {count} of {len(pdbs)}')
-        if pdb[-4:] != '.pdb':
-            raise Exception(f'input file: {pdb} was not a pdb')
-
-        # pdb_file, struct = IO_tools.convert_CIF_2_PDB(pdb)
-        # if pdb_file is None and struct is None:
-        #     continue
-        struct = read(pdb)
-        # get final struct equivalent to input struct,
-        # but without atoms
-        final_struct = Atoms()
-        final_struct.set_cell(struct.cell)
-        final_struct.set_pbc([True, True, True])
-        # view(struct)
-        # view(final_struct)
-        rebuilt_structure = atools.modularize(file=pdb)
-        if rebuilt_structure is None:
-            # handle pyWindow failure
-            sys.exit(f'pyWindow failure on {pdb}')
-        # test if one molecule is huge because disorder breaks pywindow
-        # code
-        no_atoms_orig = len(struct)
-        n_atoms_list = []
-        for molecule in rebuilt_structure.molecules:
-            n_atoms_list.append(
-                rebuilt_structure.molecules[molecule].no_of_atoms
-            )
-        max_count = max(n_atoms_list)
-        if max_count > no_atoms_orig:
-            logging.info(
-                f'1 UC: {no_atoms_orig} modularized max: {max_count}'
-            )
-            # implies that this structure is too disordered for
-            # pywindow to handle
-            # sys.exit(
-            #     'skipping this CIF because modularising failed.'
-            # )
-            logging.info(
-                f'skipping this CIF because modularising failed.'
-            )
-            logging.info(
-                f'----------------------------------------------'
-            )
+        if pdb in solvent_only:
+            if queue is not None:
+                queue.complete(pdb)
             continue
-        final_struct = atools.remove_solvent(
-            pw_struct=rebuilt_structure,
-            ASE_struct=final_struct,
-            mol_list=n_atoms_list
+        logging.info(f'doing {pdb}: {count} of {n_pdbs}')
+        remove_solvent(
+            pdb, stream, use_library, report_file, queue, in_memory,
+            solvent_only_file
         )
-        # only output structures with more than 0 atoms
-        if len(final_struct):
-            ##########################################################
-            # should implement a check for duplicated atoms
-            ##########################################################
-            get_duplicate_atoms(
-                atoms=final_struct,
-                cutoff=0.001,
-                delete=True
-            )
-            # view(final_struct)
-            # output to CIF
-            output = pdb.replace('.pdb', '_nosolv.cif')
-            final_struct.write(output, format='cif')
-            # # turn off PBC and cells for writing pdb
-            # final_struct.set_cell([0, 0, 0])
-            # final_struct.set_pbc(False)
-            output = pdb.replace('.pdb', '_nosolv.pdb')
-            final_struct.write(output)
-        logging.info(f'done')
-        logging.info(f'----------------------------------------------')
+        if queue is not None:
+            queue.complete(pdb)
         count += 1
 
+    if queue is not None:
+        if use_library:
+            queue.merge_shards(
+                report_file, 'removed_solvents.csv',
+                item_of=lambda i: i + '_extracted.pdb'
+            )
+        queue.merge_shards(solvent_only_file, 'solvent_only.csv')
+        queue.close()
+
 
 if __name__ == "__main__":
     logging.basicConfig(level=logging.INFO, format='')
@@ -0,0 +1,137 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# Distributed under the terms of the MIT License.
+
+"""
+Functions for passing structure arrays (elements, coordinates, bonds)
+to worker processes in shared memory instead of pickling them.
+
+The parent process puts the arrays of a structure in one
+multiprocessing.shared_memory block (ArrayStore.put) and sends the
+small handle (block name and layout) to a worker, which maps the
+arrays without copying (attached). Only the parent unlinks blocks: on
+release after the worker's result (or failure) is received, and for
+any block left at exit. Blocks are also registered with the
+multiprocessing resource tracker, which unlinks them if the parent
+dies.
+
+Requires Python 3.8+ (multiprocessing.shared_memory).
+
+Author: Andrew Tarzia
+
+Date Created: 19 Oct 2026
+
+"""
+
+import atexit
+import threading
+from contextlib import contextmanager
+from multiprocessing import shared_memory
+import numpy as np
+
+
+# byte alignment of arrays in a block
+ALIGNMENT = 64
+
+
+class ArrayStore:
+    """
+    Shared memory blocks of arrays created by this process.
+
+    """
+
+    def __init__(self):
+        self.blocks = {}
+        self._lock = threading.Lock()
+        atexit.register(self.close)
+
+    def put(self, arrays):
+        """
+        Copy a dict of arrays into a new shared memory block.
+
+        Keyword Arguments:
+            arrays (dict) - name: array (lists of str, e.g. elements,
+                are stored as unicode arrays)
+
+        Returns:
+            (tuple) - handle of block, (block name, layout)
+
+        """
+        arrays = {
+            key: np.ascontiguousarray(
+                np.asarray(value, dtype=str)
+                if np.asarray(value).dtype == object
+                else value
+            )
+            for key, value in arrays.items()
+        }
+        layout = []
+        size = 0
+        for key, array in arrays.items():
+            size = -(-size // ALIGNMENT) * ALIGNMENT
+            layout.append((key, array.dtype.str, array.shape, size))
+            size += array.nbytes
+        shm = shared_memory.SharedMemory(create=True, size=max(size, 1))
+        for key, dtype, shape, offset in layout:
+            view = np.ndarray(
+                shape, dtype=dtype, buffer=shm.buf, offset=offset
+            )
+            view[...] = arrays[key]
+            del view
+        with self._lock:
+            self.blocks[shm.name] = shm
+        return shm.name, tuple(layout)
+
+    def release(self, handle):
+        """
+        Unlink the block of handle (no-op if already released).
+
+        """
+        with self._lock:
+            shm = self.blocks.pop(handle[0], None)
+        if shm is not None:
+            shm.close()
+            shm.unlink()
+
+    def close(self):
+        """
+        Unlink all blocks still held.
+
+        """
+        with self._lock:
+            names = list(self.blocks)
+        for name in names:
+            self.release((name, None))
+
+    def __len__(self):
+        return len(self.blocks)
+
+
+@contextmanager
+def attached(handle):
+    """
+    Map the arrays of a handle from ArrayStore.put (in a worker).
+
+    The arrays are read-only views of the block and are only valid
+    inside the with block; results must not keep references to them.
+
+    Yields:
+        (dict) - name: array
+
+    """
+    name, layout = handle
+    shm = shared_memory.SharedMemory(name=name)
+    arrays = {}
+    try:
+        for key, dtype, shape, offset in layout:
+            view = np.ndarray(
+                shape, dtype=dtype, buffer=shm.buf, offset=offset
+            )
+            view.flags.writeable = False
+            arrays[key] = view
+        yield arrays
+    finally:
+        # views must be dropped before the block is closed
+        arrays.clear()
+        view = None
+        shm.close()
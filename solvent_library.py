@@ -0,0 +1,192 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# Distributed under the terms of the MIT License.
+
+"""
+Library of common solvents and counter-ions for rejecting non-cage
+molecules before any pyWindow analysis.
+
+Each library molecule is stored as its heavy-atom formula and the
+Weisfeiler-Lehman hash of its heavy-atom graph (graph_hash.py), since
+hydrogens are often missing in XRD structures. A rebuilt molecule is
+matched by formula and then hash, both dict lookups.
+
+Author: Andrew Tarzia
+
+Date Created: 19 Oct 2026
+
+"""
+
+import os
+import logging
+from collections import Counter
+
+from graph_hash import perceive_bonds, formula, wl_hash
+
+
+def _ring(n, start=0):
+    return [(start + i, start + (i + 1) % n) for i in range(n)]
+
+
+# name: (heavy atom elements, heavy atom bonds)
+SOLVENTS = {
+    'water': (['O'], []),
+    'methanol': (['C', 'O'], [(0, 1)]),
+    'ethanol': (['C', 'C', 'O'], [(0, 1), (1, 2)]),
+    'isopropanol': (['C', 'C', 'C', 'O'], [(0, 1), (1, 2), (1, 3)]),
+    'acetonitrile': (['C', 'C', 'N'], [(0, 1), (1, 2)]),
+    'acetone': (['C', 'O', 'C', 'C'], [(0, 1), (0, 2), (0, 3)]),
+    'dichloromethane': (['C', 'Cl', 'Cl'], [(0, 1), (0, 2)]),
+    'chloroform': (['C', 'Cl', 'Cl', 'Cl'], [(0, 1), (0, 2), (0, 3)]),
+    'carbon tetrachloride': (
+        ['C', 'Cl', 'Cl', 'Cl', 'Cl'], [(0, 1), (0, 2), (0, 3), (0, 4)]
+    ),
+    'dichloroethane': (
+        ['Cl', 'C', 'C', 'Cl'], [(0, 1), (1, 2), (2, 3)]
+    ),
+    'nitromethane': (['C', 'N', 'O', 'O'], [(0, 1), (1, 2), (1, 3)]),
+    'diethyl ether': (
+        ['C', 'C', 'O', 'C', 'C'], [(0, 1), (1, 2), (2, 3), (3, 4)]
+    ),
+    'tetrahydrofuran': (['C', 'C', 'C', 'C', 'O'], _ring(5)),
+    'dioxane': (['C', 'C', 'O', 'C', 'C', 'O'], _ring(6)),
+    'DMF': (
+        ['O', 'C', 'N', 'C', 'C'], [(0, 1), (1, 2), (2, 3), (2, 4)]
+    ),
+    'DMA': (
+        ['O', 'C', 'N', 'C', 'C', 'C'],
+        [(0, 1), (1, 2), (2, 3), (2, 4), (1, 5)]
+    ),
+    'DMSO': (['S', 'O', 'C', 'C'], [(0, 1), (0, 2), (0, 3)]),
+    'ethyl acetate': (
+        ['C', 'C', 'O', 'O', 'C', 'C'],
+        [(0, 1), (1, 2), (1, 3), (3, 4), (4, 5)]
+    ),
+    'pentane': (['C'] * 5, [(i, i + 1) for i in range(4)]),
+    'hexane': (['C'] * 6, [(i, i + 1) for i in range(5)]),
+    'cyclohexane': (['C'] * 6, _ring(6)),
+    'benzene': (['C'] * 6, _ring(6)),
+    'toluene': (['C'] * 7, _ring(6) + [(0, 6)]),
+    'o-xylene': (['C'] * 8, _ring(6) + [(0, 6), (1, 7)]),
+    'm-xylene': (['C'] * 8, _ring(6) + [(0, 6), (2, 7)]),
+    'p-xylene': (['C'] * 8, _ring(6) + [(0, 6), (3, 7)]),
+    'chlorobenzene': (['C'] * 6 + ['Cl'], _ring(6) + [(0, 6)]),
+    'nitrobenzene': (
+        ['C'] * 6 + ['N', 'O', 'O'], _ring(6) + [(0, 6), (6, 7), (6, 8)]
+    ),
+    'pyridine': (['C'] * 5 + ['N'], _ring(6)),
+    'chloride': (['Cl'], []),
+    'bromide': (['Br'], []),
+    'iodide': (['I'], []),
+    'nitrate': (['N', 'O', 'O', 'O'], [(0, 1), (0, 2), (0, 3)]),
+    'perchlorate': (
+        ['Cl', 'O', 'O', 'O', 'O'], [(0, 1), (0, 2), (0, 3), (0, 4)]
+    ),
+    'sulfate': (
+        ['S', 'O', 'O', 'O', 'O'], [(0, 1), (0, 2), (0, 3), (0, 4)]
+    ),
+    'tetrafluoroborate': (
+        ['B', 'F', 'F', 'F', 'F'], [(0, 1), (0, 2), (0, 3), (0, 4)]
+    ),
+    'hexafluorophosphate': (
+        ['P'] + ['F'] * 6, [(0, i) for i in range(1, 7)]
+    ),
+    'hexafluoroantimonate': (
+        ['Sb'] + ['F'] * 6, [(0, i) for i in range(1, 7)]
+    ),
+    'triflate': (
+        ['C', 'F', 'F', 'F', 'S', 'O', 'O', 'O'],
+        [(0, 1), (0, 2), (0, 3), (0, 4), (4, 5), (4, 6), (4, 7)]
+    ),
+    'triflimide': (
+        ['C', 'F', 'F', 'F', 'S', 'O', 'O', 'N',
+         'S', 'O', 'O', 'C', 'F', 'F', 'F'],
+        [(0, 1), (0, 2), (0, 3), (0, 4), (4, 5), (4, 6), (4, 7),
+         (7, 8), (8, 9), (8, 10), (8, 11), (11, 12), (11, 13), (11, 14)]
+    ),
+}
+
+_library = None
+
+
+def build_library(solvents=SOLVENTS):
+    """
+    Return dict of heavy-atom formula: dict of graph hash: name.
+
+    Molecules that only differ in hydrogens (e.g. benzene and
+    cyclohexane) share a hash and are named together.
+
+    """
+    library = {}
+    for name, (elements, bonds) in solvents.items():
+        graph = wl_hash(elements, bonds, heavy_only=True)
+        hashes = library.setdefault(formula(elements, heavy_only=True), {})
+        if graph in hashes:
+            name = f'{hashes[graph]}/{name}'
+        hashes[graph] = name
+    return library
+
+
+def match_solvent(elements, coordinates):
+    """
+    Return the library name of a molecule, or None if not in library.
+
+    """
+    global _library
+    if _library is None:
+        _library = build_library()
+    candidates = _library.get(formula(elements, heavy_only=True))
+    if candidates is None:
+        return None
+    bonds = perceive_bonds(elements, coordinates)
+    return candidates.get(wl_hash(elements, bonds, heavy_only=True))
+
+
+def split_solvents(molecules):
+    """
+    Separate library molecules from the others.
+
+    Keyword Arguments:
+        molecules (dict) - id: pywindow.Molecule
+
+    Returns:
+        others (list) - ids of molecules not in library
+        found (list) - library names of matched molecules
+
+    """
+    others = []
+    found = []
+    for i in molecules:
+        name = match_solvent(molecules[i].elements, molecules[i].coordinates)
+        if name is None:
+            others.append(i)
+        else:
+            found.append(name)
+    return others, found
+
+
+def write_solvent_report(file, REFCODE, found):
+    """
+    Append the solvents found in a structure to a CSV report.
+
+    Keyword Arguments:
+        file (str) - CSV of REFCODE,solvents
+        REFCODE (str) - structure
+        found (list) - library names of matched molecules
+
+    """
+    if not os.path.isfile(file):
+        with open(file, 'w') as f:
+            f.write('REFCODE,solvents\n')
+    counts = Counter(found)
+    with open(file, 'a') as f:
+        f.write(
+            f'{REFCODE},'
+            + ';'.join(f'{i}:{counts[i]}' for i in sorted(counts))
+            + '\n'
+        )
+    if len(counts) > 0:
+        logging.info(
+            f'> {REFCODE} solvents: '
+            + ', '.join(f'{counts[i]} {i}' for i in sorted(counts))
+        )
@@ -12,26 +12,59 @@ Date Created: 05 Apr 2019
 """
 
 import logging
-import sys
-import pandas as pd
+import argparse
 import glob
 import os
-import atools
+from pore_estimator import prescreen
+from in_memory import modularize_file, has_pore
 
 
 def main():
-    if (not len(sys.argv) == 4):
-        print("""
-    Usage: sort_structures.py DB_file output_file file_type
-        DB_file (str) - file with initial list of REFCODEs
-        output_file (str) - file to output results of sorting to
-        file_type (str) - set whether to run on PDBs (enter: pdb) or CIFs (enter: cif)
-        """)
-        sys.exit()
-    else:
-        DB_file = sys.argv[1]
-        output_file = sys.argv[2]
-        file_type = sys.argv[3]
+    parser = argparse.ArgumentParser(
+        description=(
+            'Sort CIFs or PDBs based on their pyWindow results.'
+        )
+    )
+    parser.add_argument(
+        'DB_file', help='file with initial list of REFCODEs'
+    )
+    parser.add_argument(
+        'output_file', help='file to output results of sorting to'
+    )
+    parser.add_argument(
+        'file_type', choices=['pdb', 'cif'],
+        help='set whether to run on PDBs (pdb) or CIFs (cif)'
+    )
+    parser.add_argument(
+        '--provenance', action='store_true',
+        help=(
+            'stamp results with provenance keys (output_file'
+            '.provenance.json) and recheck kept structures whose inputs '
+            'or pyWindow/atools code changed'
+        )
+    )
+    parser.add_argument(
+        '--prescreen', type=float, default=None, metavar='MARGIN',
+        help=(
+            'keep (and check with pyWindow) only structures with a '
+            'molecule whose upper bound of the pore diameter '
+            '(pore_estimator.py) is greater than -MARGIN Angstrom; '
+            'other structures are deleted without running pyWindow'
+        )
+    )
+    parser.add_argument(
+        '--in_memory', action='store_true',
+        help=(
+            'parse each structure once and pass it to pyWindow in '
+            'memory, without writing PDB or rebuilt PDB files'
+        )
+    )
+    args = parser.parse_args()
+    import pandas as pd
+    import atools
+    DB_file = args.DB_file
+    output_file = args.output_file
+    file_type = args.file_type
 
     # temporary check for non-implemented issue with extractedm.cif cases
     # these cases were manually collected
@@ -54,6 +87,24 @@ def main():
         OUTDATA = pd.read_csv(output_file)
         done_files = []
 
+    ledger = None
+    if args.provenance:
+        from provenance import ProvenanceLedger
+        ledger = ProvenanceLedger(
+            output_file + '.provenance.json',
+            params={
+                'modularize': {'in_memory': args.in_memory},
+                'analysis': {'diam': 0.0, 'prescreen': args.prescreen}
+            }
+        )
+        # deleted structures cannot be rechecked
+        kept = list(OUTDATA[OUTDATA['deleted'] == 'N']['file'])
+        redo = [i for i in kept if ledger.invalidate(i, i)]
+        ledger.save()
+        OUTDATA = OUTDATA[~OUTDATA['file'].isin(redo)]
+        done_files = [i for i in done_files if i not in redo]
+        logging.info(f'> {len(redo)} structures invalidated.')
+
     # iterate over files
     count = len(done_files)
     for file in files:
@@ -61,7 +112,11 @@ def main():
         if file in done_files:
             continue
         if os.path.isfile(file):
-            if file_type == 'cif':
+            if args.in_memory:
+                # parse once and rebuild without intermediate files
+                struct, rbs = modularize_file(file)
+                pdb = None if struct is None else file
+            elif file_type == 'cif':
                 pdb = atools.convert_CIF_2_PDB(file, wstruct=False)
             elif file_type == 'pdb':
                 pdb = atools.check_ASE_handle(file, wstruct=False)
@@ -74,7 +129,32 @@ def main():
             else:
                 logging.info(f'> doing {count} of {len(files)}')
                 # check if at least one molecule has a pore_diameter_opt > 0.25 angstrom
-                if atools.check_PDB_for_pore(file=pdb, diam=0.0):
+                if args.in_memory and rbs is None:
+                    # keep structures pyWindow failed to rebuild, they
+                    # were not shown to be non-porous
+                    logging.warning(f'> pyWindow failed to rebuild {file}')
+                    porous = True
+                elif args.in_memory:
+                    porous = (
+                        args.prescreen is None or len(prescreen(
+                            rbs.molecules, threshold=0.0,
+                            margin=args.prescreen
+                        )) > 0
+                    ) and has_pore(rbs, diam=0.0)
+                else:
+                    if args.prescreen is not None:
+                        # the rebuild is reused by check_PDB_for_pore
+                        rbs = atools.modularize(file=pdb)
+                        porous = rbs is None or len(prescreen(
+                            rbs.molecules, threshold=0.0,
+                            margin=args.prescreen
+                        )) > 0
+                    else:
+                        porous = True
+                    porous = porous and atools.check_PDB_for_pore(
+                        file=pdb, diam=0.0
+                    )
+                if porous:
                     OUTDATA = OUTDATA.append({'file': file, 'deleted': 'N'},
                                              ignore_index=True)
                 else:
@@ -82,11 +162,12 @@ def main():
                     OUTDATA = OUTDATA.append({'file': file, 'deleted': 'Y'},
                                              ignore_index=True)
                     os.remove(file)
-                    try:
-                        os.remove(pdb)
-                    except FileNotFoundError:
-                        pass
-                    os.remove(pdb.replace('.pdb', '_rebuild.pdb'))
+                    if not args.in_memory:
+                        try:
+                            os.remove(pdb)
+                        except FileNotFoundError:
+                            pass
+                        os.remove(pdb.replace('.pdb', '_rebuild.pdb'))
         else:
             # file missing.
             OUTDATA = OUTDATA.append({'file': file, 'deleted': 'M'},
@@ -96,6 +177,9 @@ def main():
         done_files.append(file)
         # update output file
         OUTDATA.to_csv(output_file, index=False)
+        if ledger is not None and os.path.isfile(file):
+            ledger.stamp(file, file)
+            ledger.save()
         count += 1
 
     remaining = list(OUTDATA[OUTDATA['deleted'] == 'N']['file'])
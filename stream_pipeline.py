@@ -0,0 +1,483 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# Distributed under the terms of the MIT License.
+
+"""
+Script to stream a list of REFCODEs from the CSD to classification
+results in one job, with the stages connected by bounded queues:
+
+    read (1 thread) - CSD entry and packed unit cell (CSD_f)
+    convert (threads) - periodic arrays (elements, fractional
+        coordinates, lattice and CSD bonds)
+    analyse (process pool) - molecules by periodic graph traversal
+        (periodic_molecules.py) and pyWindow analysis; arrays are
+        passed in shared memory (shm_transport.py) by default
+    write (1 thread) - output_file and output_file.status.csv
+
+so reading, conversion, analysis and writing overlap, and no
+intermediate PDBs are written. Queue depths are logged every
+--metrics_interval seconds; a full queue points at a slow downstream
+stage, an empty one at a slow upstream stage.
+
+Results are rows of REFCODE,molecule,pore_diam_opt,no_windows of the
+cages (as classify_structures.py), with molecule ids in traversal
+order. Structures in the status file are skipped when restarting,
+except failed ones.
+
+Author: Andrew Tarzia
+
+Date Created: 19 Oct 2026
+
+"""
+
+import os
+import sys
+import time
+import queue
+import logging
+import argparse
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, Future
+from concurrent.futures.process import BrokenProcessPool
+import numpy as np
+
+from analysis_f import analyse_molecule, warn_engine
+from periodic_molecules import (
+    cellpar_to_lattice, perceive_periodic_bonds, bond_images,
+    whole_molecules, read_cell_pdb, bond_table_file, read_bond_table
+)
+
+
+# end of a stream
+SENTINEL = None
+
+
+class Metrics:
+    """
+    Number of items and busy time of each stage.
+
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counts = {}
+        self.busy = {}
+
+    def add(self, stage, seconds):
+        with self._lock:
+            self.counts[stage] = self.counts.get(stage, 0) + 1
+            self.busy[stage] = self.busy.get(stage, 0.0) + seconds
+
+    def report(self, elapsed):
+        for stage in ['read', 'convert', 'analyse', 'write']:
+            n = self.counts.get(stage, 0)
+            busy = self.busy.get(stage, 0.0)
+            logging.info(
+                f'> {stage}: {n} items, {busy:.1f} s busy '
+                f'({busy / max(elapsed, 1E-9):.2f} of wall time)'
+            )
+
+
+def read_stage(refcodes, suffix, out_q, n_consumers, metrics):
+    """
+    Read the packed unit cell of each REFCODE from the CSD, or the name
+    of its structure file if suffix is given.
+
+    """
+    if suffix is None:
+        sys.path.insert(0, os.path.join(
+            os.path.dirname(os.path.abspath(__file__)), 'CSD_API_python3'
+        ))
+        import CSD_f
+        entry_reader = CSD_f.get_entryreader()
+    try:
+        for RC in refcodes:
+            start = time.time()
+            if suffix is not None:
+                item = (RC, 'file', RC + suffix)
+            else:
+                try:
+                    crystal = CSD_f.get_crystal(entry_reader, RC)
+                except RuntimeError:
+                    # REFCODE is not in the CSD
+                    crystal = None
+                data = None
+                if crystal is not None:
+                    data = CSD_f.get_packed_arrays(crystal)
+                item = (RC, 'csd', data)
+            metrics.add('read', time.time() - start)
+            out_q.put(item)
+    finally:
+        # consumers finish even if reading failed
+        for _ in range(n_consumers):
+            out_q.put(SENTINEL)
+
+
+def convert_stage(in_q, out_q, write_q, bond_tables, store, metrics):
+    """
+    Convert read items to periodic arrays for analysis, put in shared
+    memory if store (shm_transport.ArrayStore) is given.
+
+    Missing or unreadable structures are sent to the writer.
+
+    """
+    while True:
+        item = in_q.get()
+        if item is SENTINEL:
+            out_q.put(SENTINEL)
+            break
+        RC, kind, data = item
+        start = time.time()
+        bonds = None
+        try:
+            if kind == 'file':
+                if not os.path.isfile(data):
+                    write_q.put((RC, 'missing', [], 0))
+                    continue
+                elements, frac, lattice = read_cell_pdb(data)
+                if bond_tables and os.path.isfile(bond_table_file(data)):
+                    bonds = read_bond_table(bond_table_file(data))
+            else:
+                if data is None:
+                    write_q.put((RC, 'missing', [], 0))
+                    continue
+                elements = data['elements']
+                lattice = cellpar_to_lattice(data['cell'])
+                frac = np.array(data['coordinates']).reshape(-1, 3) @ (
+                    np.linalg.inv(lattice)
+                )
+                frac -= np.floor(frac)
+                if bond_tables:
+                    bonds = np.array(data['bonds'], dtype=int).reshape(-1, 2)
+        except Exception as e:
+            logging.warning(f'> failed to convert {RC}: {e}')
+            write_q.put((RC, 'failed', [], 0))
+            continue
+        finally:
+            metrics.add('convert', time.time() - start)
+        if store is None:
+            out_q.put((RC, elements, frac, lattice, bonds))
+            continue
+        arrays = {'elements': elements, 'frac': frac, 'lattice': lattice}
+        if bonds is not None:
+            arrays['bonds'] = bonds
+        out_q.put((RC, store.put(arrays)))
+
+
+def analyse_arrays(item, engine='pywindow', tol=0.4):
+    """
+    Find and analyse the molecules of a unit cell (in a worker
+    process).
+
+    Returns:
+        RC (str) - REFCODE
+        status (str) - 'ok'
+        rows (list) - (REFCODE, molecule, pore_diam_opt, no_windows)
+            of cages
+        n_molecules (int) - number of molecules
+        seconds (float) - time spent
+
+    """
+    import pywindow as pw
+    start = time.time()
+    RC, elements, frac, lattice, bonds = item
+    if bonds is None:
+        bonds, images = perceive_periodic_bonds(
+            elements, frac, lattice, tol=tol
+        )
+    else:
+        images = bond_images(frac, bonds)
+    rows = []
+    n_molecules = 0
+    for i, (_, molecule, polymeric) in enumerate(whole_molecules(
+        elements, frac, lattice, bonds, images, name=RC
+    )):
+        n_molecules += 1
+        # polymeric networks are not cages
+        if len(molecule['elements']) < 5 or polymeric:
+            continue
+        mol = pw.molecular.Molecule(molecule, RC, i)
+        result, _ = analyse_molecule(mol, name=f'{RC}_{i}', engine=engine)
+        if result is None:
+            continue
+        pdo = result['pore_diam_opt']
+        nwind = result['no_windows']
+        if pdo > 0.0 and nwind >= 2:
+            rows.append((RC, i, pdo, nwind))
+    return RC, 'ok', rows, n_molecules, time.time() - start
+
+
+def analyse_shared(item, engine='pywindow', tol=0.4):
+    """
+    Analyse a unit cell whose arrays are in shared memory (in a worker
+    process).
+
+    """
+    from shm_transport import attached
+    RC, handle = item
+    with attached(handle) as arrays:
+        return analyse_arrays(
+            (RC, arrays['elements'], arrays['frac'], arrays['lattice'],
+             arrays.get('bonds')),
+            engine=engine, tol=tol
+        )
+
+
+def analyse_stage(in_q, write_q, n_producers, pool, max_in_flight,
+                  engine, store, in_flight, metrics):
+    """
+    Submit converted items to the process pool, with at most
+    max_in_flight items submitted and not yet written.
+
+    Shared memory of an item is released once its result or failure
+    (e.g. a crashed worker) is received.
+
+    """
+    slots = threading.BoundedSemaphore(max_in_flight)
+
+    def done(future, item):
+        RC = item[0]
+        try:
+            RC, status, rows, n_molecules, seconds = future.result()
+            metrics.add('analyse', seconds)
+        except Exception as e:
+            logging.warning(f'> analysis of {RC} failed: {e}')
+            status, rows, n_molecules = 'failed', [], 0
+        finally:
+            if store is not None:
+                store.release(item[1])
+        write_q.put((RC, status, rows, n_molecules))
+        in_flight.add(-1)
+        slots.release()
+
+    finished = 0
+    while finished < n_producers:
+        item = in_q.get()
+        if item is SENTINEL:
+            finished += 1
+            continue
+        slots.acquire()
+        in_flight.add(1)
+        try:
+            if store is None:
+                future = pool.submit(analyse_arrays, item, engine)
+            else:
+                future = pool.submit(analyse_shared, item, engine)
+        except BrokenProcessPool as e:
+            # a worker died, the remaining items fail
+            future = Future()
+            future.set_exception(e)
+        future.add_done_callback(lambda f, item=item: done(f, item))
+    pool.shutdown(wait=True)
+    write_q.put(SENTINEL)
+
+
+def write_stage(write_q, output_file, status_file, metrics):
+    """
+    Append results and status of each structure as they arrive.
+
+    """
+    with open(output_file, 'a') as out, open(status_file, 'a') as status:
+        while True:
+            item = write_q.get()
+            if item is SENTINEL:
+                break
+            start = time.time()
+            RC, state, rows, n_molecules = item
+            for row in rows:
+                out.write(','.join(str(i) for i in row) + '\n')
+            status.write(f'{RC},{state},{n_molecules}\n')
+            out.flush()
+            status.flush()
+            metrics.add('write', time.time() - start)
+            logging.info(f'> {RC}: {state}, {len(rows)} cages')
+
+
+class Gauge:
+    """
+    Thread-safe gauge of items in a stage.
+
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.value = 0
+
+    def add(self, n):
+        with self._lock:
+            self.value += n
+
+
+def monitor(queues, in_flight, max_in_flight, metrics, interval, stop):
+    """
+    Log queue depths every interval seconds until stop is set.
+
+    """
+    start = time.time()
+    while not stop.wait(interval):
+        depths = ', '.join(
+            f'{name} {q.qsize()}/{q.maxsize}' for name, q in queues
+        )
+        written = metrics.counts.get('write', 0)
+        logging.info(
+            f'> queues: {depths}, in pool {in_flight.value}/'
+            f'{max_in_flight} | written {written} '
+            f'({written / (time.time() - start):.2f}/s)'
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=(
+            'Stream REFCODEs from the CSD to classification results.'
+        )
+    )
+    parser.add_argument(
+        'REFCODE_file', help='file with list of REFCODEs'
+    )
+    parser.add_argument(
+        'output_file', help='file to output cages to'
+    )
+    parser.add_argument(
+        '--from_files', default=None, metavar='SUFFIX',
+        help=(
+            'read REFCODE + SUFFIX structure files (e.g. _extracted.pdb) '
+            'instead of the CSD'
+        )
+    )
+    parser.add_argument(
+        '--converters', type=int, default=2,
+        help='number of conversion threads'
+    )
+    parser.add_argument(
+        '--workers', type=int, default=os.cpu_count(),
+        help='number of analysis processes'
+    )
+    parser.add_argument(
+        '--queue_size', type=int, default=16,
+        help='capacity of each queue between stages'
+    )
+    parser.add_argument(
+        '--bond_tables', action='store_true',
+        help=(
+            'build molecules from the CSD bonds (or bond table of the '
+            'files) instead of perceiving bonds'
+        )
+    )
+    parser.add_argument(
+        '--window_engine', choices=['pywindow', 'graph'],
+        default='pywindow',
+        help=(
+            'find windows with pyWindow sampling or (experimental, not '
+            'yet benchmarked) from the molecular graph and convex hull '
+            '(window_engine.py)'
+        )
+    )
+    parser.add_argument(
+        '--transport', choices=['shm', 'pickle'], default='shm',
+        help=(
+            'pass structure arrays to the analysis processes in shared '
+            'memory (shm_transport.py) or by pickling'
+        )
+    )
+    parser.add_argument(
+        '--metrics_interval', type=float, default=10.0,
+        help='seconds between queue depth logs'
+    )
+    args = parser.parse_args()
+    warn_engine(args.window_engine)
+
+    status_file = args.output_file + '.status.csv'
+    done = set()
+    if os.path.isfile(status_file):
+        with open(status_file, 'r') as f:
+            f.readline()
+            # failed structures (e.g. lost with a crashed worker) are
+            # retried
+            done = {
+                i.split(',')[0] for i in f
+                if i.strip() and i.split(',')[1] != 'failed'
+            }
+    else:
+        with open(status_file, 'w') as f:
+            f.write('REFCODE,status,no_molecules\n')
+        with open(args.output_file, 'w') as f:
+            f.write('REFCODE,molecule,pore_diam_opt,no_windows\n')
+    refcodes = sorted(set(
+        i.strip() for i in open(args.REFCODE_file, 'r') if i.strip()
+    ) - done)
+    logging.info(
+        f'> {len(refcodes)} structures to do, {len(done)} already done.'
+    )
+
+    read_q = queue.Queue(maxsize=args.queue_size)
+    convert_q = queue.Queue(maxsize=args.queue_size)
+    write_q = queue.Queue(maxsize=args.queue_size)
+    metrics = Metrics()
+    in_flight = Gauge()
+    # items submitted to the pool, beyond the workers they wait in the
+    # pool's own queue
+    max_in_flight = args.workers + args.queue_size
+    # workers are started on demand from the analyse thread while the
+    # other threads run, so they must not be forked from this process;
+    # the fork server imports the analysis modules once for all workers
+    context = multiprocessing.get_context('forkserver')
+    context.set_forkserver_preload(
+        ['pywindow', 'analysis_f', 'periodic_molecules']
+    )
+    pool = ProcessPoolExecutor(max_workers=args.workers, mp_context=context)
+    store = None
+    if args.transport == 'shm':
+        from shm_transport import ArrayStore
+        store = ArrayStore()
+    stop = threading.Event()
+    start = time.time()
+    threads = [
+        threading.Thread(
+            target=read_stage,
+            args=(refcodes, args.from_files, read_q, args.converters,
+                  metrics)
+        ),
+        threading.Thread(
+            target=analyse_stage,
+            args=(convert_q, write_q, args.converters, pool,
+                  max_in_flight, args.window_engine, store, in_flight,
+                  metrics)
+        ),
+        threading.Thread(
+            target=write_stage,
+            args=(write_q, args.output_file, status_file, metrics)
+        ),
+        threading.Thread(
+            target=monitor,
+            args=(
+                [('read', read_q), ('convert', convert_q),
+                 ('write', write_q)],
+                in_flight, max_in_flight, metrics, args.metrics_interval,
+                stop
+            ),
+            daemon=True
+        ),
+    ] + [
+        threading.Thread(
+            target=convert_stage,
+            args=(read_q, convert_q, write_q, args.bond_tables, store,
+                  metrics)
+        )
+        for _ in range(args.converters)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        if not thread.daemon:
+            thread.join()
+    stop.set()
+    if store is not None:
+        store.close()
+    metrics.report(time.time() - start)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='')
+    main()
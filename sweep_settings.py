@@ -0,0 +1,267 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# Distributed under the terms of the MIT License.
+
+"""
+Script to evaluate a grid of rebuild and analysis settings on a list of
+structures.
+
+Molecules are rebuilt as classify_structures.py rebuilds them, once per
+rebuild setting: the pyWindow rebuild of atools.modularize
+(modularize), the CSD bond table where available (bond_tables, as
+--bond_tables) and the periodic graph traversal at each bond tolerance
+(stream:TOL and stream_bond_tables:TOL, as --stream). The same molecule
+from different rebuilds is analysed once, and minimum molecule size
+cutoffs (the no_of_atoms < 5 filter of classify_structures.py or the
+atom_limit of atools.analyze_rebuilt) only select from the analysed
+molecules.
+
+Author: Andrew Tarzia
+
+Date Created: 19 Oct 2026
+
+"""
+
+import os
+import logging
+import argparse
+import numpy as np
+from collections import defaultdict
+
+from analysis_f import analyse_molecule, warn_engine
+from graph_hash import formula, conformer_signature
+from periodic_molecules import modularize, iter_molecules
+
+REBUILDS = ['modularize', 'bond_tables', 'stream', 'stream_bond_tables']
+
+
+def rebuild_settings(rebuilds, tolerances):
+    """
+    Return the labels of the rebuild settings, with each stream rebuild
+    at each bond tolerance.
+
+    """
+    settings = []
+    for rebuild in rebuilds:
+        if rebuild.startswith('stream'):
+            settings += [f'{rebuild}:{tol}' for tol in tolerances]
+        else:
+            settings.append(rebuild)
+    return settings
+
+
+def rebuild_molecules(pdb, setting):
+    """
+    Yield the molecules of pdb rebuilt with a rebuild setting, through
+    the rebuild functions of classify_structures.py.
+
+    Yields:
+        molecule (int) - id of molecule
+        mol (pywindow.Molecule) - molecule
+
+    """
+    rebuild, _, tol = setting.partition(':')
+    bond_tables = rebuild.endswith('bond_tables')
+    if rebuild.startswith('stream'):
+        yield from iter_molecules(
+            pdb, bond_tables=bond_tables, tol=float(tol)
+        )
+        return
+    rbs = modularize(pdb, bond_tables=bond_tables)
+    if rbs is None:
+        # handle pyWindow failure
+        logging.warning(f'{pdb} failed modularize ({setting})')
+        return
+    yield from rbs.molecules.items()
+
+
+def sweep_structure(pdb, settings, min_atoms, cache=None,
+                    engine='pywindow'):
+    """
+    Evaluate all settings on one structure.
+
+    Returns:
+        rows (list) - (rebuild setting, min_atoms, molecule,
+            no_of_atoms, pore_diam_opt, no_windows) of each setting and
+            molecule
+        n_analysed (int) - number of molecules analysed
+
+    """
+    smallest = min(min_atoms)
+    shared = {}
+    rows = []
+    for setting in settings:
+        for molec, mol in rebuild_molecules(pdb, setting):
+            n_atoms = mol.no_of_atoms
+            if n_atoms < smallest:
+                continue
+            # invariant to atom order and periodic image of the rebuild
+            key = (
+                formula(mol.elements),
+                tuple(np.round(conformer_signature(mol.coordinates), 2))
+            )
+            if key not in shared:
+                shared[key], _ = analyse_molecule(
+                    mol, name=f'{pdb}_{setting}_{molec}', cache=cache,
+                    engine=engine
+                )
+            result = shared[key]
+            for cutoff in min_atoms:
+                if n_atoms < cutoff:
+                    continue
+                rows.append((
+                    setting, cutoff, molec, n_atoms,
+                    result['pore_diam_opt'] if result else '',
+                    result['no_windows'] if result else ''
+                ))
+    return rows, len(shared)
+
+
+def summarise(output_file):
+    """
+    Log number of structures with cages for each setting.
+
+    """
+    structures = defaultdict(set)
+    cages = defaultdict(set)
+    with open(output_file, 'r') as f:
+        f.readline()
+        for line in f:
+            rebuild, cutoff, RC, _, _, pdo, nwind = (
+                line.rstrip().split(',')
+            )
+            structures[(rebuild, cutoff)].add(RC)
+            if pdo != '' and float(pdo) > 0.0 and int(nwind) >= 2:
+                cages[(rebuild, cutoff)].add(RC)
+    for setting in sorted(structures):
+        logging.info(
+            f'> rebuild {setting[0]}, min_atoms {setting[1]}: '
+            f'{len(cages[setting])} of {len(structures[setting])} '
+            'structures with cages'
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=(
+            'Evaluate a grid of rebuild and analysis settings, with the '
+            'rebuilds of classify_structures.py.'
+        )
+    )
+    parser.add_argument(
+        'DB_file', help='file with initial list of REFCODEs'
+    )
+    parser.add_argument(
+        'output_file', help='file to output results of each setting to'
+    )
+    parser.add_argument(
+        '--rebuilds', nargs='+', choices=REBUILDS, default=['modularize'],
+        help=(
+            'rebuilds of classify_structures.py: atools.modularize, '
+            'with --bond_tables, with --stream and with --stream '
+            '--bond_tables'
+        )
+    )
+    parser.add_argument(
+        '--tolerances', type=float, nargs='+', default=[0.4],
+        help='bond tolerances of the stream rebuilds (Angstrom)'
+    )
+    parser.add_argument(
+        '--min_atoms', type=int, nargs='+', default=[5],
+        help='minimum number of atoms of analysed molecules'
+    )
+    parser.add_argument(
+        '--analysis_cache', default=None,
+        help=(
+            'JSON file of pyWindow results keyed by molecular graph '
+            'hash, reused for the same cage across REFCODEs'
+        )
+    )
+    parser.add_argument(
+        '--window_engine', choices=['pywindow', 'graph'],
+        default='pywindow',
+        help=(
+            'find windows with pyWindow sampling or (experimental, not '
+            'yet benchmarked) from the molecular graph and convex hull '
+            '(window_engine.py)'
+        )
+    )
+    args = parser.parse_args()
+    warn_engine(args.window_engine)
+    cache = None
+    if args.analysis_cache is not None:
+        from graph_hash import AnalysisCache
+        cache = AnalysisCache(args.analysis_cache)
+
+    refcodes = sorted([
+        i.rstrip() for i in open(args.DB_file, 'r').readlines()
+    ])
+    rebuilds = rebuild_settings(args.rebuilds, args.tolerances)
+    logging.info(
+        f'> started with: {len(refcodes)} structures, '
+        f'{len(rebuilds) * len(args.min_atoms)} settings.'
+    )
+    # (REFCODE, rebuild, min_atoms) already done
+    done = set()
+    if os.path.isfile(args.output_file):
+        with open(args.output_file, 'r') as f:
+            f.readline()
+            for line in f:
+                rebuild, cutoff, RC = line.split(',')[:3]
+                done.add((RC, rebuild, int(cutoff)))
+        logging.info(
+            f'> {len(set(i[0] for i in done))} structures already '
+            'done (for some settings).'
+        )
+    else:
+        with open(args.output_file, 'w') as f:
+            f.write(
+                'rebuild,min_atoms,REFCODE,molecule,no_of_atoms,'
+                'pore_diam_opt,no_windows\n'
+            )
+
+    for count, RC in enumerate(refcodes):
+        settings = [
+            (rebuild, cutoff)
+            for rebuild in rebuilds for cutoff in args.min_atoms
+            if (RC, rebuild, cutoff) not in done
+        ]
+        if len(settings) == 0:
+            continue
+        pdb = RC + '_extracted.pdb'
+        if not os.path.isfile(pdb):
+            logging.warning(f'{pdb} not present!')
+            continue
+        logging.info(f'> doing {count} of {len(refcodes)}: {RC}')
+        rows, n_analysed = sweep_structure(
+            pdb, [i for i in rebuilds if i in set(j[0] for j in settings)],
+            sorted(set(i[1] for i in settings)), cache=cache,
+            engine=args.window_engine
+        )
+        rows = [i for i in rows if (i[0], i[1]) in settings]
+        # settings without molecules get an empty row, so that they are
+        # marked done
+        found = set((i[0], i[1]) for i in rows)
+        rows += [
+            (rebuild, cutoff, '', 0, '', '')
+            for rebuild, cutoff in settings if (rebuild, cutoff) not in found
+        ]
+        logging.info(f'> {n_analysed} molecules analysed')
+        with open(args.output_file, 'a') as f:
+            for rebuild, cutoff, molec, n_atoms, pdo, nwind in rows:
+                f.write(
+                    f'{rebuild},{cutoff},{RC},{molec},{n_atoms},{pdo},'
+                    f'{nwind}\n'
+                )
+        if cache is not None:
+            cache.checkpoint()
+
+    summarise(args.output_file)
+    if cache is not None:
+        cache.save()
+        cache.report()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='')
+    main()
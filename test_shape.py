@@ -20,22 +20,25 @@ Date Created: 22 Mar 2019
 import sys
 import os
 import glob
-import matplotlib.pyplot as plt
 import json
-import pywindow as pw
-import atools
+from in_memory import modularize_file
 
 
 def main():
-    if (not len(sys.argv) == 1):
+    if (sys.argv[1:] not in [[], ['in_memory']]):
         print("""
-Usage: test_shape.py
+Usage: test_shape.py [in_memory]
+    in_memory - parse and rebuild CIFs in memory (in_memory.py),
+        without intermediate PDBs
     """)
         sys.exit()
     else:
-        pass
+        in_memory = len(sys.argv) == 2
 
     # get CIFs of interest -- cleaned if it exists, otherwise original
+    import matplotlib.pyplot as plt
+    import pywindow as pw
+    import atools
     list_of_cifs = [i for i in glob.glob('*.cif') if '_cleaned' not in i]
     list_of_cleaned_cifs = glob.glob('*_cleaned.cif')
     calculation_list = [i for i in list_of_cifs
@@ -45,18 +48,26 @@ Usage: test_shape.py
     for calc in calculation_list:
         print(calc)
         pre_op = calc.replace('.cif', '_preop')
-        pdb_file = calc.replace('.cif', '.pdb')
-        print(pdb_file, pre_op)
-        if os.path.isfile(pdb_file) is False:
-            pdb_file, _ = atools.convert_CIF_2_PDB(calc)
-            if pdb_file is None and _ is None:
+        if in_memory:
+            print(calc, pre_op)
+            # rebuild system in memory
+            _, rebuilt_structure = modularize_file(calc)
+            if _ is None:
                 continue
             del _  # we don't need the ASE structure in this case
-        # rebuild system
-        rebuilt_structure = atools.modularize(file=pdb_file)
+        else:
+            pdb_file = calc.replace('.cif', '.pdb')
+            print(pdb_file, pre_op)
+            if os.path.isfile(pdb_file) is False:
+                pdb_file, _ = atools.convert_CIF_2_PDB(calc)
+                if pdb_file is None and _ is None:
+                    continue
+                del _  # we don't need the ASE structure in this case
+            # rebuild system
+            rebuilt_structure = atools.modularize(file=pdb_file)
         if rebuilt_structure is None:
             # handle pyWindow failure
-            sys.exit(f'pyWindow failure on {pdb_file}')
+            sys.exit(f'pyWindow failure on {calc}')
         # run analysis on rebuilt system (extracts all cages)
         _ = atools.analyze_rebuilt(rebuilt_structure,
                                    file_prefix=pre_op,
@@ -0,0 +1,60 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# Distributed under the terms of the MIT License.
+
+"""
+Tests of the periodic graph traversal of periodic_molecules.py.
+
+Author: Andrew Tarzia
+
+Date Created: 19 Oct 2026
+
+"""
+
+import os
+import sys
+import numpy as np
+
+sys.path.insert(
+    0, os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+)
+from periodic_molecules import (  # noqa: E402
+    cellpar_to_lattice, perceive_periodic_bonds, whole_molecules
+)
+
+
+def molecules_of(elements, cart, cellpar):
+    lattice = cellpar_to_lattice(cellpar)
+    frac = np.linalg.solve(lattice.T, np.asarray(cart, dtype=float).T).T
+    frac = frac % 1.0
+    bonds, images = perceive_periodic_bonds(elements, frac, lattice)
+    return list(whole_molecules(elements, frac, lattice, bonds, images))
+
+
+def test_1d_polymer_is_polymeric():
+    # C-C chain along a: each cell holds two carbons bonded to each
+    # other and to the next cell
+    molecules = molecules_of(
+        ['C', 'C'], [[0.0, 5.0, 5.0], [1.54, 5.0, 5.0]],
+        [3.08, 10.0, 10.0, 90.0, 90.0, 90.0]
+    )
+    assert len(molecules) == 1
+    indices, molecule, polymeric = molecules[0]
+    assert polymeric
+    assert sorted(indices.tolist()) == [0, 1]
+
+
+def test_discrete_molecule_across_cell_boundary():
+    # C-C molecule split by the cell boundary is made whole and is not
+    # polymeric
+    molecules = molecules_of(
+        ['C', 'C'], [[-0.77, 5.0, 5.0], [0.77, 5.0, 5.0]],
+        [10.0, 10.0, 10.0, 90.0, 90.0, 90.0]
+    )
+    assert len(molecules) == 1
+    indices, molecule, polymeric = molecules[0]
+    assert not polymeric
+    distance = np.linalg.norm(
+        molecule['coordinates'][0] - molecule['coordinates'][1]
+    )
+    assert abs(distance - 1.54) < 1E-6
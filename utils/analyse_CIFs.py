@@ -13,7 +13,6 @@ Date Created: 04 Mar 2019
 
 import glob
 import sys
-import atools
 
 
 def write_entry(file, CIF, NA):
@@ -30,7 +29,7 @@ def write_entry(file, CIF, NA):
 
 
 if __name__ == "__main__":
-    if (not len(sys.argv) == 2):
+    if (not len(sys.argv) == 2 or sys.argv[1] in ['-h', '--help']):
         print("""
 Usage: analyze_CIFs.py DB_file
     DB_file: file to output to
@@ -39,6 +38,7 @@ Usage: analyze_CIFs.py DB_file
     else:
         DB_file = sys.argv[1]
     # prepare names file
+    import atools
     print('This script overwrites the DB file and is only cheap analysis.')
     if input('Are you sure you want to continue? (t/f)') == 'f':
         sys.exit('exitting.')
@@ -11,8 +11,20 @@ Date Created: 17 Feb 2019
 
 """
 
-from ase.io import read
-import pymatgen as pmg
+
+def number_of_atoms(file):
+    """
+    Count the atoms in the unit cell of a structure file.
+
+    PDBs are counted from their atom lines only, other formats are read
+    with ASE.
+
+    """
+    if file[-4:] == '.pdb':
+        with open(file, 'r') as f:
+            return sum(1 for line in f if line[:6] in ['ATOM  ', 'HETATM'])
+    from ase.io import read
+    return len(read(file))
 
 
 def write_entry(file, number, DOI, CSD, NA_ase, NA_pmg):
@@ -25,6 +37,7 @@ def write_entry(file, number, DOI, CSD, NA_ase, NA_pmg):
 
 
 if __name__ == "__main__":
+    import pymatgen as pmg
     # prepare names file
     with open('CIF_atom_DB.txt', 'w') as f:
         f.write('file,number,DOI,CSD,NA\n')
@@ -36,8 +49,7 @@ if __name__ == "__main__":
         file, number, DOI, CSD = item
         print(file, number, DOI, CSD)
         try:
-            structure_ase = read(CSD + '.cif')
-            NA_ase = len(structure_ase)
+            NA_ase = number_of_atoms(CSD + '.cif')
         except RuntimeError:
             NA_ase = 0
         try:
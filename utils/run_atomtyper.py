@@ -13,9 +13,6 @@ Date Created: 19 Feb 2019
 """
 
 import sys
-from ase.io import read
-from autografs.utils.io import write_gin
-from autografs.utils.mmanalysis import analyze_mm
 
 if __name__ == "__main__":
     if (not len(sys.argv) == 4):
@@ -30,6 +27,9 @@ Usage: run_atomtyper.py file view version
         view = sys.argv[2].lower()
         version = sys.argv[3]
     # get output file name
+    from ase.io import read
+    from autografs.utils.io import write_gin
+    from autografs.utils.mmanalysis import analyze_mm
     if file[-4:] == '.cif':
         file_type = 'cif'
         path = file.replace('.cif', '.gin')
@@ -13,7 +13,6 @@ Date Created: 05 Mar 2019
 
 import glob
 import sys
-import atools
 
 
 def write_entry(file, string):
@@ -29,7 +28,7 @@ def write_entry(file, string):
 
 
 if __name__ == "__main__":
-    if (not len(sys.argv) == 2):
+    if (not len(sys.argv) == 2 or sys.argv[1] in ['-h', '--help']):
         print("""
 Usage: structure_preparation.py out_file
     out_file: file to output to
@@ -38,6 +37,7 @@ Usage: structure_preparation.py out_file
     else:
         out_file = sys.argv[1]
     # prepare names file
+    import atools
     print('This script overwrites the DB file and is only cheap analysis.')
     if input('Are you sure you want to continue? (t/f)') == 'f':
         sys.exit('exitting.')
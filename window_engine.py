@@ -0,0 +1,142 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# Distributed under the terms of the MIT License.
+
+"""
+Functions for finding the windows of a cage from its molecular graph
+and convex hull, as a fast alternative to the pyWindow vector sampling.
+
+The convex hull of a cage is made of facets that lie on the cage wall
+and facets that span its windows. A facet spans a window if its atoms
+are far apart in the bond graph (hydrogens count as their heavy atom),
+since atoms of the wall are only a few bonds apart. Open facets that
+share an edge make up one window, whose diameter is twice the distance
+from the window centre to the nearest rim atom surface.
+
+The engine is experimental: its agreement with pyWindow windows has
+not yet been measured on a reference set (benchmark_windows.py), so
+scripts warn when --window_engine graph is used.
+
+Author: Andrew Tarzia
+
+Date Created: 19 Oct 2026
+
+"""
+
+import numpy as np
+from scipy.spatial import ConvexHull
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import dijkstra, connected_components
+
+from graph_hash import perceive_bonds
+from pore_estimator import vdw_radii
+
+
+def heavy_atom_parents(elements, bonds):
+    """
+    Map each hydrogen to its bonded heavy atom (others to themselves).
+
+    """
+    parents = np.arange(len(elements))
+    is_h = np.array([i.title() == 'H' for i in elements])
+    for a, b in bonds:
+        if is_h[a] and not is_h[b]:
+            parents[a] = b
+        elif is_h[b] and not is_h[a]:
+            parents[b] = a
+    return parents
+
+
+def open_facets(elements, coordinates, bonds, hull, min_path=5):
+    """
+    Find hull facets whose atoms are at least min_path bonds apart.
+
+    Returns:
+        (ndarray) - boolean mask of open facets
+
+    """
+    n_atoms = len(elements)
+    parents = heavy_atom_parents(elements, bonds)
+    graph = coo_matrix(
+        (np.ones(len(bonds)), (parents[bonds[:, 0]], parents[bonds[:, 1]])),
+        shape=(n_atoms, n_atoms)
+    ).tocsr()
+    vertices = np.unique(parents[hull.simplices])
+    distances = dijkstra(
+        graph, directed=False, unweighted=True, indices=vertices,
+        limit=min_path
+    )
+    row = np.full(n_atoms, -1)
+    row[vertices] = np.arange(len(vertices))
+    facets = parents[hull.simplices]
+    path = np.zeros(len(facets))
+    for a, b in [(0, 1), (1, 2), (0, 2)]:
+        path = np.maximum(path, distances[row[facets[:, a]], facets[:, b]])
+    return path >= min_path
+
+
+def facet_components(simplices, mask):
+    """
+    Group open facets that share an edge.
+
+    Returns:
+        (list) - arrays of facet indices of each group
+
+    """
+    facets = np.where(mask)[0]
+    if len(facets) == 0:
+        return []
+    edges = np.sort(np.concatenate([
+        simplices[facets][:, [0, 1]],
+        simplices[facets][:, [1, 2]],
+        simplices[facets][:, [0, 2]]
+    ]), axis=1)
+    owner = np.tile(np.arange(len(facets)), 3)
+    order = np.lexsort((edges[:, 1], edges[:, 0]))
+    edges, owner = edges[order], owner[order]
+    shared = np.all(edges[1:] == edges[:-1], axis=1)
+    graph = coo_matrix(
+        (np.ones(shared.sum()), (owner[:-1][shared], owner[1:][shared])),
+        shape=(len(facets), len(facets))
+    )
+    n, labels = connected_components(graph, directed=False)
+    return [facets[labels == i] for i in range(n)]
+
+
+def find_windows(elements, coordinates, min_path=5):
+    """
+    Find windows of a cage.
+
+    Keyword Arguments:
+        elements (list) - element of each atom
+        coordinates (ndarray) - (N, 3) coordinates
+        min_path (int) - minimum number of bonds between atoms of a
+            facet spanning a window
+
+    Returns:
+        diameters (ndarray) - diameter of each window
+        centres (ndarray) - (n, 3) centre of each window
+
+    """
+    elements = np.asarray(elements)
+    coordinates = np.asarray(coordinates, dtype=float)
+    if len(coordinates) < 4:
+        return np.empty(0), np.empty((0, 3))
+    bonds = perceive_bonds(elements, coordinates)
+    hull = ConvexHull(coordinates)
+    mask = open_facets(elements, coordinates, bonds, hull, min_path)
+    components = facet_components(hull.simplices, mask)
+    radii = vdw_radii(elements)
+    diameters = []
+    centres = []
+    for facets in components:
+        rim = np.unique(hull.simplices[facets])
+        centre = coordinates[rim].mean(axis=0)
+        # diameter limited by the nearest atom of the whole cage
+        surface = np.linalg.norm(coordinates - centre, axis=1) - radii
+        diameters.append(2 * surface.min())
+        centres.append(centre)
+    diameters = np.array(diameters)
+    centres = np.array(centres).reshape(-1, 3)
+    keep = diameters > 0
+    return diameters[keep], centres[keep]
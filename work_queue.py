@@ -0,0 +1,334 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# Distributed under the terms of the MIT License.
+
+"""
+Lease-based work queue on a shared directory, for running the same
+list of structures from several nodes at once without a broker.
+
+    queue_dir/leases/ITEM - claim of ITEM, created with O_EXCL (atomic
+        on local and NFSv3+ filesystems) and kept fresh by a heartbeat
+        thread that updates its mtime
+    queue_dir/done/ITEM - ITEM is finished, by the node written in it
+    queue_dir/shards/NODE/NAME - results of each node, merged
+        deterministically (sorted rows) into one output file
+    queue_dir/nodes/NODE.lock - lock of a node name held by a running
+        process
+
+Node names are HOST-N, with N the first slot of HOST not locked by
+another process, so that a rerun of one process per host continues
+the shard (and its provenance ledger) of the previous run.
+
+A lease whose mtime is older than lease_time belongs to a dead node; it
+is expired by renaming it away (only one node's rename can succeed)
+and claimed again. A node whose lease was expired (e.g. after a long
+stall) finds out in its heartbeat or when it checks holds() before
+writing the results of an item, and drops them.
+
+Author: Andrew Tarzia
+
+Date Created: 19 Oct 2026
+
+"""
+
+import os
+import time
+import glob
+import fcntl
+import socket
+import logging
+import threading
+
+
+class WorkQueue:
+    """
+    Lease-based work queue in a shared directory.
+
+    Keyword Arguments:
+        queue_dir (str) - shared directory of the queue
+        lease_time (float) - seconds without heartbeat after which a
+            lease is expired
+        heartbeat (float) - seconds between heartbeats of held leases
+
+    """
+
+    def __init__(self, queue_dir, lease_time=600, heartbeat=60):
+        self.queue_dir = queue_dir
+        self.lease_time = lease_time
+        self.held = set()
+        self._lock = threading.Lock()
+        for i in ['leases', 'done', 'shards', 'nodes']:
+            os.makedirs(os.path.join(queue_dir, i), exist_ok=True)
+        self.node, self._node_lock = self._lock_node()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(
+            target=self._heartbeat, args=(heartbeat, ), daemon=True
+        )
+        self._thread.start()
+
+    def _lock_node(self):
+        """
+        Lock the first free node name of this host.
+
+        Returns:
+            (tuple) - node name, open lock file
+
+        """
+        slot = 0
+        while True:
+            node = f'{socket.gethostname()}-{slot}'
+            lock = open(
+                os.path.join(self.queue_dir, 'nodes', f'{node}.lock'), 'w'
+            )
+            try:
+                fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                lock.close()
+                slot += 1
+                continue
+            return node, lock
+
+    def _path(self, kind, item):
+        return os.path.join(
+            self.queue_dir, kind, os.path.basename(item)
+        )
+
+    def is_done(self, item):
+        return os.path.isfile(self._path('done', item))
+
+    def _create_lease(self, item):
+        try:
+            fd = os.open(
+                self._path('leases', item),
+                os.O_CREAT | os.O_EXCL | os.O_WRONLY
+            )
+        except FileExistsError:
+            return False
+        with os.fdopen(fd, 'w') as f:
+            f.write(f'{self.node}\n')
+        with self._lock:
+            self.held.add(item)
+        return True
+
+    def _owner(self, item):
+        try:
+            with open(self._path('leases', item), 'r') as f:
+                return f.readline().rstrip()
+        except FileNotFoundError:
+            return None
+
+    def claim(self, item):
+        """
+        Try to claim item.
+
+        Returns:
+            (bool) - True if this node now holds the lease of item
+
+        """
+        if self.is_done(item):
+            return False
+        if self._create_lease(item):
+            # done may have been marked between the check and the claim
+            if self.is_done(item):
+                self.release(item)
+                return False
+            return True
+        lease = self._path('leases', item)
+        owner = self._owner(item)
+        try:
+            age = time.time() - os.path.getmtime(lease)
+        except FileNotFoundError:
+            return self._create_lease(item)
+        if age < self.lease_time:
+            return False
+        # expire lease of a dead node, only one rename succeeds
+        expired = f'{lease}.expired.{self.node}'
+        try:
+            os.rename(lease, expired)
+        except FileNotFoundError:
+            return False
+        # the lease may have been renewed, or expired and claimed by
+        # another node, between the check and the rename
+        with open(expired, 'r') as f:
+            renamed_owner = f.readline().rstrip()
+        renamed_age = time.time() - os.path.getmtime(expired)
+        if renamed_owner != owner or renamed_age < self.lease_time:
+            # put the fresh lease back, unless it was replaced already
+            try:
+                os.link(expired, lease)
+            except FileExistsError:
+                pass
+            os.remove(expired)
+            return False
+        os.remove(expired)
+        logging.info(f'> expired lease of {item} ({age:.0f} s old)')
+        return self._create_lease(item)
+
+    def _heartbeat(self, interval):
+        while not self._stop.wait(interval):
+            with self._lock:
+                held = list(self.held)
+            for item in held:
+                if self._owner(item) != self.node:
+                    # lease was expired by another node
+                    logging.warning(f'> lost lease of {item}')
+                    with self._lock:
+                        self.held.discard(item)
+                    continue
+                try:
+                    os.utime(self._path('leases', item))
+                except FileNotFoundError:
+                    pass
+
+    def holds(self, item):
+        """
+        Check that this node still holds the lease of item.
+
+        Results of an item must not be written if its lease was lost
+        (expired by another node, which processes it again).
+
+        """
+        with self._lock:
+            held = item in self.held
+        if held and self._owner(item) != self.node:
+            logging.warning(f'> lost lease of {item}, result not written')
+            with self._lock:
+                self.held.discard(item)
+            return False
+        return held
+
+    def release(self, item):
+        """
+        Give up the lease of item without marking it done.
+
+        """
+        with self._lock:
+            self.held.discard(item)
+        if self._owner(item) == self.node:
+            os.remove(self._path('leases', item))
+
+    def complete(self, item):
+        """
+        Mark item as done and release its lease.
+
+        Returns:
+            (bool) - False if the lease of item was lost, in which case
+                it is not marked done
+
+        """
+        if not self.holds(item):
+            return False
+        with open(self._path('done', item), 'w') as f:
+            f.write(f'{self.node}\n')
+        self.release(item)
+        return True
+
+    def reopen(self, item):
+        """
+        Remove the done mark of item so that it is processed again.
+
+        """
+        try:
+            os.remove(self._path('done', item))
+        except FileNotFoundError:
+            pass
+
+    def items(self, all_items):
+        """
+        Yield the items of all_items claimed by this node.
+
+        Items are released if the caller does not complete them (e.g.
+        on an exception).
+
+        """
+        for item in all_items:
+            if not self.claim(item):
+                continue
+            try:
+                yield item
+            finally:
+                with self._lock:
+                    held = item in self.held
+                if held:
+                    self.release(item)
+
+    def shard_file(self, name):
+        """
+        Return this node's shard of the result file name.
+
+        Files derived from the shard name (e.g. name + '.solvents.csv')
+        are shards of the derived name.
+
+        """
+        directory = os.path.join(self.queue_dir, 'shards', self.node)
+        os.makedirs(directory, exist_ok=True)
+        return os.path.join(directory, os.path.basename(name))
+
+    def _done_by(self, item):
+        try:
+            with open(self._path('done', item), 'r') as f:
+                return f.readline().rstrip()
+        except FileNotFoundError:
+            return None
+
+    def merge_shards(self, name, output_file, item_of=None):
+        """
+        Merge all shards of result file name into output_file.
+
+        Rows are keyed by their first column. The rows of a key are
+        taken from one shard only: that of the node that last completed
+        its item, else the most recently modified shard with the key,
+        so that rows left by earlier runs are replaced. Rows are sorted
+        so that the result does not depend on which node processed
+        which item. The file is replaced atomically.
+
+        Keyword Arguments:
+            name (str) - result file name given to shard_file
+            output_file (str) - merged file
+            item_of (function) - item of a key (default: the key)
+
+        """
+        header = None
+        # key: {shard node: rows}
+        keyed = {}
+        shards = sorted(
+            glob.glob(os.path.join(
+                self.queue_dir, 'shards', '*', os.path.basename(name)
+            )),
+            key=os.path.getmtime
+        )
+        for shard in shards:
+            node = os.path.basename(os.path.dirname(shard))
+            with open(shard, 'r') as f:
+                lines = f.readlines()
+            if len(lines) == 0:
+                continue
+            header = header or lines[0]
+            for line in lines[1:]:
+                if line.strip():
+                    key = line.split(',', 1)[0]
+                    keyed.setdefault(key, {}).setdefault(node, set()).add(
+                        line
+                    )
+        if header is None:
+            return
+        rows = set()
+        for key, by_node in keyed.items():
+            node = self._done_by(key if item_of is None else item_of(key))
+            if node not in by_node:
+                # shards are in order of modification
+                node = list(by_node)[-1]
+            rows.update(by_node[node])
+        temp = f'{output_file}.{self.node}.tmp'
+        with open(temp, 'w') as f:
+            f.write(header)
+            f.writelines(sorted(rows))
+        os.replace(temp, output_file)
+        logging.info(
+            f'> merged {len(shards)} shards into {output_file} '
+            f'({len(rows)} rows)'
+        )
+
+    def close(self):
+        self._stop.set()
+        self._node_lock.close()